@@ -0,0 +1,196 @@
+"""
+Read-only JSON API over listings, categories and the watchlist.
+
+Every endpoint takes ?fields=a,b to return only some fields, answers
+conditional GETs with 304 using ETags built from listing versions, and is
+gzip-compressed for clients that accept it. Only the listing detail sends
+Last-Modified: a listing leaving a collection would not make the newest
+timestamp in it any newer.
+"""
+import hashlib
+from functools import wraps
+
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers, quote_etag
+from django.utils.http import http_date
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_safe
+
+from . import bidding, facets
+from .models import Listing
+from .pagination import DEFAULT_SORT, SORTS, InvalidCursor, paginate
+from .routers import replica_reads
+
+
+TOP_BIDS = 5
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _username(user):
+    return user.username if user else None
+
+
+# Field name -> (related objects it needs, how to read it off a listing)
+CARD_FIELDS = {
+    "id": ((), lambda listing: listing.pk),
+    "title": ((), lambda listing: listing.title),
+    "summary": ((), lambda listing: listing.summary),
+    "image_url": ((), lambda listing: listing.image_url),
+    "starting_bid": ((), lambda listing: str(listing.starting_bid)),
+    "current_price": ((), lambda listing: str(listing.current_price)),
+    "bid_count": ((), lambda listing: listing.bid_count),
+    "watcher_count": ((), lambda listing: listing.watcher_count),
+    "comment_count": ((), lambda listing: listing.comment_count),
+    "is_active": ((), lambda listing: listing.is_active),
+    "created_at": ((), lambda listing: _iso(listing.created_at)),
+    "ends_at": ((), lambda listing: _iso(listing.ends_at)),
+    "version": ((), lambda listing: listing.version),
+    "category": (("category",), lambda listing: listing.category.slug if listing.category else None),
+    "owner": (("owner",), lambda listing: _username(listing.owner)),
+}
+
+DETAIL_FIELDS = {
+    **{name: field for name, field in CARD_FIELDS.items() if name != "summary"},
+    "description": ((), lambda listing: listing.description),
+    "winner": (("winner",), lambda listing: _username(listing.winner)),
+    "highest_bidder": (("price__user",), lambda listing: _username(listing.price.user) if listing.price else None),
+    "top_bids": ((), lambda listing: [
+        {"amount": str(bid.bid), "bidder": _username(bid.user), "placed_at": _iso(bid.created_at)}
+        for bid in bidding.top_bids(listing, limit=TOP_BIDS)
+    ]),
+}
+
+CATEGORY_FIELDS = {
+    "id": ((), lambda facet: facet.id),
+    "name": ((), lambda facet: facet.name),
+    "slug": ((), lambda facet: facet.slug),
+    "active_count": ((), lambda facet: facet.active_count),
+}
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def selected_fields(request, available):
+    """The fields named in ?fields=, or all of them."""
+    requested = request.GET.get("fields")
+    if not requested:
+        return available
+    names = [name.strip() for name in requested.split(",") if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise InvalidFields(f"Unknown fields: {', '.join(unknown)}.")
+    return {name: available[name] for name in names}
+
+
+def related(fields):
+    return sorted({relation for relations, _ in fields.values() for relation in relations})
+
+
+def serialize(obj, fields):
+    return {name: read(obj) for name, (_, read) in fields.items()}
+
+
+def error(message, status=400):
+    return JsonResponse({"error": message}, status=status)
+
+
+def make_etag(*parts):
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return quote_etag(digest)
+
+
+def conditional(request, build, etag, last_modified=None):
+    """
+    Answer 304 when the client's copy is current, otherwise send what
+    ``build()`` returns; it is only called when the body is needed.
+    """
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    response = not_modified or JsonResponse(build())
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified)
+    # Clients must revalidate, so updated prices show up straight away
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+def endpoint(view):
+    """Shared behaviour of API views: GET/HEAD only, replica reads, gzip."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except InvalidFields as exc:
+            return error(str(exc))
+    return require_safe(gzip_page(replica_reads(wrapper)))
+
+
+@endpoint
+def listings(request):
+    fields = selected_fields(request, CARD_FIELDS)
+    sort = request.GET.get("sort", DEFAULT_SORT)
+    if sort not in SORTS:
+        return error(f"Unknown sort; use one of {', '.join(SORTS)}.")
+    queryset = Listing.objects.active().for_cards().select_related(*related(fields))
+    category = facets.find(request.GET.get("category"))
+    if category:
+        queryset = queryset.filter(category_id=category.id)
+    elif request.GET.get("category"):
+        queryset = queryset.none()
+    try:
+        page, next_cursor = paginate(
+            queryset, cursor=request.GET.get("cursor"), page_size=request.GET.get("page_size"), sort=sort,
+        )
+    except InvalidCursor:
+        return error("Invalid page cursor.")
+
+    etag = make_etag(list(fields), next_cursor, [(listing.pk, listing.version) for listing in page])
+    return conditional(
+        request, lambda: {"results": [serialize(listing, fields) for listing in page], "next": next_cursor}, etag
+    )
+
+
+@endpoint
+def listing(request, id):
+    fields = selected_fields(request, DETAIL_FIELDS)
+    listing = Listing.objects.select_related(*related(fields)).filter(pk=id).first()
+    if listing is None:
+        return error("Listing not found.", status=404)
+    etag = make_etag(list(fields), listing.pk, listing.version)
+    return conditional(request, lambda: serialize(listing, fields), etag, listing.modified_at)
+
+
+@endpoint
+def categories(request):
+    fields = selected_fields(request, CATEGORY_FIELDS)
+    categories = facets.category_facets()
+    etag = make_etag(list(fields), categories)
+    return conditional(request, lambda: {"results": [serialize(facet, fields) for facet in categories]}, etag)
+
+
+@endpoint
+def watchlist(request):
+    if not request.user.is_authenticated:
+        return error("Authentication required.", status=401)
+    fields = selected_fields(request, CARD_FIELDS)
+    queryset = request.user.listingWatchlist.for_cards().select_related(*related(fields))
+    try:
+        page, next_cursor = paginate(
+            queryset, cursor=request.GET.get("cursor"), page_size=request.GET.get("page_size"),
+        )
+    except InvalidCursor:
+        return error("Invalid page cursor.")
+
+    etag = make_etag(list(fields), request.user.pk, next_cursor, [(listing.pk, listing.version) for listing in page])
+    response = conditional(
+        request, lambda: {"results": [serialize(listing, fields) for listing in page], "next": next_cursor}, etag
+    )
+    # The body depends on who is logged in
+    patch_vary_headers(response, ["Cookie"])
+    return response
@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 
 class AuctionsConfig(AppConfig):
     name = 'auctions'
+
+    def ready(self):
+        # Connects the signals that keep cached users current
+        from . import auth  # noqa: F401
+
+        # Opt-in: close expired auctions from a background thread of this process
+        interval = getattr(settings, "AUCTION_CLOSER_INTERVAL", None)
+        if interval:
+            from .expiry import start_periodic_closer
+            start_periodic_closer(interval)
+
+        interval = getattr(settings, "TRENDING_DECAY_INTERVAL", None)
+        if interval:
+            from .trending import start_periodic_decay
+            start_periodic_decay(interval)
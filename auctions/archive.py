@@ -0,0 +1,95 @@
+"""
+Moving long-closed auctions out of the live tables.
+
+Listings closed for more than ARCHIVE_AFTER_DAYS are copied, with their
+bids, comments and watchers, into the Archived* tables and deleted from the
+live ones, ``chunk_size`` listings per transaction. The rows are copied with
+INSERT ... SELECT, so a listing with half a million bids never passes
+through Python. Archived rows keep their ids: the listing page falls back
+to the archive for ids no longer live, at the same URL.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ArchivedBid, ArchivedComment, ArchivedListing, Bid, Comment, Listing
+
+
+def archivable(now=None, days=None):
+    """Closed listings that have been closed long enough to archive."""
+    days = settings.ARCHIVE_AFTER_DAYS if days is None else days
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    return Listing.objects.filter(is_active=False, closed_at__lte=cutoff)
+
+
+def _copy(target, source, key, ids, rename=None, values=None):
+    """
+    Insert the rows of ``source`` whose ``key`` column is in ``ids`` into
+    ``target``, matching columns by name. ``rename`` maps target columns to
+    differently named source columns, ``values`` gives fixed values.
+    """
+    quote = connection.ops.quote_name
+    rename, values = rename or {}, values or {}
+    columns = [field.column for field in target._meta.concrete_fields]
+    selected = ["%s" if column in values else quote(rename.get(column, column)) for column in columns]
+    params = [values[column] for column in columns if column in values]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(target._meta.db_table)} ({', '.join(map(quote, columns))}) "
+            f"SELECT {', '.join(selected)} FROM {quote(source._meta.db_table)} "
+            f"WHERE {quote(key)} IN ({', '.join(['%s'] * len(ids))})",
+            params + list(ids),
+        )
+
+
+def _delete(model, key, ids):
+    # Straight DELETEs: the ORM would load every bid to follow Listing.price.
+    # Foreign keys are checked at commit, so the order does not matter.
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {quote(model._meta.db_table)} WHERE {quote(key)} IN ({', '.join(['%s'] * len(ids))})",
+            list(ids),
+        )
+
+
+def archive_listings(listing_ids, now=None):
+    """
+    Move the closed listings among ``listing_ids`` and everything attached to
+    them into the archive. Must run inside a transaction; returns the number
+    of listings moved.
+    """
+    ids = list(
+        Listing.objects.filter(pk__in=listing_ids, is_active=False)
+        .select_for_update(skip_locked=True).values_list("pk", flat=True)
+    )
+    if not ids:
+        return 0
+    Watcher, ArchivedWatcher = Listing.watchlist.through, ArchivedListing.watchlist.through
+    _copy(ArchivedListing, Listing, "id", ids, values={"archived_at": now or timezone.now()})
+    _copy(ArchivedBid, Bid, "listing_id", ids)
+    _copy(ArchivedComment, Comment, "listing_id", ids)
+    _copy(ArchivedWatcher, Watcher, "listing_id", ids, rename={"archivedlisting_id": "listing_id"})
+    for model in (Watcher, Comment, Listing, Bid):
+        _delete(model, "id" if model is Listing else "listing_id", ids)
+    return len(ids)
+
+
+def archive_closed(now=None, days=None, chunk_size=500):
+    """
+    Archive every listing closed for longer than ``days`` (ARCHIVE_AFTER_DAYS
+    by default), ``chunk_size`` listings per transaction. Returns the number
+    of listings archived.
+    """
+    now = now or timezone.now()
+    archived = 0
+    while True:
+        with transaction.atomic():
+            # Another archiver's chunk is skipped rather than waited for
+            chunk = archivable(now, days).select_for_update(skip_locked=True).order_by("closed_at")
+            ids = list(chunk.values_list("pk", flat=True)[:chunk_size])
+            if not ids:
+                return archived
+            archived += archive_listings(ids, now)
@@ -0,0 +1,219 @@
+"""
+Fingerprinted, precompressed static files.
+
+`manage.py collectstatic` copies every static file into STATIC_ROOT under a
+content-hashed name, e.g. auctions/styles.5e0a8f1c2b3d.css, and writes .gz
+and (when the brotli package is installed) .br variants of the files that
+compress. StaticFilesMiddleware then serves STATIC_ROOT itself: the variant
+the client accepts, with Content-Encoding and Vary, and a year-long
+immutable Cache-Control on hashed names, since changing a file changes its
+URL. Unhashed names are cached for STATIC_MAX_AGE and then revalidated.
+"""
+import gzip
+import mimetypes
+import os
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_etags
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Already compressed formats; another pass only costs time
+INCOMPRESSIBLE = {
+    ".br", ".gz", ".zip", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif",
+    ".woff", ".woff2", ".mp3", ".mp4", ".webm", ".pdf",
+}
+# Variants that save less than this are not worth a separate file
+MIN_SAVING = 0.05
+
+# Variant suffix -> Content-Encoding, in order of preference
+ENCODINGS = {".br": "br", ".gz": "gzip"}
+
+COMPRESSORS = {".gz": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+if brotli is not None:
+    COMPRESSORS[".br"] = lambda data: brotli.compress(data, quality=11)
+
+
+class CompressedManifestStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage that also writes compressed variants. Until
+    collectstatic has written a manifest, URLs use the plain names, so a
+    fresh checkout runs (and is tested) without the build step.
+    """
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        # Per suffix: [files, original bytes, compressed bytes], for reporting
+        self.compression_stats = {suffix: [0, 0, 0] for suffix in COMPRESSORS}
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in paths:
+            hashed = self.hashed_files.get(self.hash_key(self.clean_name(name)))
+            # Unhashed copies are compressed too, for links that bypass {% static %}
+            for target in dict.fromkeys([hashed, name]):
+                if target:
+                    for variant in self.compress(target):
+                        yield name, variant, True
+
+    def compress(self, name):
+        """Write the worthwhile compressed variants of ``name``; returns their names."""
+        if os.path.splitext(name)[1].lower() in INCOMPRESSIBLE:
+            return []
+        with self.open(name) as original:
+            data = original.read()
+        written = []
+        for suffix, compressor in COMPRESSORS.items():
+            compressed = compressor(data)
+            if len(compressed) > len(data) * (1 - MIN_SAVING):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
+            written.append(name + suffix)
+            stats = self.compression_stats[suffix]
+            stats[0] += 1
+            stats[1] += len(data)
+            stats[2] += len(compressed)
+        return written
+
+
+def accepted_encodings(header):
+    """The content codings an Accept-Encoding header allows (q > 0)."""
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticFile:
+    """A collected file with its compressed variants and response headers."""
+
+    def __init__(self, path, immutable):
+        stat = os.stat(path)
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+            content_type += "; charset=utf-8"
+        self.content_type = content_type
+        self.cache_control = IMMUTABLE if immutable else f"public, max-age={settings.STATIC_MAX_AGE}"
+        self.last_modified = http_date(stat.st_mtime)
+        tag = f"{stat.st_size:x}-{int(stat.st_mtime):x}"
+        # (Content-Encoding, path, size, ETag); each representation has its own ETag
+        self.variants = [
+            (encoding, path + suffix, os.path.getsize(path + suffix), f'"{tag}-{encoding}"')
+            for suffix, encoding in ENCODINGS.items() if os.path.exists(path + suffix)
+        ]
+        self.identity = (None, path, stat.st_size, f'"{tag}"')
+
+    def choose(self, accept_encoding):
+        if self.variants:
+            accepted = accepted_encodings(accept_encoding)
+            for variant in self.variants:
+                if variant[0] in accepted:
+                    return variant
+        return self.identity
+
+
+def collected_files(root, hashed_names):
+    """Map each file name in ``root`` (relative, with slashes) to a StaticFile."""
+    files = {}
+    manifest = getattr(staticfiles_storage, "manifest_name", None)
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, "/")
+            stem, suffix = os.path.splitext(path)
+            # Variants are served through the file they were compressed from
+            if name == manifest or (suffix in ENCODINGS and os.path.exists(stem)):
+                continue
+            files[name] = StaticFile(path, immutable=name in hashed_names)
+    return files
+
+
+class StaticFilesMiddleware:
+    """
+    Serve the files collected into STATIC_ROOT right after SecurityMiddleware,
+    so static responses get its headers but skip sessions, profiling and URL
+    resolution. Not used when nothing has been collected, when STATIC_URL
+    points at another host (a CDN), or with DEBUG on, where the staticfiles
+    app serves the live files. Files are indexed once at startup; restart the
+    server after collectstatic.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        static_url = urlsplit(settings.STATIC_URL or "")
+        root = settings.STATIC_ROOT
+        if settings.DEBUG or static_url.netloc or not root or not os.path.isdir(root):
+            raise MiddlewareNotUsed
+        hashed_names = set(getattr(staticfiles_storage, "hashed_files", {}).values())
+        self.files = collected_files(root, hashed_names)
+        if not self.files:
+            raise MiddlewareNotUsed
+        self.prefix = static_url.path
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def serve(self, request):
+        if request.method not in ("GET", "HEAD") or not request.path.startswith(self.prefix):
+            return None
+        static = self.files.get(request.path[len(self.prefix):])
+        if static is None:
+            return None
+        encoding, path, size, etag = static.choose(request.headers.get("Accept-Encoding", ""))
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = HttpResponseNotModified()
+        else:
+            if request.method == "GET":
+                # Streamed from the file, so large assets are never held in memory
+                response = FileResponse(open(path, "rb"), content_type=static.content_type)
+                del response["Content-Disposition"]
+            else:
+                response = HttpResponse(content_type=static.content_type)
+            response["Content-Length"] = size
+            response["Last-Modified"] = static.last_modified
+            if encoding:
+                response["Content-Encoding"] = encoding
+        response["ETag"] = etag
+        response["Cache-Control"] = static.cache_control
+        if static.variants:
+            response["Vary"] = "Accept-Encoding"
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.serve(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self.serve(request) or await self.get_response(request)
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+
+def _cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that keeps logged-in users in the default cache, so an
+    authenticated request does not fetch its User row every time.
+
+    Saving or deleting a user (a password change, deactivation, a new
+    last_login) drops its entry. Queryset updates bypass that, and workers
+    with their own local-memory cache only drop their own entry, so
+    USER_CACHE_TIMEOUT bounds how long a stale copy can be served.
+    """
+
+    def get_user(self, user_id):
+        key = _cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+        return user
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def forget_user(sender, instance, **kwargs):
+    cache.delete(_cache_key(instance.pk))
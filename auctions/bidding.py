@@ -0,0 +1,106 @@
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import events, notifications, trending
+from .models import Bid, Listing, User
+
+
+ACCEPTED = "accepted"
+OUTBID = "outbid"
+BELOW_STARTING_BID = "below_starting_bid"
+CLOSED = "closed"
+CONTENDED = "contended"
+
+# How many times to retry the compare-and-set when other bids keep landing first
+MAX_ATTEMPTS = 10
+
+
+@dataclass
+class BidResult:
+    status: str
+    current_price: Decimal
+    bid: Bid = None
+
+    @property
+    def accepted(self):
+        return self.status == ACCEPTED
+
+
+def current_price(listing):
+    return listing.price.bid if listing.price else listing.starting_bid
+
+
+def place_bid(listing_id, user, amount):
+    """
+    Place a bid of ``amount`` on a listing without losing concurrent updates.
+
+    The listing's price is swapped with a conditional UPDATE that only matches
+    while ``price`` still points at the bid we compared against. If another bid
+    got there first the UPDATE matches nothing, our bid row is rolled back and
+    the comparison is redone against the new price. Raises Listing.DoesNotExist
+    for unknown listings.
+    """
+    amount = Decimal(amount)
+    for _ in range(MAX_ATTEMPTS):
+        listing = Listing.objects.select_related("price").get(pk=listing_id)
+        price = current_price(listing)
+        now = timezone.now()
+        if not listing.is_active or (listing.ends_at and listing.ends_at <= now):
+            return BidResult(CLOSED, price)
+        if amount < listing.starting_bid:
+            return BidResult(BELOW_STARTING_BID, listing.starting_bid)
+        # The first bid may match the starting price, later ones must beat it
+        if listing.price and amount <= price:
+            return BidResult(OUTBID, price)
+
+        with transaction.atomic():
+            new_bid = Bid.objects.create(bid=amount, user=user, listing_id=listing_id)
+            swapped = Listing.objects.filter(
+                Q(ends_at__isnull=True) | Q(ends_at__gt=now),
+                pk=listing_id, is_active=True, price_id=listing.price_id,
+            ).update(
+                price=new_bid,
+                current_price=amount,
+                bid_count=F("bid_count") + 1,
+                trending_score=F("trending_score") + trending.BID_WEIGHT,
+                version=F("version") + 1,
+                modified_at=now,
+            )
+            if swapped:
+                if listing.price and listing.price.user_id not in (None, user.pk):
+                    notifications.outbid(listing_id, listing.price.user_id)
+                events.publish_on_commit([listing_id], "bid")
+                return BidResult(ACCEPTED, amount, new_bid)
+            transaction.set_rollback(True)
+
+    return BidResult(CONTENDED, price)
+
+
+def top_bids(listing, limit=10):
+    """Highest bids on a listing, served from the (listing, -bid) index."""
+    return Bid.objects.filter(listing=listing).select_related("user").order_by("-bid", "-id")[:limit]
+
+
+def bid_count(listing):
+    return Bid.objects.filter(listing=listing).count()
+
+
+def bidders(listing):
+    """Distinct users who have bid on a listing."""
+    return User.objects.filter(UserBid__listing=listing).distinct()
+
+
+def user_bid_history(user, limit=50, before=None):
+    """
+    A user's most recent bids, newest first, from the (user, -created_at)
+    index. Pass the ``created_at`` of the last bid seen as ``before`` to
+    fetch the next page.
+    """
+    bids = Bid.objects.filter(user=user).select_related("listing")
+    if before is not None:
+        bids = bids.filter(created_at__lt=before)
+    return bids.order_by("-created_at")[:limit]
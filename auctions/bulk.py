@@ -0,0 +1,229 @@
+import contextlib
+import csv
+import itertools
+import json
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Bid, Category, Comment, Listing, User, unique_slug
+
+
+FORMATS = ("csv", "jsonl")
+
+# Column order of each kind of file. Users and categories are referred to by
+# username and name so files can move between databases
+FIELDS = {
+    "listings": (
+        "id", "title", "description", "starting_bid", "image_url", "is_active",
+        "created_at", "ends_at", "closed_at", "owner", "category", "winner",
+    ),
+    "bids": ("id", "listing", "user", "bid", "created_at"),
+    "comments": ("id", "listing", "author", "message", "created_at"),
+}
+
+# Query lookups behind the exported columns that are not plain fields
+EXPORT_LOOKUPS = {
+    "listings": {"owner": "owner__username", "category": "category__name", "winner": "winner__username"},
+    "bids": {"listing": "listing_id", "user": "user__username"},
+    "comments": {"listing": "listing_id", "author": "author__username"},
+}
+
+MODELS = {"listings": Listing, "bids": Bid, "comments": Comment}
+
+
+def guess_format(path):
+    for fmt in FORMATS:
+        if path.endswith(f".{fmt}"):
+            return fmt
+    return None
+
+
+def read_rows(stream, fmt):
+    """Yield one dict per record, reading ``stream`` lazily."""
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+    else:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_rows(stream, fmt, fields, rows):
+    """Write ``rows`` (dicts) to ``stream`` as they arrive; returns the count."""
+    written = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, fieldnames=fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            written += 1
+    else:
+        for row in rows:
+            stream.write(json.dumps(row, default=str) + "\n")
+            written += 1
+    return written
+
+
+def export_rows(kind, chunk_size=2000):
+    """Stream every row of ``kind`` in primary-key order, as plain dicts."""
+    lookups = EXPORT_LOOKUPS[kind]
+    columns = [lookups.get(field, field) for field in FIELDS[kind]]
+    rows = MODELS[kind].objects.order_by("pk").values_list(*columns)
+    for values in rows.iterator(chunk_size=chunk_size):
+        yield dict(zip(FIELDS[kind], values))
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+class LookupCache:
+    """
+    Map natural keys (usernames, category names) to primary keys, resolving
+    a whole batch of unknown keys with one query. Keys that do not exist are
+    created with ``create(key)`` when given, otherwise they raise KeyError.
+    The cache is dropped once it holds ``max_size`` keys to bound memory.
+    """
+
+    def __init__(self, model, field, create=None, max_size=100_000):
+        self.model = model
+        self.field = field
+        self.create = create
+        self.max_size = max_size
+        self._ids = {}
+
+    def _fetch(self, keys):
+        rows = self.model.objects.filter(**{f"{self.field}__in": keys}).values_list(self.field, "pk")
+        self._ids.update(rows)
+
+    def resolve(self, keys):
+        missing = {key for key in keys if key and key not in self._ids}
+        if not missing:
+            return
+        if len(self._ids) + len(missing) > self.max_size:
+            self._ids.clear()
+        self._fetch(missing)
+        missing -= self._ids.keys()
+        if missing and self.create is not None:
+            self.model.objects.bulk_create([self.create(key) for key in missing], ignore_conflicts=True)
+            self._fetch(missing)
+            missing -= self._ids.keys()
+        if missing:
+            raise KeyError(f"Unknown {self.model._meta.verbose_name}: {', '.join(sorted(missing)[:5])}")
+
+    def get(self, key):
+        return self._ids[key] if key else None
+
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes")
+
+
+def parse_time(value):
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"Invalid date and time: {value!r}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.get_default_timezone())
+    return parsed
+
+
+def new_category(name):
+    return Category(name=name, slug=unique_slug(name))
+
+
+def new_user(username):
+    # Imported accounts cannot log in until they reset their password
+    return User(username=username, password=make_password(None))
+
+
+def _id(value):
+    return int(value) if value not in (None, "") else None
+
+
+def build_listing(row, users, categories):
+    starting_bid = Decimal(str(row["starting_bid"]))
+    is_active = parse_bool(row.get("is_active", True))
+    closed_at = parse_time(row.get("closed_at"))
+    if not is_active and closed_at is None:
+        # bulk_create skips Listing.save, which would set this
+        closed_at = timezone.now()
+    return Listing(
+        pk=_id(row.get("id")),
+        title=row["title"],
+        description=row.get("description") or "",
+        starting_bid=starting_bid,
+        current_price=starting_bid,
+        image_url=row.get("image_url") or None,
+        is_active=is_active,
+        created_at=parse_time(row.get("created_at")) or timezone.now(),
+        ends_at=parse_time(row.get("ends_at")),
+        closed_at=closed_at,
+        owner_id=users.get(row.get("owner")),
+        category_id=categories.get(row.get("category")),
+        winner_id=users.get(row.get("winner")),
+    )
+
+
+def build_bid(row, users, categories):
+    return Bid(
+        pk=_id(row.get("id")),
+        listing_id=_id(row.get("listing")),
+        user_id=users.get(row.get("user")),
+        bid=Decimal(str(row["bid"])),
+        created_at=parse_time(row.get("created_at")) or timezone.now(),
+    )
+
+
+def build_comment(row, users, categories):
+    return Comment(
+        pk=_id(row.get("id")),
+        listing_id=_id(row.get("listing")),
+        author_id=users.get(row.get("author")),
+        message=row["message"],
+        created_at=parse_time(row.get("created_at")) or timezone.now(),
+    )
+
+
+BUILDERS = {"listings": build_listing, "bids": build_bid, "comments": build_comment}
+
+# Columns naming a user in each kind of file
+USER_COLUMNS = {"listings": ("owner", "winner"), "bids": ("user",), "comments": ("author",)}
+
+
+@contextlib.contextmanager
+def keep_timestamps(model):
+    """Let bulk_create store the given created_at instead of the current time."""
+    field = model._meta.get_field("created_at")
+    auto_now_add = field.auto_now_add
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = auto_now_add
+
+
+def reset_sequences(model):
+    """Move the id sequence past imported ids (a no-op on SQLite)."""
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def point_prices_at_highest_bids(queryset):
+    """Set Listing.price to the highest bid of every listing in ``queryset`` that has bids."""
+    highest = Bid.objects.filter(listing=OuterRef("pk")).order_by("-bid", "pk").values("pk")[:1]
+    return queryset.filter(bids__isnull=False).distinct().update(price=Subquery(highest))
@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from django.utils.functional import cached_property
+
+from .models import ArchivedComment, Comment
+from .pagination import decode_cursor, paginate
+
+
+PAGE_SIZE = 20
+
+# Comment threads read newest first, in the pagination.SORTS format
+SORTS = {"newest": ("created_at", True, datetime.fromisoformat)}
+
+
+class CommentPage:
+    """
+    One page of a listing's comments, newest first, with their authors
+    joined in. Nothing is queried until the page is first used, so a listing
+    whose comments come from the fragment cache costs no comment query.
+    Raises InvalidCursor for a malformed ``cursor``. With ``archived``, the
+    comments come from an archived listing.
+    """
+
+    def __init__(self, listing_id, cursor=None, page_size=PAGE_SIZE, archived=False):
+        if cursor:
+            # Reject bad cursors now rather than while rendering
+            decode_cursor(cursor, SORTS["newest"][2])
+        self.listing_id = listing_id
+        self.cursor = cursor
+        self.page_size = page_size
+        self.archived = archived
+
+    @cached_property
+    def _page(self):
+        model = ArchivedComment if self.archived else Comment
+        comments = model.objects.filter(listing_id=self.listing_id).select_related("author")
+        return paginate(comments, cursor=self.cursor, page_size=self.page_size, sort="newest", sorts=SORTS)
+
+    @property
+    def comments(self):
+        return self._page[0]
+
+    @property
+    def next_cursor(self):
+        return self._page[1]
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import threading
+
+from django.db import transaction
+
+from .models import Listing
+
+
+SNAPSHOT_FIELDS = ("id", "current_price", "bid_count", "is_active", "version", "ends_at")
+
+
+class Subscription:
+    """One listener's mailbox, bound to the event loop it was created on."""
+
+    def __init__(self, listing_id, maxsize=16):
+        self.listing_id = listing_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, event):
+        # Events are full snapshots, so a slow client only needs the newest
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class Broker:
+    """
+    In-process pub/sub of listing events. Subscribers are plain asyncio
+    queues, so thousands of idle listeners cost no threads. publish() may be
+    called from any thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, listing_id):
+        subscription = Subscription(listing_id)
+        with self._lock:
+            self._subscribers.setdefault(listing_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            listeners = self._subscribers.get(subscription.listing_id)
+            if listeners is not None:
+                listeners.discard(subscription)
+                if not listeners:
+                    del self._subscribers[subscription.listing_id]
+
+    def has_subscribers(self, listing_id):
+        return listing_id in self._subscribers
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(listeners) for listeners in self._subscribers.values())
+
+    def publish(self, listing_id, event):
+        with self._lock:
+            listeners = list(self._subscribers.get(listing_id, ()))
+        for subscription in listeners:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The subscriber's event loop has gone away
+                self.unsubscribe(subscription)
+
+
+broker = Broker()
+
+
+def snapshot(values):
+    values = dict(values)
+    values["current_price"] = str(values["current_price"])
+    values["ends_at"] = values["ends_at"].isoformat() if values["ends_at"] else None
+    return values
+
+
+def publish_listing(listing_id, kind):
+    """Send the listing's current state to its subscribers, if it has any."""
+    if not broker.has_subscribers(listing_id):
+        return
+    values = Listing.objects.filter(pk=listing_id).values(*SNAPSHOT_FIELDS).first()
+    if values is not None:
+        broker.publish(listing_id, {"type": kind, **snapshot(values)})
+
+
+def publish_on_commit(listing_ids, kind):
+    """Publish once the current transaction commits, so readers see the change."""
+    def publish():
+        for listing_id in listing_ids:
+            publish_listing(listing_id, kind)
+    transaction.on_commit(publish)
+
+
+async def listing_snapshot(listing_id):
+    values = await Listing.objects.filter(pk=listing_id).values(*SNAPSHOT_FIELDS).afirst()
+    return snapshot(values) if values is not None else None
+
+
+def format_sse(event):
+    return f"event: {event['type']}\nid: {event['version']}\ndata: {json.dumps(event)}\n\n"
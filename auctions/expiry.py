@@ -0,0 +1,90 @@
+import logging
+import threading
+from collections import Counter
+
+from django.db import close_old_connections, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from . import events, facets, notifications
+from .models import Bid, Listing
+
+
+logger = logging.getLogger(__name__)
+
+
+def close_listings(listing_ids):
+    """
+    Close the active listings among ``listing_ids`` with one UPDATE, recording
+    the highest bidder as the winner. Listing.price always points at the
+    highest bid, so the winner is simply the user of that bid. Returns the
+    number of listings this call closed.
+    """
+    winner = Bid.objects.filter(pk=OuterRef("price_id")).values("user_id")[:1]
+    with transaction.atomic(savepoint=False):
+        # Lock the rows before closing them: a concurrent closer (the periodic
+        # closer racing an owner's Close button) waits, then finds them
+        # inactive, so each listing is counted and announced exactly once.
+        # SQLite has no row locks; IMMEDIATE transactions serialize it instead
+        rows = list(
+            Listing.objects.filter(pk__in=listing_ids, is_active=True)
+            .select_for_update().order_by().values_list("pk", "category")
+        )
+        if not rows:
+            return 0
+        ids = [pk for pk, _ in rows]
+        now = timezone.now()
+        closed = Listing.objects.filter(pk__in=ids).update(
+            is_active=False,
+            winner_id=Subquery(winner),
+            closed_at=now,
+            version=F("version") + 1,
+            modified_at=now,
+        )
+        for category_id, count in Counter(category for _, category in rows).items():
+            facets.adjust(category_id, -count)
+        notifications.auctions_closed(ids)
+        events.publish_on_commit(ids, "closed")
+    return closed
+
+
+def close_expired(now=None, chunk_size=1000):
+    """
+    Close every auction whose end time has passed, ``chunk_size`` listings
+    per transaction so writers are never blocked for long. Returns the
+    number of auctions closed.
+    """
+    now = now or timezone.now()
+    closed = 0
+    while True:
+        with transaction.atomic():
+            ids = list(Listing.objects.expired(now).order_by("ends_at").values_list("pk", flat=True)[:chunk_size])
+            if not ids:
+                return closed
+            closed += close_listings(ids)
+
+
+def run_periodically(interval, chunk_size=1000, stop=None):
+    """Close expired auctions every ``interval`` seconds until ``stop`` is set."""
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        try:
+            closed = close_expired(chunk_size=chunk_size)
+            if closed:
+                logger.info("Closed %d expired auctions", closed)
+        except Exception:
+            logger.exception("Closing expired auctions failed")
+        finally:
+            close_old_connections()
+        stop.wait(interval)
+
+
+def start_periodic_closer(interval, chunk_size=1000):
+    """Run the closer in a daemon thread of the current process."""
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=run_periodically, args=(interval, chunk_size, stop),
+        name="auction-closer", daemon=True,
+    )
+    thread.start()
+    return stop
@@ -0,0 +1,78 @@
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import Category
+
+
+CATEGORIES_KEY = "facets:categories"
+
+
+def _count_key(category_id):
+    return f"facets:active:{category_id}"
+
+
+@dataclass(frozen=True)
+class Facet:
+    id: int
+    name: str
+    slug: str
+    active_count: int = 0
+
+
+def _recount():
+    """Load every category with its active-listing count in one query and cache them."""
+    rows = Category.objects.annotate(
+        active_count=Count("listings", filter=Q(listings__is_active=True))
+    ).order_by("name").values_list("pk", "name", "slug", "active_count")
+    facets = [Facet(*row) for row in rows]
+    timeout = settings.FACET_CACHE_TIMEOUT
+    cache.set(CATEGORIES_KEY, [(f.id, f.name, f.slug) for f in facets], timeout)
+    cache.set_many({_count_key(f.id): f.active_count for f in facets}, timeout)
+    return facets
+
+
+def category_facets():
+    """Categories in name order, each with its number of active listings."""
+    categories = cache.get(CATEGORIES_KEY)
+    if categories is None:
+        return _recount()
+    counts = cache.get_many([_count_key(pk) for pk, _, _ in categories])
+    if len(counts) < len(categories):
+        return _recount()
+    return [Facet(pk, name, slug, counts[_count_key(pk)]) for pk, name, slug in categories]
+
+
+def find(value):
+    """
+    Resolve a category given by slug, id or (for old links) name from the
+    cached facets, without a query of its own. Returns None if unknown.
+    """
+    if not value:
+        return None
+    for facet in category_facets():
+        if value in (facet.slug, str(facet.id), facet.name):
+            return facet
+    return None
+
+
+def adjust(category_id, delta):
+    """Add ``delta`` to a category's active count once the transaction commits."""
+    if category_id is None:
+        return
+
+    def apply():
+        try:
+            cache.incr(_count_key(category_id), delta)
+        except ValueError:
+            # Not cached; the next read counts everything afresh
+            pass
+    transaction.on_commit(apply)
+
+
+def invalidate():
+    """Recount on the next read, e.g. after bulk changes or new categories."""
+    transaction.on_commit(lambda: cache.delete(CATEGORIES_KEY))
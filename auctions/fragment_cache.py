@@ -0,0 +1,54 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import profiling
+
+
+_lock = threading.Lock()
+_stats = {}
+
+
+def _cache():
+    return caches[getattr(settings, "LISTING_FRAGMENT_CACHE", "default")]
+
+
+def fragment_key(kind, listing):
+    return f"listing-fragment:{kind}:{listing.pk}:{listing.version}"
+
+
+def _count(kind, outcome):
+    with _lock:
+        counts = _stats.setdefault(kind, {"hits": 0, "misses": 0})
+        counts[outcome] += 1
+    profiling.record_cache(hit=outcome == "hits")
+
+
+def get_or_render(kind, listing, render):
+    """
+    Return the cached rendering of one piece of a listing, calling ``render``
+    on a miss. The key includes the listing version, so a bump makes every
+    old fragment unreachable and it simply expires.
+    """
+    cache = _cache()
+    key = fragment_key(kind, listing)
+    html = cache.get(key)
+    if html is not None:
+        _count(kind, "hits")
+        return html
+    _count(kind, "misses")
+    html = render()
+    cache.set(key, html, getattr(settings, "LISTING_FRAGMENT_TIMEOUT", 3600))
+    return html
+
+
+def stats():
+    """Hit and miss counts per fragment kind for this process."""
+    with _lock:
+        return {kind: dict(counts) for kind, counts in _stats.items()}
+
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
@@ -0,0 +1,177 @@
+"""
+A small job queue stored in the Job table.
+
+Jobs are enqueued in the same transaction as the change that causes them,
+so a rolled-back bid never notifies anyone, and run later by `manage.py
+process_jobs`. Workers claim due jobs with a conditional UPDATE and a
+lease, so several can run at once and a crashed worker's jobs are picked
+up again once the lease expires. Finished jobs are kept for
+JOB_RETENTION_HOURS to report throughput and failures.
+"""
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import mail
+from django.db import close_old_connections
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import PENDING, Job
+
+
+logger = logging.getLogger(__name__)
+
+# kind -> function(job, connection) returning the number of emails sent;
+# filled in by notifications.py with @handler
+HANDLERS = {}
+
+# Retry delays double from this, e.g. 30s, 1m, 2m, 4m
+RETRY_BASE_SECONDS = 30
+
+
+def handler(kind):
+    def register(function):
+        HANDLERS[kind] = function
+        return function
+    return register
+
+
+def enqueue(kind, payload, dedupe_key=None, delay=0):
+    """
+    Add a job. With ``dedupe_key``, nothing is added while a job with that
+    key is still waiting to run, so a burst of events makes one job; the
+    ``delay`` gives the burst time to arrive. Returns the new job or None.
+    """
+    if dedupe_key and Job.objects.filter(PENDING, dedupe_key=dedupe_key, claimed_by__isnull=True).exists():
+        return None
+    return Job.objects.create(
+        kind=kind, payload=payload, dedupe_key=dedupe_key, run_at=timezone.now() + timedelta(seconds=delay)
+    )
+
+
+def enqueue_many(kind, payloads):
+    """Add one job per payload in a single INSERT."""
+    now = timezone.now()
+    return Job.objects.bulk_create(Job(kind=kind, payload=payload, run_at=now, created_at=now) for payload in payloads)
+
+
+def _claimable(now):
+    return Q(PENDING, run_at__lte=now) & (Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+
+
+def claim(batch_size, worker):
+    """Lease up to ``batch_size`` due jobs to ``worker`` and return them."""
+    now = timezone.now()
+    ids = list(Job.objects.filter(_claimable(now)).order_by("run_at", "id").values_list("pk", flat=True)[:batch_size])
+    if not ids:
+        return []
+    # Re-check the conditions: another worker may have claimed some of them
+    Job.objects.filter(_claimable(now), pk__in=ids).update(
+        claimed_by=worker,
+        claimed_until=now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+        attempts=F("attempts") + 1,
+    )
+    return list(Job.objects.filter(pk__in=ids, claimed_by=worker).order_by("run_at", "id"))
+
+
+def run(jobs):
+    """Run claimed jobs; returns (succeeded, failed)."""
+    done, failed = [], 0
+    with mail.get_connection() as connection:
+        for job in jobs:
+            try:
+                HANDLERS[job.kind](job, connection)
+            except Exception as exc:
+                logger.exception("Job %s failed", job)
+                _fail(job, exc)
+                failed += 1
+            else:
+                done.append(job.pk)
+    if done:
+        Job.objects.filter(pk__in=done).update(finished_at=timezone.now(), claimed_until=None, last_error="")
+    return len(done), failed
+
+
+def _fail(job, exc):
+    now = timezone.now()
+    changes = {"claimed_by": None, "claimed_until": None, "last_error": f"{type(exc).__name__}: {exc}"}
+    if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+        # Kept as finished with an error until purged, for inspection
+        changes["finished_at"] = now
+    else:
+        changes["run_at"] = now + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (job.attempts - 1))
+    Job.objects.filter(pk=job.pk).update(**changes)
+
+
+def process(batch_size=100, worker=None):
+    """Claim and run one batch; returns (succeeded, failed)."""
+    jobs = claim(batch_size, worker or uuid.uuid4().hex)
+    return run(jobs) if jobs else (0, 0)
+
+
+def purge(now=None):
+    """Delete finished jobs older than JOB_RETENTION_HOURS."""
+    cutoff = (now or timezone.now()) - timedelta(hours=settings.JOB_RETENTION_HOURS)
+    return Job.objects.filter(finished_at__lt=cutoff).delete()[0]
+
+
+def run_worker(batch_size=100, poll_interval=1.0, stop=None):
+    """Process jobs until ``stop`` is set, sleeping when the queue is empty."""
+    stop = stop or threading.Event()
+    worker = uuid.uuid4().hex
+    last_purge = 0
+    while not stop.is_set():
+        succeeded = failed = 0
+        try:
+            succeeded, failed = process(batch_size, worker)
+            if time.monotonic() - last_purge > 3600:
+                purge()
+                last_purge = time.monotonic()
+        except Exception:
+            logger.exception("Processing jobs failed")
+        finally:
+            close_old_connections()
+        if succeeded + failed < batch_size:
+            stop.wait(poll_interval)
+
+
+def stats(window_seconds=300, now=None):
+    """
+    Queue depth by kind (due now / scheduled later) and throughput over the
+    last ``window_seconds``, from the two partial indexes.
+    """
+    now = now or timezone.now()
+    depth = {}
+    pending = Job.objects.filter(PENDING).values("kind").annotate(
+        due=Count("pk", filter=Q(run_at__lte=now)), scheduled=Count("pk", filter=Q(run_at__gt=now)),
+    ).order_by()
+    for row in pending:
+        depth[row["kind"]] = {"due": row["due"], "scheduled": row["scheduled"]}
+    recent = Job.objects.filter(finished_at__gt=now - timedelta(seconds=window_seconds)).aggregate(
+        processed=Count("pk", filter=Q(last_error="")), failed=Count("pk", filter=~Q(last_error="")),
+    )
+    return {
+        "depth": depth,
+        "processed": recent["processed"],
+        "failed": recent["failed"],
+        "rate": recent["processed"] / window_seconds,
+        "window": window_seconds,
+    }
+
+
+def render_metrics():
+    """Queue gauges in Prometheus text format, for the /metrics view."""
+    current = stats()
+    lines = ["# TYPE commerce_job_queue_depth gauge"]
+    for kind, depth in sorted(current["depth"].items()):
+        for state in ("due", "scheduled"):
+            lines.append(f'commerce_job_queue_depth{{kind="{kind}",state="{state}"}} {depth[state]}')
+    lines.append("# TYPE commerce_jobs_processed_per_second gauge")
+    lines.append(f"commerce_jobs_processed_per_second {current['rate']:.3f}")
+    lines.append("# TYPE commerce_jobs_failed_recently gauge")
+    lines.append(f"commerce_jobs_failed_recently {current['failed']}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from auctions import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move auctions closed for longer than ARCHIVE_AFTER_DAYS, with their "
+        "bids, comments and watchers, into the archive tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=float, default=settings.ARCHIVE_AFTER_DAYS,
+            help="Archive auctions closed more than DAYS ago.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=500, help="Listings archived per transaction.")
+        parser.add_argument("--dry-run", action="store_true", help="Only count what would be archived.")
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            count = archive.archivable(days=options["days"]).count()
+            self.stdout.write(f"{count} closed auctions would be archived.")
+            return
+
+        began = time.perf_counter()
+        archived = archive.archive_closed(days=options["days"], chunk_size=options["chunk_size"])
+        elapsed = time.perf_counter() - began
+        rate = archived / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived} closed auctions in {elapsed:.2f}s ({rate:,.0f} auctions/s)."
+        ))
@@ -0,0 +1,117 @@
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib import admin
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from auctions.models import Bid, Category, Comment, Listing, User
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the admin changelists and change forms for listings, bids and "
+        "comments against a large synthetic marketplace (1M bids by default) "
+        "and report latency and queries per page. The data is inserted inside "
+        "a transaction that is rolled back afterwards. --compare-default also "
+        "renders the pages with plain ModelAdmins, whose listing form has a "
+        "<select> of every bid and user; keep --bids small for that."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bids", type=int, default=1_000_000)
+        parser.add_argument("--listings", type=int, default=20_000)
+        parser.add_argument("--users", type=int, default=5_000)
+        parser.add_argument("--repeat", type=int, default=5, help="Requests per page.")
+        parser.add_argument("--compare-default", action="store_true")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                began = time.perf_counter()
+                staff, hot = self.populate(options)
+                self.stdout.write(
+                    f"inserted {options['bids']} bids, {options['listings']} listings and "
+                    f"{options['users']} users in {time.perf_counter() - began:.1f}s"
+                )
+                pages = [
+                    ("listing changelist", Listing, "changelist_view", (), {}),
+                    ("listing changelist ?q=", Listing, "changelist_view", (), {"q": "listing 7"}),
+                    ("listing change form", Listing, "change_view", (str(hot.pk),), {}),
+                    ("bid changelist", Bid, "changelist_view", (), {}),
+                    ("bid changelist ?q=", Bid, "changelist_view", (), {"q": str(hot.pk)}),
+                    ("bid change form", Bid, "change_view", (str(hot.price_id),), {}),
+                    ("comment changelist", Comment, "changelist_view", (), {}),
+                ]
+                self.stdout.write("auctions.admin:")
+                self.measure(staff, pages, lambda model: admin.site._registry[model], options["repeat"])
+                if options["compare_default"]:
+                    self.stdout.write("plain ModelAdmin:")
+                    self.measure(staff, pages, lambda model: admin.ModelAdmin(model, admin.site), 1)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def populate(self, options):
+        staff = User.objects.create_superuser("bench-admin-staff", "staff@example.com")
+        User.objects.bulk_create(
+            (User(username=f"bench-admin-{n}") for n in range(options["users"])), batch_size=5000
+        )
+        category = Category.objects.create(name="bench-admin")
+        Listing.objects.bulk_create(
+            (Listing(title=f"Admin listing {n}", description="Benchmark", starting_bid=Decimal(1),
+                     current_price=Decimal(1), owner=staff, category=category)
+             for n in range(options["listings"])),
+            batch_size=5000,
+        )
+        first_user = User.objects.filter(username="bench-admin-0").values_list("pk", flat=True).get()
+        first_listing = Listing.objects.filter(category=category).order_by("pk").values_list("pk", flat=True)[0]
+        # Generated in SQL: a million model instances would dominate the run.
+        # Half of the bids pile onto the first listing, as on a hot auction.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i + 1 < %s)
+                INSERT INTO auctions_bid (bid, user_id, listing_id, created_at)
+                SELECT 2 + i / 100.0, %s + i %% %s,
+                       CASE WHEN i %% 2 = 0 THEN %s ELSE %s + i %% %s END,
+                       datetime('now')
+                FROM n
+                """,
+                [options["bids"], first_user, options["users"], first_listing, first_listing, options["listings"]],
+            )
+            cursor.execute(
+                """
+                WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i + 1 < %s)
+                INSERT INTO auctions_comment (listing_id, author_id, message)
+                SELECT %s + i %% %s, %s + i %% %s, 'Benchmark comment ' || i FROM n
+                """,
+                [options["bids"] // 10, first_listing, options["listings"], first_user, options["users"]],
+            )
+        top = Bid.objects.filter(listing_id=first_listing).order_by("-bid").first()
+        Listing.objects.filter(pk=first_listing).update(price=top, current_price=top.bid)
+        return staff, Listing.objects.get(pk=first_listing)
+
+    def measure(self, staff, pages, model_admin, repeat):
+        factory = RequestFactory()
+        for label, model, view, args, query in pages:
+            timings = []
+            for _ in range(repeat):
+                request = factory.get("/admin/", query)
+                request.user = staff
+                with CaptureQueriesContext(connection) as queries:
+                    began = time.perf_counter()
+                    response = getattr(model_admin(model), view)(request, *args)
+                    response.render()
+                    timings.append((time.perf_counter() - began) * 1000)
+            self.stdout.write(
+                f"  {label:<24} p50 {statistics.median(timings):9.1f} ms   max {max(timings):9.1f} ms   "
+                f"{len(queries):3d} queries   {len(response.content) // 1024:7d} KiB"
+            )
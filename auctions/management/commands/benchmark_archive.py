@@ -0,0 +1,142 @@
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from auctions import archive, search, summaries
+from auctions.models import Bid, Comment, Listing, User
+from auctions.pagination import paginate
+
+
+TABLES = (Listing, Bid, Comment, Listing.watchlist.through)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Build a marketplace where most auctions closed long ago, then report "
+        "table sizes and the latency of common queries before and after "
+        "archiving them. Everything runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listings", type=int, default=100_000)
+        parser.add_argument("--closed", type=float, default=0.8, help="Fraction of listings closed long ago.")
+        parser.add_argument("--bids", type=int, default=1_000_000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                began = time.perf_counter()
+                watcher = self.populate(options)
+                self.stdout.write(f"populated in {time.perf_counter() - began:.1f}s")
+                before = self.measure(watcher, options["repeat"])
+                began = time.perf_counter()
+                archived = archive.archive_closed(chunk_size=500)
+                self.stdout.write(f"archived {archived} listings in {time.perf_counter() - began:.1f}s")
+                after = self.measure(watcher, options["repeat"])
+                self.report(before, after)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def populate(self, options):
+        now = timezone.now()
+        owner = User.objects.create(username="bench-archive-owner")
+        watcher = User.objects.create(username="bench-archive-watcher")
+        closedCount = int(options["listings"] * options["closed"])
+        Listing.objects.bulk_create(
+            (Listing(
+                title=f"Archive listing {n}", description="Archive benchmark " * 10, starting_bid=Decimal(1),
+                current_price=Decimal(1), owner=owner, is_active=n >= closedCount,
+                closed_at=now - timedelta(days=365) if n < closedCount else None,
+                ends_at=now + timedelta(days=7),
+            ) for n in range(options["listings"])),
+            batch_size=5000,
+        )
+        ids = list(Listing.objects.filter(owner=owner).order_by("pk").values_list("pk", flat=True))
+        first = ids[0]
+        # Spread bids and comments over every listing, in SQL for speed
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i + 1 < %s)
+                INSERT INTO auctions_bid (bid, user_id, listing_id, created_at)
+                SELECT 2 + i / 100.0, %s, %s + i %% %s, datetime('now') FROM n
+                """,
+                [options["bids"], watcher.pk, first, len(ids)],
+            )
+            cursor.execute(
+                """
+                WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i + 1 < %s)
+                INSERT INTO auctions_comment (listing_id, author_id, message, created_at)
+                SELECT %s + i %% %s, %s, 'Benchmark comment ' || i, datetime('now') FROM n
+                """,
+                [options["bids"] // 10, first, len(ids), owner.pk],
+            )
+        watcher.listingWatchlist.add(*ids[::10])
+        summaries.rebuild(Listing.objects.filter(owner=owner))
+        return watcher
+
+    def measure(self, watcher, repeat):
+        results = {"sizes": {model._meta.db_table: self.table_size(model) for model in TABLES}}
+        queries = {
+            "active feed page": lambda: paginate(Listing.objects.active().for_cards(), None, None, "newest"),
+            "search 'archive listing'": lambda: search.search("archive listing"),
+            "watchlist page": lambda: list(watcher.listingWatchlist.for_cards()),
+            "user's bid count": lambda: Bid.objects.filter(user=watcher).count(),
+            "expired auctions scan": lambda: list(Listing.objects.expired()[:1000]),
+            "summary drift check": lambda: sum(1 for _ in summaries.find_drift()),
+        }
+        for label, query in queries.items():
+            query()
+            timings = []
+            for _ in range(repeat if "drift" not in label else 3):
+                began = time.perf_counter()
+                query()
+                timings.append((time.perf_counter() - began) * 1000)
+            results[label] = statistics.median(timings)
+        return results
+
+    def table_size(self, model):
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}")
+            rows = cursor.fetchone()[0]
+            size = None
+            if connection.vendor == "sqlite":
+                # Table plus its indexes; needs SQLite's dbstat table
+                try:
+                    cursor.execute(
+                        "SELECT SUM(s.pgsize) FROM dbstat s JOIN sqlite_master m ON m.name = s.name "
+                        "WHERE m.tbl_name = %s",
+                        [table],
+                    )
+                    size = cursor.fetchone()[0]
+                except Exception:
+                    pass
+        return rows, size
+
+    def report(self, before, after):
+        self.stdout.write("table sizes (rows, table + indexes):")
+        for table, (rows, size) in before["sizes"].items():
+            rowsAfter, sizeAfter = after["sizes"][table]
+            self.stdout.write(
+                f"  {table:<28} {rows:>9} -> {rowsAfter:>9} rows   "
+                f"{self.mib(size):>8} -> {self.mib(sizeAfter):>8}"
+            )
+        self.stdout.write("query p50 latency:")
+        for label in before:
+            if label != "sizes":
+                self.stdout.write(f"  {label:<28} {before[label]:9.2f} -> {after[label]:9.2f} ms")
+
+    def mib(self, size):
+        return "?" if size is None else f"{size / 2 ** 20:.1f} MiB"
@@ -0,0 +1,103 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+
+from auctions import bidding
+from auctions.models import Category, Listing, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire many simultaneous bids at one listing and report accepted bids/sec "
+        "and whether any accepted bid was lost. Runs against the configured "
+        "default database, so point DJANGO_SETTINGS_MODULE at a server database "
+        "to benchmark it too."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bids", type=int, default=2000, help="Total number of bids to place.")
+        parser.add_argument("--threads", type=int, default=32, help="Number of concurrent bidders.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--keep", action="store_true", help="Keep the benchmark listing and users.")
+
+    def handle(self, *args, **options):
+        total, threads = options["bids"], options["threads"]
+        rng = random.Random(options["seed"])
+
+        users = [
+            User.objects.get_or_create(username=f"bench-bidder-{n}")[0]
+            for n in range(threads)
+        ]
+        category, _ = Category.objects.get_or_create(name="Benchmark")
+        listing = Listing.objects.create(
+            title="Bid benchmark", description="Contended bidding benchmark",
+            starting_bid=Decimal("1.00"), owner=users[0], category=category,
+        )
+
+        # Amounts mostly increase but arrive out of order, so there is a mix
+        # of accepted and outbid results like a real bidding war
+        amounts = [Decimal("1.00") + Decimal(n + 1) / 100 for n in range(total)]
+        for n in range(0, total, threads):
+            chunk = amounts[n:n + threads]
+            rng.shuffle(chunk)
+            amounts[n:n + threads] = chunk
+
+        start = threading.Barrier(threads)
+        counter = iter(range(total))
+        lock = threading.Lock()
+        accepted, statuses, errors = [], {}, 0
+
+        def bidder(user):
+            nonlocal errors
+            start.wait()
+            try:
+                while True:
+                    with lock:
+                        n = next(counter, None)
+                    if n is None:
+                        return
+                    try:
+                        result = bidding.place_bid(listing.pk, user, amounts[n])
+                    except OperationalError:
+                        with lock:
+                            errors += 1
+                        continue
+                    with lock:
+                        statuses[result.status] = statuses.get(result.status, 0) + 1
+                        if result.accepted:
+                            accepted.append(result.bid.bid)
+            finally:
+                connection.close()
+
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(bidder, users))
+        elapsed = time.perf_counter() - began
+
+        listing.refresh_from_db()
+        final_price = bidding.current_price(listing)
+        highest = max(accepted, default=listing.starting_bid)
+        lost = sum(1 for amount in accepted if amount > final_price)
+
+        self.stdout.write(f"database:        {connection.vendor}")
+        self.stdout.write(f"bids placed:     {total} from {threads} threads in {elapsed:.2f}s")
+        for status, count in sorted(statuses.items()):
+            self.stdout.write(f"  {status:<16} {count}")
+        self.stdout.write(f"  {'errors':<16} {errors}")
+        self.stdout.write(f"accepted bids/s: {len(accepted) / elapsed:.1f}")
+        self.stdout.write(f"total bids/s:    {total / elapsed:.1f}")
+        self.stdout.write(f"final price:     {final_price} (highest accepted {highest})")
+        self.stdout.write(f"ledger rows:     {bidding.bid_count(listing)}")
+        if lost or final_price != highest or bidding.bid_count(listing) != len(accepted):
+            self.stdout.write(self.style.ERROR(f"lost updates:    {lost}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("lost updates:    0"))
+
+        if not options["keep"]:
+            listing.delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
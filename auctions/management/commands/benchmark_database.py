@@ -0,0 +1,132 @@
+import itertools
+import random
+import statistics
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection
+
+from auctions import bidding
+from auctions.models import Listing, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Run concurrent readers (feed and listing queries) and writers (bids) "
+        "against the default database for a fixed time and report throughput, "
+        "latency and 'database is locked' errors. Every operation is wrapped "
+        "like a request, so connections are reused or reopened according to "
+        "CONN_MAX_AGE. Compare DATABASE_PROFILE=production with the default "
+        "profile; WAL mode is stored in the database file, so switch it back "
+        "with --journal-mode delete before measuring the default."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument("--writers", type=int, default=4)
+        parser.add_argument("--seconds", type=float, default=10)
+        parser.add_argument("--listings", type=int, default=200, help="Benchmark listings to read and bid on.")
+        parser.add_argument("--journal-mode", choices=["delete", "wal"], help="Set the file's journal mode first.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options["journal_mode"]:
+            with connection.cursor() as cursor:
+                cursor.execute(f"PRAGMA journal_mode={options['journal_mode']}")
+            connection.close()
+
+        owner = User.objects.create(username="bench-db-owner")
+        bidders = User.objects.bulk_create(
+            User(username=f"bench-db-bidder-{n}") for n in range(options["writers"])
+        )
+        listings = Listing.objects.bulk_create(
+            Listing(title=f"Database benchmark {n}", description="Mixed load " * 40,
+                    starting_bid=Decimal(1), current_price=Decimal(1), owner=owner)
+            for n in range(options["listings"])
+        )
+        listing_ids = [listing.pk for listing in listings]
+        connection.close()
+
+        try:
+            self.report(self.run(listing_ids, bidders, options), options)
+        finally:
+            Listing.objects.filter(pk__in=listing_ids).delete()
+            User.objects.filter(pk__in=[owner.pk] + [user.pk for user in bidders]).delete()
+
+    def run(self, listing_ids, bidders, options):
+        deadline = time.perf_counter() + options["seconds"]
+        start = threading.Barrier(options["readers"] + options["writers"])
+        amounts = itertools.count(2)
+        lock = threading.Lock()
+        results = {"read": [], "write": []}
+        errors = {"read": 0, "write": 0}
+
+        def read(rng):
+            list(Listing.objects.active().for_cards().order_by("-created_at", "-id")[:24])
+            Listing.objects.select_related("owner", "price").get(pk=rng.choice(listing_ids))
+
+        def write(rng, user):
+            with lock:
+                amount = Decimal(next(amounts))
+            bidding.place_bid(rng.choice(listing_ids), user, amount)
+
+        def worker(kind, operation, seed):
+            rng = random.Random(seed)
+            timings = []
+            start.wait()
+            try:
+                while time.perf_counter() < deadline:
+                    began = time.perf_counter()
+                    # The same bookkeeping Django does at request start and end
+                    close_old_connections()
+                    try:
+                        operation(rng)
+                    except OperationalError:
+                        with lock:
+                            errors[kind] += 1
+                        continue
+                    finally:
+                        close_old_connections()
+                    timings.append(time.perf_counter() - began)
+            finally:
+                connection.close()
+                with lock:
+                    results[kind].extend(timings)
+
+        threads = [
+            threading.Thread(target=worker, args=("read", read, options["seed"] + n))
+            for n in range(options["readers"])
+        ] + [
+            threading.Thread(target=worker, args=("write", lambda rng, user=user: write(rng, user), -n - 1))
+            for n, user in enumerate(bidders)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, errors
+
+    def report(self, measured, options):
+        results, errors = measured
+        with connection.cursor() as cursor:
+            journal_mode = cursor.execute("PRAGMA journal_mode").fetchone()[0]
+            synchronous = cursor.execute("PRAGMA synchronous").fetchone()[0]
+        self.stdout.write(
+            f"journal_mode={journal_mode} synchronous={synchronous} "
+            f"CONN_MAX_AGE={settings.DATABASES['default'].get('CONN_MAX_AGE', 0)} "
+            f"readers={options['readers']} writers={options['writers']} seconds={options['seconds']}"
+        )
+        for kind in ("read", "write"):
+            timings = sorted(results[kind])
+            if not timings:
+                self.stdout.write(f"{kind:<6} no successful operations, {errors[kind]} errors")
+                continue
+            self.stdout.write(
+                f"{kind:<6} {len(timings) / options['seconds']:>8.0f} ops/s   "
+                f"p50 {statistics.median(timings) * 1000:6.2f} ms   "
+                f"p95 {timings[int(len(timings) * 0.95) - 1] * 1000:7.2f} ms   "
+                f"errors {errors[kind]}"
+            )
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import statistics
+import time
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from auctions import bidding, events
+from auctions.models import Listing, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Open many idle server-sent event streams on one listing through the "
+        "ASGI application in-process, place bids, and report the fan-out "
+        "latency from placing a bid to each subscriber receiving it. Creates a "
+        "temporary listing and users and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--subscribers", type=int, default=2000)
+        parser.add_argument("--bids", type=int, default=20)
+        parser.add_argument("--interval", type=float, default=0.05, help="Seconds between bids.")
+
+    def handle(self, *args, **options):
+        owner = User.objects.create(username="bench-events-owner")
+        bidder = User.objects.create(username="bench-events-bidder")
+        listing = Listing.objects.create(
+            title="Event benchmark", description="Fan-out benchmark", starting_bid=Decimal(1), owner=owner
+        )
+        try:
+            asyncio.run(self.run(listing, bidder, options))
+        finally:
+            listing.delete()
+            owner.delete()
+            bidder.delete()
+
+    async def run(self, listing, bidder, options):
+        application = ASGIHandler()
+        path = reverse("listingEvents", args=(listing.pk,))
+        subscribers = options["subscribers"]
+        placed_at = {}
+        latencies = []
+        ready = asyncio.Event()
+        connected = 0
+        hang_up = asyncio.Event()
+
+        async def subscriber():
+            nonlocal connected
+            scope = {
+                "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+                "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+                "query_string": b"", "root_path": "", "headers": [(b"host", b"localhost")],
+                "client": ("127.0.0.1", 0), "server": ("localhost", 80),
+            }
+            requested = False
+
+            async def receive():
+                nonlocal requested
+                if not requested:
+                    requested = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                await hang_up.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                nonlocal connected
+                if message["type"] == "http.response.start" and message["status"] != 200:
+                    raise CommandError(f"event stream answered {message['status']}")
+                if message["type"] != "http.response.body":
+                    return
+                for block in message.get("body", b"").decode().split("\n\n"):
+                    if block.startswith("event: snapshot"):
+                        connected += 1
+                        if connected == subscribers:
+                            ready.set()
+                    elif block.startswith("event: bid"):
+                        data = json.loads(block.split("data: ", 1)[1])
+                        latencies.append(time.perf_counter() - placed_at[data["current_price"]])
+
+            await application(scope, receive, send)
+
+        tasks = [asyncio.create_task(subscriber()) for _ in range(subscribers)]
+        began = time.perf_counter()
+        await asyncio.wait_for(ready.wait(), timeout=300)
+        self.stdout.write(
+            f"{subscribers} subscribers connected in {time.perf_counter() - began:.2f}s "
+            f"({events.broker.subscriber_count()} registered with the broker)"
+        )
+
+        place_bid = sync_to_async(bidding.place_bid, thread_sensitive=False)
+        for n in range(options["bids"]):
+            amount = Decimal(2 + n)
+            placed_at[f"{amount:.2f}"] = time.perf_counter()
+            await place_bid(listing.pk, bidder, amount)
+            await asyncio.sleep(options["interval"])
+        await asyncio.sleep(1)
+
+        hang_up.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        expected = subscribers * options["bids"]
+        latencies.sort()
+        self.stdout.write(f"delivered {len(latencies)} of {expected} bid events")
+        if latencies:
+            self.stdout.write(
+                f"fan-out latency  p50 {statistics.median(latencies) * 1000:.1f} ms   "
+                f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms   "
+                f"max {latencies[-1] * 1000:.1f} ms"
+            )
@@ -0,0 +1,68 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from auctions import expiry
+from auctions.models import Bid, Listing, User
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure how many expired auctions per second close_expired() can "
+        "close. Synthetic listings are created inside a transaction that is "
+        "rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listings", type=int, default=100000)
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options["listings"], options["chunk_size"], random.Random(options["seed"]))
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, count, chunk_size, rng):
+        now = timezone.now()
+        owner = User.objects.create(username="bench-expiry-owner")
+        bidder = User.objects.create(username="bench-expiry-bidder")
+        listings = Listing.objects.bulk_create(
+            (Listing(
+                title=f"Expiring {n}", description="Expiry benchmark", starting_bid=Decimal(1),
+                current_price=Decimal(1), owner=owner, ends_at=now - timedelta(minutes=rng.randint(1, 600)),
+            ) for n in range(count)),
+            batch_size=5000,
+        )
+        # Half of the auctions have a bid, so half of them get a winner
+        Bid.objects.bulk_create(
+            (Bid(bid=Decimal(2), user=bidder, listing=listing) for listing in listings[::2]),
+            batch_size=5000,
+        )
+        first, last = listings[0].pk, listings[-1].pk
+        generated = Listing.objects.filter(pk__gte=first, pk__lte=last)
+        generated.filter(bids__isnull=False).update(
+            price=Subquery(Bid.objects.filter(listing=OuterRef("pk")).values("pk")[:1])
+        )
+
+        began = time.perf_counter()
+        closed = expiry.close_expired(now=now, chunk_size=chunk_size)
+        elapsed = time.perf_counter() - began
+        winners = generated.filter(winner=bidder).count()
+        self.stdout.write(
+            f"closed {closed} auctions ({winners} with a winner) in {elapsed:.2f}s "
+            f"in chunks of {chunk_size}: {closed / elapsed / 1000:.1f} thousand auctions/s"
+        )
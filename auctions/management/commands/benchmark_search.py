@@ -0,0 +1,69 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from auctions import search
+from auctions.models import Category, Listing, User
+from auctions.synthetic import TextGenerator
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare search latency of the FTS5 index against an icontains scan. "
+        "Synthetic listings are inserted inside a transaction that is rolled "
+        "back afterwards, so the database is left untouched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listings", type=int, default=100000)
+        parser.add_argument("--queries", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        if not search.has_fts_index():
+            raise CommandError("This database has no FTS5 listing index to benchmark.")
+        words = TextGenerator(random.Random(options["seed"]))
+        try:
+            with transaction.atomic():
+                owner = User.objects.create(username="bench-search-owner")
+                category = Category.objects.create(name="bench-search")
+                began = time.perf_counter()
+                batch = []
+                for n in range(options["listings"]):
+                    batch.append(Listing(
+                        title=words.text(4)[:54], description=words.text(60), starting_bid=Decimal(1),
+                        current_price=Decimal(1), owner=owner, category=category,
+                    ))
+                    if len(batch) == 5000:
+                        Listing.objects.bulk_create(batch)
+                        batch = []
+                Listing.objects.bulk_create(batch)
+                self.stdout.write(
+                    f"inserted {options['listings']} listings (FTS kept in sync by triggers) "
+                    f"in {time.perf_counter() - began:.1f}s"
+                )
+
+                queries = [words.query() for _ in range(options["queries"])]
+                for label, use_fts in (("fts5", True), ("icontains", False)):
+                    timings = []
+                    for query in queries:
+                        start = time.perf_counter()
+                        search.search(query, use_fts=use_fts)
+                        timings.append((time.perf_counter() - start) * 1000)
+                    timings.sort()
+                    self.stdout.write(
+                        f"{label:<10} p50 {statistics.median(timings):8.2f} ms   "
+                        f"p95 {timings[int(len(timings) * 0.95) - 1]:8.2f} ms   "
+                        f"max {timings[-1]:8.2f} ms"
+                    )
+                raise Rollback
+        except Rollback:
+            pass
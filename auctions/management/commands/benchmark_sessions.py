@@ -0,0 +1,68 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from auctions.models import User
+
+
+PLAIN_BACKEND = "django.contrib.auth.backends.ModelBackend"
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Request an authenticated page repeatedly under each session mode "
+        "(SESSION_ENGINES), with and without the cached user lookup, and "
+        "report the database queries and p50 latency per request. The user "
+        "and its sessions are created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url-name", default="watchlist", help="Page to request (a URL name).")
+        parser.add_argument("--requests", type=int, default=500)
+
+    def handle(self, *args, **options):
+        url = reverse(options["url_name"])
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user("bench-sessions", "bench@example.com", "bench")
+                self.stdout.write(f"GET {url}, {options['requests']} requests each")
+                for mode, engine in settings.SESSION_ENGINES.items():
+                    for cached in (False, True):
+                        backends = settings.AUTHENTICATION_BACKENDS if cached else [PLAIN_BACKEND]
+                        with override_settings(SESSION_ENGINE=engine, AUTHENTICATION_BACKENDS=backends):
+                            self.measure(f"{mode}, user cache {'on' if cached else 'off'}",
+                                         user, url, options["requests"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def measure(self, label, user, url, requests):
+        cache.clear()
+        client = Client(SERVER_NAME="localhost")
+        client.force_login(user)
+        # Warm up: fill the session and user caches and the URL resolver
+        for _ in range(3):
+            client.get(url)
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(requests):
+                began = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - began) * 1000)
+        if response.status_code != 200 or not response.wsgi_request.user.is_authenticated:
+            self.stderr.write(f"{label}: unexpected response {response.status_code}")
+        self.stdout.write(
+            f"  {label:<32} {len(queries) / requests:5.2f} queries/request   "
+            f"p50 {statistics.median(timings):6.2f} ms"
+        )
@@ -0,0 +1,106 @@
+import os
+import re
+import tempfile
+from decimal import Decimal
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from auctions.models import Category, Listing, User
+
+
+ASSET = re.compile(r'(?:href|src)="([^"]+)"')
+CSS_URL = re.compile(r"""url\(\s*['"]?([^'")]+)""")
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Collect static files into a temporary STATIC_ROOT and report, per "
+        "page, the static bytes and requests a browser needs on its first and "
+        "later visits, as plain uncompressed files revalidated on every page "
+        "(before) and as hashed, compressed, immutable files (after)."
+    )
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as root, override_settings(
+            STATIC_ROOT=root, DEBUG=False, ALLOWED_HOSTS=["localhost"],
+        ):
+            call_command("collectstatic", interactive=False, verbosity=0)
+            try:
+                with transaction.atomic():
+                    self.run()
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def run(self):
+        staff = User.objects.create_superuser("bench-static-staff", "staff@example.com")
+        category = Category.objects.create(name="bench-static")
+        listing = Listing.objects.create(
+            title="Static benchmark", description="Benchmark", starting_bid=Decimal(1), owner=staff, category=category,
+        )
+        client = Client(SERVER_NAME="localhost")
+        client.force_login(staff)
+        pages = {
+            "index": reverse("index"),
+            "listing": reverse("listing", args=(listing.pk,)),
+            "admin listings": reverse("admin:auctions_listing_changelist"),
+            "admin listing form": reverse("admin:auctions_listing_change", args=(listing.pk,)),
+        }
+        # Reverse of the manifest: hashed name -> the plain name served before
+        plain = {hashed: name for name, hashed in staticfiles_storage.hashed_files.items()}
+        totals = {"before": 0, "gzip": 0, "br": 0}
+        self.stdout.write(
+            f"{'page':<20} {'html':>10} {'assets':>6} {'before':>11} {'gzip':>11} {'br':>11}   later visits"
+        )
+        for label, url in pages.items():
+            html = client.get(url).content.decode()
+            assets = self.assets(url, html)
+            before = sum(os.path.getsize(staticfiles_storage.path(plain.get(name, name))) for name in assets)
+            after = {encoding: sum(self.transferred(client, name, encoding) for name in assets)
+                     for encoding in ("gzip", "br")}
+            totals["before"] += before
+            for encoding, size in after.items():
+                totals[encoding] += size
+            self.stdout.write(
+                f"{label:<20} {self.size(len(html)):>10} {len(assets):>6} {self.size(before):>11} "
+                f"{self.size(after['gzip']):>11} {self.size(after['br']):>11}   "
+                f"{len(assets)} conditional requests -> none"
+            )
+        self.stdout.write(
+            f"{'sum of pages':<20} {'':>10} {'':>6} {self.size(totals['before']):>11} "
+            f"{self.size(totals['gzip']):>11} {self.size(totals['br']):>11}"
+        )
+
+    def assets(self, page_url, html):
+        """Static names the page loads, including url()s in its stylesheets."""
+        prefix = settings.STATIC_URL
+        found, pending = [], [urljoin(page_url, link) for link in ASSET.findall(html)]
+        while pending:
+            url = pending.pop()
+            name = url.split("?")[0].removeprefix(prefix)
+            if not url.startswith(prefix) or name in found:
+                continue
+            found.append(name)
+            if name.endswith(".css"):
+                with staticfiles_storage.open(name) as file:
+                    css = file.read().decode()
+                pending += [urljoin(url, link) for link in CSS_URL.findall(css) if not link.startswith("data:")]
+        return found
+
+    def transferred(self, client, name, encoding):
+        response = client.get(settings.STATIC_URL + name, HTTP_ACCEPT_ENCODING=encoding)
+        return len(response.getvalue()) if response.status_code == 200 else 0
+
+    def size(self, size):
+        return f"{size:,} B"
@@ -0,0 +1,128 @@
+import json
+import random
+import statistics
+import subprocess
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from auctions.models import Listing, User
+from auctions.synthetic import TextGenerator, skewed_index
+
+
+def percentile(sorted_values, fraction):
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the main views at a fixed concurrency and report p50/p95/p99 "
+        "latency, throughput and queries per request for each endpoint. By "
+        "default requests go through the test client in-process; pass --url to "
+        "hit a running server instead (query counts are then unavailable)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint.")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--url", help="Base URL of a running server, e.g. http://127.0.0.1:8000")
+        parser.add_argument("--username", help="User to log in as for authenticated endpoints.")
+        parser.add_argument("--output", help="Write the results as JSON to this file.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        listing_ids = list(
+            Listing.objects.active().order_by("-watcher_count").values_list("pk", flat=True)[:1000]
+        )
+        if not listing_ids:
+            raise CommandError("No active listings; run `manage.py generate_marketplace` first.")
+        words = TextGenerator(random.Random(options["seed"]))
+
+        # Each endpoint is a name and a function producing the next path to fetch
+        endpoints = [
+            ("index", lambda: reverse("index")),
+            ("index_popular", lambda: reverse("index") + "?sort=popular"),
+            ("search", lambda: reverse("search") + "?q=" + words.query().replace(" ", "+")),
+            ("listing", lambda: reverse("listing", args=(listing_ids[skewed_index(rng, len(listing_ids))],))),
+        ]
+        user = None
+        if options["url"] is None:
+            user = User.objects.filter(username=options["username"]).first() if options["username"] \
+                else User.objects.order_by("pk").first()
+            if user is not None:
+                endpoints.append(("watchlist", lambda: reverse("watchlist")))
+
+        local = threading.local()
+
+        def fetch(path):
+            """Fetch one path and return (seconds, queries or None)."""
+            if options["url"]:
+                began = time.perf_counter()
+                with urllib.request.urlopen(options["url"].rstrip("/") + path) as response:
+                    response.read()
+                return time.perf_counter() - began, None
+            if not hasattr(local, "client"):
+                local.client = Client(SERVER_NAME="localhost")
+                if user is not None:
+                    local.client.force_login(user)
+            with CaptureQueriesContext(connection) as queries:
+                began = time.perf_counter()
+                response = local.client.get(path)
+                elapsed = time.perf_counter() - began
+            if response.status_code >= 400:
+                raise CommandError(f"GET {path} returned {response.status_code}")
+            return elapsed, len(queries)
+
+        results = {}
+        for name, next_path in endpoints:
+            paths = [next_path() for _ in range(options["requests"])]
+            began = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+                samples = list(pool.map(fetch, paths))
+            wall = time.perf_counter() - began
+
+            latencies = sorted(seconds * 1000 for seconds, _ in samples)
+            queries = [count for _, count in samples if count is not None]
+            results[name] = {
+                "requests": len(samples),
+                "throughput_rps": round(len(samples) / wall, 1),
+                "p50_ms": round(percentile(latencies, 0.50), 2),
+                "p95_ms": round(percentile(latencies, 0.95), 2),
+                "p99_ms": round(percentile(latencies, 0.99), 2),
+                "queries_per_request": round(statistics.mean(queries), 2) if queries else None,
+            }
+            row = results[name]
+            self.stdout.write(
+                f"{name:<14} {row['throughput_rps']:>8} req/s   p50 {row['p50_ms']:>8} ms   "
+                f"p95 {row['p95_ms']:>8} ms   p99 {row['p99_ms']:>8} ms   "
+                f"queries {row['queries_per_request']}"
+            )
+
+        if options["output"]:
+            report = {
+                "commit": self.current_commit(),
+                "target": options["url"] or "in-process",
+                "concurrency": options["concurrency"],
+                "database": connection.vendor,
+                "endpoints": results,
+            }
+            with open(options["output"], "w") as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def current_commit(self):
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
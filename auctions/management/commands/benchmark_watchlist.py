@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from auctions import watchlist
+from auctions.models import Listing, User
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the watchlist membership check on a listing with many watchers: "
+        "the old full load of listing.watchlist against the indexed existence "
+        "check and the cached per-user ID set. Runs inside a transaction that "
+        "is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--watchers", type=int, default=100000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options["watchers"], options["repeat"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, watchers, repeat):
+        users = User.objects.bulk_create(
+            (User(username=f"bench-watcher-{n}") for n in range(watchers)), batch_size=5000
+        )
+        listing = Listing.objects.create(title="Watched", description="Popular", starting_bid=1, owner=users[0])
+        Watcher = Listing.watchlist.through
+        Watcher.objects.bulk_create(
+            (Watcher(listing_id=listing.pk, user_id=user.pk) for user in users), batch_size=5000
+        )
+        viewer = users[len(users) // 2]
+        self.stdout.write(f"listing with {watchers} watchers, checking one of them {repeat} times")
+
+        checks = [
+            ("user in listing.watchlist.all()", lambda: viewer in listing.watchlist.all()),
+            ("is_watching() exists query", lambda: watchlist.is_watching(viewer, listing.pk)),
+            ("watched_ids() cached set", lambda: listing.pk in watchlist.watched_ids(viewer)),
+        ]
+        for label, check in checks:
+            began = time.perf_counter()
+            for _ in range(repeat):
+                assert check()
+            per_check = (time.perf_counter() - began) / repeat * 1000
+            self.stdout.write(f"{label:<34} {per_check:10.3f} ms per check")
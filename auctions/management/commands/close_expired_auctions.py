@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from auctions import expiry
+
+
+class Command(BaseCommand):
+    help = "Close every auction whose end time has passed and record its winner."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Listings closed per transaction.")
+        parser.add_argument(
+            "--interval", type=float,
+            help="Keep running, closing expired auctions every INTERVAL seconds.",
+        )
+
+    def handle(self, *args, **options):
+        if options["interval"]:
+            self.stdout.write(f"Closing expired auctions every {options['interval']}s; Ctrl-C to stop.")
+            try:
+                expiry.run_periodically(options["interval"], options["chunk_size"])
+            except KeyboardInterrupt:
+                return
+
+        began = time.perf_counter()
+        closed = expiry.close_expired(chunk_size=options["chunk_size"])
+        elapsed = time.perf_counter() - began
+        rate = closed / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Closed {closed} expired auctions in {elapsed:.2f}s ({rate:,.0f} auctions/s)."
+        ))
@@ -0,0 +1,20 @@
+from django.contrib.staticfiles.management.commands import collectstatic
+
+
+class Command(collectstatic.Command):
+    help = (
+        "Collect static files into STATIC_ROOT under content-hashed names, "
+        "with gzip and brotli variants, and report the compression."
+    )
+
+    def handle(self, **options):
+        summary = super().handle(**options)
+        stats = getattr(self.storage, "compression_stats", None)
+        if stats and self.verbosity >= 1:
+            for suffix, (files, original, compressed) in stats.items():
+                if files:
+                    self.stdout.write(
+                        f"{suffix}: {files} files, {original / 1024:.1f} KiB -> {compressed / 1024:.1f} KiB "
+                        f"({100 * compressed / original:.0f}%)"
+                    )
+        return summary
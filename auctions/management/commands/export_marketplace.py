@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions import bulk
+
+
+class Command(BaseCommand):
+    help = (
+        "Write every listing, bid or comment to a CSV or JSONL file (or - for "
+        "stdout), streaming rows in primary-key order in constant memory. The "
+        "output loads back with import_marketplace."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(bulk.FIELDS))
+        parser.add_argument("path", help="File to write, or - for stdout.")
+        parser.add_argument("--format", choices=bulk.FORMATS, help="Defaults to the file extension.")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Rows fetched per database round trip.")
+
+    def handle(self, *args, **options):
+        kind, path = options["kind"], options["path"]
+        fmt = options["format"] or bulk.guess_format(path)
+        if fmt is None:
+            raise CommandError("Cannot tell the format from the file name; pass --format.")
+        began = time.perf_counter()
+
+        rows = bulk.export_rows(kind, chunk_size=options["chunk_size"])
+        if path == "-":
+            exported = bulk.write_rows(self.stdout, fmt, bulk.FIELDS[kind], rows)
+            # Keep the summary out of the exported data
+            report = self.stderr
+        else:
+            with open(path, "w", newline="", encoding="utf-8") as stream:
+                exported = bulk.write_rows(stream, fmt, bulk.FIELDS[kind], rows)
+            report = self.stdout
+
+        elapsed = time.perf_counter() - began
+        report.write(f"Exported {exported} {kind} in {elapsed:.1f}s ({exported / max(elapsed, 1e-9):.0f} rows/s).")
@@ -0,0 +1,132 @@
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from auctions import facets, summaries
+from auctions.models import Bid, Category, Comment, Listing, User
+from auctions.synthetic import TextGenerator, skewed_index
+
+
+CATEGORY_NAMES = [
+    "Fashion", "Toys", "Electronics", "Home", "Books", "Sports", "Garden",
+    "Music", "Art", "Collectibles", "Motors", "Jewelry",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with a reproducible synthetic marketplace. Activity "
+        "is skewed the way real marketplaces are: a few users and listings "
+        "attract most of the bids, comments and watchers. Every generated user "
+        "has the password given by --password."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--listings", type=int, default=10000)
+        parser.add_argument("--bids", type=int, default=50000)
+        parser.add_argument("--comments", type=int, default=20000)
+        parser.add_argument("--watchers", type=int, default=30000)
+        parser.add_argument("--closed", type=float, default=0.1, help="Fraction of listings already closed.")
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--password", default="password")
+        parser.add_argument("--prefix", default="gen", help="Prefix for generated usernames.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        words = TextGenerator(rng)
+        batch_size = options["batch_size"]
+        began = time.perf_counter()
+
+        def step(label, count):
+            self.stdout.write(f"{label:<12} {count:>9}  ({time.perf_counter() - began:.1f}s)")
+
+        with transaction.atomic():
+            categories = [Category.objects.get_or_create(name=name)[0] for name in CATEGORY_NAMES]
+
+            # Hashing is slow on purpose, so every user shares one hash
+            password = make_password(options["password"])
+            users = User.objects.bulk_create(
+                (User(username=f"{options['prefix']}{n}", email=f"{options['prefix']}{n}@example.com", password=password)
+                 for n in range(options["users"])),
+                batch_size=batch_size,
+            )
+            step("users", len(users))
+
+            listings = []
+            for n in range(options["listings"]):
+                starting_bid = Decimal(rng.randint(100, 50000)) / 100
+                listings.append(Listing(
+                    title=words.text(rng.randint(2, 5))[:54],
+                    description=words.text(rng.randint(20, 120)),
+                    starting_bid=starting_bid,
+                    current_price=starting_bid,
+                    image_url=f"https://picsum.photos/seed/{n}/300/200",
+                    is_active=rng.random() >= options["closed"],
+                    owner=users[skewed_index(rng, len(users))],
+                    category=categories[skewed_index(rng, len(categories), 0.8)],
+                ))
+            listings = Listing.objects.bulk_create(listings, batch_size=batch_size)
+            step("listings", len(listings))
+
+            # Popular listings get most of the activity; shuffle so popularity
+            # is not tied to creation order
+            by_popularity = listings[:]
+            rng.shuffle(by_popularity)
+
+            def popular_listing():
+                return by_popularity[skewed_index(rng, len(by_popularity), 0.7)]
+
+            def active_user():
+                return users[skewed_index(rng, len(users), 0.9)]
+
+            # Bids on each listing must rise, so group them before pricing
+            bids_per_listing = {}
+            for _ in range(options["bids"]):
+                listing = popular_listing()
+                bids_per_listing.setdefault(listing.pk, [listing, 0])[1] += 1
+            bids = []
+            for listing, count in bids_per_listing.values():
+                amount = listing.starting_bid
+                for _ in range(count):
+                    amount += Decimal(rng.randint(1, 500)) / 100
+                    bids.append(Bid(bid=amount, user=active_user(), listing=listing))
+            Bid.objects.bulk_create(bids, batch_size=batch_size)
+            step("bids", len(bids))
+
+            Comment.objects.bulk_create(
+                (Comment(listing=popular_listing(), author=active_user(), message=words.text(rng.randint(3, 30))[:255])
+                 for _ in range(options["comments"])),
+                batch_size=batch_size,
+            )
+            step("comments", options["comments"])
+
+            Watcher = Listing.watchlist.through
+            # Anyone may watch a listing; retry duplicates to reach the target
+            pairs = set()
+            for _ in range(options["watchers"] * 10):
+                if len(pairs) >= options["watchers"]:
+                    break
+                pairs.add((popular_listing().pk, rng.choice(users).pk))
+            Watcher.objects.bulk_create(
+                (Watcher(listing_id=listing_id, user_id=user_id) for listing_id, user_id in pairs),
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+            step("watchers", len(pairs))
+
+            # The whole run is one transaction, so the new listings are one pk range
+            generated = Listing.objects.filter(pk__gte=listings[0].pk, pk__lte=listings[-1].pk)
+            highest = Bid.objects.filter(listing=OuterRef("pk")).order_by("-bid").values("pk")[:1]
+            generated.filter(bids__isnull=False).distinct().update(price=Subquery(highest))
+            summaries.rebuild(generated)
+            facets.invalidate()
+            step("summaries", generated.count())
+
+        self.stdout.write(self.style.SUCCESS(f"Marketplace generated in {time.perf_counter() - began:.1f}s."))
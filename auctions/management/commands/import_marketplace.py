@@ -0,0 +1,97 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from auctions import bulk, facets, summaries
+from auctions.models import Category, Listing, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Load listings, bids or comments from a CSV or JSONL file (or - for "
+        "stdin) in constant memory. Rows are inserted with bulk_create, one "
+        "transaction per batch; owners and categories are looked up by "
+        "username and name. Import listings before their bids and comments. "
+        "Rows with an id keep it, so exported files load with their relations. "
+        "A failing batch stops the import; the batches before it stay loaded."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(bulk.FIELDS))
+        parser.add_argument("path", help="File to read, or - for stdin.")
+        parser.add_argument("--format", choices=bulk.FORMATS, help="Defaults to the file extension.")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per INSERT transaction.")
+        parser.add_argument(
+            "--create-users", action="store_true",
+            help="Create unknown users (without a usable password) instead of failing.",
+        )
+
+    def handle(self, *args, **options):
+        kind, path = options["kind"], options["path"]
+        fmt = options["format"] or bulk.guess_format(path)
+        if fmt is None:
+            raise CommandError("Cannot tell the format from the file name; pass --format.")
+        model = bulk.MODELS[kind]
+        build = bulk.BUILDERS[kind]
+        users = bulk.LookupCache(User, "username", create=bulk.new_user if options["create_users"] else None)
+        categories = bulk.LookupCache(Category, "name", create=bulk.new_category)
+        first_listing = last_listing = None
+        imported = 0
+        began = time.perf_counter()
+
+        try:
+            stream = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+        except OSError as error:
+            raise CommandError(f"Cannot read {path}: {error}")
+        try:
+            with bulk.keep_timestamps(Listing):
+                for number, rows in enumerate(bulk.batched(bulk.read_rows(stream, fmt), options["batch_size"]), 1):
+                    # SQLite checks foreign keys on commit, so the IntegrityError
+                    # for a dangling one comes from leaving the atomic block
+                    try:
+                        with transaction.atomic():
+                            users.resolve({row.get(column) for row in rows for column in bulk.USER_COLUMNS[kind]})
+                            if kind == "listings":
+                                categories.resolve({row.get("category") for row in rows})
+                            objects = [build(row, users, categories) for row in rows]
+                            model.objects.bulk_create(objects)
+                    except (KeyError, ValueError, ArithmeticError, IntegrityError) as error:
+                        raise CommandError(f"Batch {number}: {error}")
+                    imported += len(objects)
+                    if kind != "listings":
+                        # Remember which listings need their price and counters redone
+                        ids = [obj.listing_id for obj in objects if obj.listing_id is not None]
+                        if ids:
+                            first_listing = min(ids) if first_listing is None else min(first_listing, *ids)
+                            last_listing = max(ids) if last_listing is None else max(last_listing, *ids)
+                    elapsed = time.perf_counter() - began
+                    self.stdout.write(f"{imported:>10} {kind}  {imported / elapsed:>9.0f} rows/s", ending="\r")
+        except OSError as error:
+            raise CommandError(f"Cannot read {path}: {error}")
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            self.stdout.write("")
+            # Batches commit one by one, so bring what did commit up to date
+            # even when a later batch fails
+            if imported:
+                bulk.reset_sequences(model)
+                facets.invalidate()
+            if first_listing is not None:
+                self.refresh_listings(first_listing, last_listing, options["batch_size"])
+
+        elapsed = time.perf_counter() - began
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} {kind} in {elapsed:.1f}s ({imported / max(elapsed, 1e-9):.0f} rows/s)."
+        ))
+
+    def refresh_listings(self, first, last, batch_size):
+        # Imported bids and comments bypass the views that keep prices and
+        # counters current, so redo them for the listing ids they touched
+        for low in range(first - 1, last, batch_size):
+            batch = Listing.objects.filter(pk__gt=low, pk__lte=min(low + batch_size, last))
+            with transaction.atomic():
+                bulk.point_prices_at_highest_bids(batch)
+                summaries.rebuild(batch)
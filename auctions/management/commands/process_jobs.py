@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+# Registers the notification job handlers
+from auctions import jobs, notifications  # noqa: F401
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background jobs such as notification emails. Keeps polling the "
+        "queue until interrupted; --once drains the due jobs and exits, and "
+        "--status prints the queue depth and processing rate instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="Jobs claimed per round.")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to wait when idle.")
+        parser.add_argument("--once", action="store_true")
+        parser.add_argument("--status", action="store_true")
+
+    def handle(self, *args, **options):
+        if options["status"]:
+            return self.status()
+        if not options["once"]:
+            self.stdout.write("Processing jobs; Ctrl-C to stop.")
+            try:
+                jobs.run_worker(options["batch_size"], options["poll_interval"])
+            except KeyboardInterrupt:
+                return
+
+        began = time.perf_counter()
+        succeeded = failed = 0
+        while True:
+            done, errors = jobs.process(options["batch_size"])
+            succeeded, failed = succeeded + done, failed + errors
+            if done + errors < options["batch_size"]:
+                break
+        elapsed = time.perf_counter() - began
+        rate = succeeded / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Ran {succeeded} jobs ({failed} failed) in {elapsed:.2f}s ({rate:,.0f} jobs/s)."
+        ))
+
+    def status(self):
+        stats = jobs.stats()
+        for kind, depth in sorted(stats["depth"].items()):
+            self.stdout.write(f"{kind:<16} due {depth['due']:>8}   scheduled {depth['scheduled']:>8}")
+        if not stats["depth"]:
+            self.stdout.write("queue empty")
+        self.stdout.write(
+            f"last {stats['window']}s: {stats['processed']} processed ({stats['rate']:.1f}/s), "
+            f"{stats['failed']} failed"
+        )
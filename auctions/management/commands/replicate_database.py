@@ -0,0 +1,47 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Stand-in for replication when running read replicas locally: copy the "
+        "primary SQLite database into every READ_REPLICAS file with SQLite's "
+        "online backup, once or every --interval seconds. Replicas lag the "
+        "primary by up to one interval, like asynchronous replication."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, help="Keep copying every this many seconds.")
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES["default"]
+        if primary["ENGINE"] != "django.db.backends.sqlite3":
+            raise CommandError("replicate_database only copies SQLite databases.")
+        if not settings.READ_REPLICAS:
+            raise CommandError("No read replicas configured; set READ_REPLICAS.")
+        interval = options["interval"]
+        while True:
+            began = time.perf_counter()
+            self.copy(primary["NAME"], [settings.DATABASES[alias]["NAME"] for alias in settings.READ_REPLICAS])
+            self.stdout.write(
+                f"Copied the primary to {len(settings.READ_REPLICAS)} replicas in "
+                f"{(time.perf_counter() - began) * 1000:.0f} ms."
+            )
+            if interval is None:
+                return
+            time.sleep(interval)
+
+    def copy(self, source_name, replica_names):
+        source = sqlite3.connect(source_name)
+        try:
+            for name in replica_names:
+                replica = sqlite3.connect(name)
+                try:
+                    source.backup(replica)
+                finally:
+                    replica.close()
+        finally:
+            source.close()
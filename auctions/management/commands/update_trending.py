@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from auctions import trending
+
+
+class Command(BaseCommand):
+    help = (
+        "Decay listing trending scores. Run it from cron every --elapsed "
+        "seconds, or pass --interval to keep running."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--elapsed", type=float, default=600,
+            help="Seconds of decay to apply, i.e. how often this command is run.",
+        )
+        parser.add_argument("--interval", type=float, help="Keep running, decaying every INTERVAL seconds.")
+
+    def handle(self, *args, **options):
+        if options["interval"]:
+            self.stdout.write(f"Decaying trending scores every {options['interval']}s; Ctrl-C to stop.")
+            try:
+                trending.run_periodically(options["interval"])
+            except KeyboardInterrupt:
+                return
+
+        began = time.perf_counter()
+        updated = trending.decay(options["elapsed"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Decayed {updated} trending scores in {time.perf_counter() - began:.2f}s."
+        ))
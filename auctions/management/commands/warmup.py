@@ -0,0 +1,85 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from auctions import warmup
+from auctions.models import Listing
+
+
+# Boots the WSGI application in a fresh interpreter, with or without the
+# warm-up, and times the boot and each request; prints the timings as JSON
+PROBE = """
+import json, os, sys, time
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+began = time.perf_counter()
+os.environ["WARM_UP_ON_BOOT"] = sys.argv[1]
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "commerce.settings")
+from commerce.wsgi import application
+boot = (time.perf_counter() - began) * 1000
+
+def get(path):
+    path, _, query = path.partition("?")
+    environ = {"PATH_INFO": path, "QUERY_STRING": query, "HTTP_HOST": "localhost", "wsgi.input": BytesIO()}
+    setup_testing_defaults(environ)
+    began = time.perf_counter()
+    response = application(environ, lambda status, headers: None)
+    b"".join(response)
+    response.close()
+    return (time.perf_counter() - began) * 1000
+
+first = {path: get(path) for path in sys.argv[2:]}
+again = [get(sys.argv[2]) for _ in range(20)]
+print(json.dumps({"boot": boot, "first": first, "again": sorted(again)[10]}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Warm up this process (templates, URL patterns, database connections, "
+        "category cache) and report each step. With --measure, boot fresh "
+        "processes with and without the warm-up and compare boot time and "
+        "first-request latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--measure", type=int, metavar="RUNS", help="Fresh processes to boot per mode.")
+
+    def handle(self, *args, **options):
+        if options["measure"]:
+            return self.measure(options["measure"])
+        for name, (result, ms) in warmup.warm_up().items():
+            outcome = "failed, see the log" if result is None else f"{result} warmed"
+            self.stdout.write(f"  {name:<10} {ms:8.1f} ms   {outcome}")
+
+    def measure(self, runs):
+        listing = Listing.objects.order_by("pk").values_list("pk", flat=True).first()
+        paths = [reverse("index"), reverse("login"), reverse("search") + "?q=lamp"]
+        if listing:
+            paths.append(reverse("listing", args=(listing,)))
+        self.stdout.write(f"{runs} fresh processes per mode; median times in ms")
+        self.stdout.write(
+            f"  {'mode':<10} {'boot':>8} {'1st req':>8} {'ready+1st':>10} {'later':>8}   first hit per page"
+        )
+        for mode, flag in (("cold", "0"), ("warmed", "1")):
+            results = []
+            for _ in range(runs):
+                probe = subprocess.run(
+                    [sys.executable, "-c", PROBE, flag, *paths], capture_output=True, text=True,
+                    cwd=settings.BASE_DIR, env=os.environ, check=True,
+                )
+                results.append(json.loads(probe.stdout.strip().splitlines()[-1]))
+            boot = statistics.median(result["boot"] for result in results)
+            first = {path: statistics.median(result["first"][path] for result in results) for path in paths}
+            later = statistics.median(result["again"] for result in results)
+            self.stdout.write(
+                f"  {mode:<10} {boot:8.1f} {first[paths[0]]:8.1f} {boot + first[paths[0]]:10.1f} {later:8.1f}   "
+                + ", ".join(f"{path} {ms:.1f}" for path, ms in first.items())
+            )
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:39
+
+from django.db import migrations
+from django.db.models import F, OuterRef, Subquery
+
+
+def backfill_bid_listing(apps, schema_editor):
+    # Before the ledger, the only link from a bid to its listing was
+    # Listing.price, so attach each current-price bid to the listing using it.
+    Bid = apps.get_model('auctions', 'Bid')
+    Listing = apps.get_model('auctions', 'Listing')
+    # The old create view saved a bid for the owner at the starting price as
+    # a placeholder price; that is not a bid, so the listing has no price yet
+    unbid = Listing.objects.filter(price__user=F('owner'), price__bid=F('starting_bid'))
+    placeholders = list(unbid.values_list('price_id', flat=True))
+    unbid.update(price=None)
+    Bid.objects.filter(pk__in=placeholders).delete()
+    Bid.objects.filter(listing__isnull=True).update(
+        listing=Subquery(Listing.objects.filter(price=OuterRef('pk')).values('pk')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0010_bid_ledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_bid_listing, migrations.RunPython.noop),
+    ]
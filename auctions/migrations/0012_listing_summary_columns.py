@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:40
+
+from django.db import migrations, models
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_summaries(apps, schema_editor):
+    Listing = apps.get_model('auctions', 'Listing')
+    Bid = apps.get_model('auctions', 'Bid')
+    Comment = apps.get_model('auctions', 'Comment')
+    Watcher = Listing.watchlist.through
+
+    def count(queryset):
+        counted = queryset.values('listing').annotate(n=Count('*')).values('n')
+        return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+    Listing.objects.update(
+        current_price=Coalesce(
+            Subquery(Bid.objects.filter(pk=OuterRef('price_id')).values('bid')[:1]),
+            F('starting_bid'),
+        ),
+        bid_count=count(Bid.objects.filter(listing=OuterRef('pk'))),
+        watcher_count=count(Watcher.objects.filter(listing=OuterRef('pk'))),
+        comment_count=count(Comment.objects.filter(listing=OuterRef('pk'))),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0011_backfill_bid_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='bid_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='current_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='watcher_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['is_active', 'current_price', 'id'], name='listing_active_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['is_active', '-watcher_count', '-id'], name='listing_active_watchers_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['is_active', '-bid_count', '-id'], name='listing_active_bids_idx'),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
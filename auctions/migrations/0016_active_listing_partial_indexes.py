@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0015_listing_ends_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='listing',
+            name='listing_active_feed_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='listing',
+            name='listing_category_feed_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='listing',
+            name='listing_active_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='listing',
+            name='listing_active_watchers_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='listing',
+            name='listing_active_bids_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='listing',
+            name='listing_active_ends_idx',
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at', '-id'], name='listing_active_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', '-created_at', '-id'], name='listing_category_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['current_price', 'id'], name='listing_active_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-watcher_count', '-id'], name='listing_active_watchers_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-bid_count', '-id'], name='listing_active_bids_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['ends_at'], name='listing_active_ends_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:35
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_modified_at(apps, schema_editor):
+    Listing = apps.get_model('auctions', 'Listing')
+    Listing.objects.update(modified_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0017_category_slug'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='modified_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_modified_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:40
+
+import importlib
+
+from django.db import migrations
+
+
+# SQLite can't alter most columns in place, so Django rebuilds
+# auctions_listing for changes like 0014 and 0018, and the rebuild silently
+# drops the FTS triggers. Put them back and reindex everything written since.
+# Any later migration that rebuilds the table needs the same step.
+search_index = importlib.import_module('auctions.migrations.0013_listing_search_index')
+
+
+def restore_search_triggers(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        if 'auctions_listing_fts' not in connection.introspection.table_names(cursor):
+            return
+    for statement in search_index.DROP_SEARCH_INDEX[:3]:
+        schema_editor.execute(statement)
+    # The triggers and the rebuild; the FTS table itself still exists
+    for statement in search_index.CREATE_SEARCH_INDEX[1:]:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0018_listing_modified_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
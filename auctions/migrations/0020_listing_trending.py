@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:05
+
+import importlib
+
+from django.db import migrations, models
+
+
+# Adding the columns rebuilds auctions_listing on SQLite, see 0019
+restore_triggers = importlib.import_module('auctions.migrations.0019_restore_listing_search_triggers')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0019_restore_listing_search_triggers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='view_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='trending_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-trending_score', '-id'], name='listing_active_trending_idx'),
+        ),
+        migrations.RunPython(restore_triggers.restore_search_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:55
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0021_job'),
+    ]
+
+    operations = [
+        # Older comments were never timestamped; they share the migration
+        # time and keep their order through the id tie-breaker
+        migrations.AddField(
+            model_name='comment',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['listing', '-created_at', '-id'], name='comment_listing_created_idx'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_closed_at(apps, schema_editor):
+    # Closing a listing was its last version bump unless it was commented on
+    # afterwards, so this is the closing time or a little later
+    Listing = apps.get_model('auctions', 'Listing')
+    Listing.objects.filter(is_active=False, closed_at__isnull=True).update(closed_at=F('modified_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0022_comment_created_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Nullable without a default, so SQLite adds the column in place and
+        # the listing search triggers survive
+        migrations.AddField(
+            model_name='listing',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_closed_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('is_active', True), _negated=True), fields=['closed_at'], name='listing_closed_idx'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedListing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=54)),
+                ('description', models.TextField()),
+                ('starting_bid', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('image_url', models.URLField(blank=True, null=True)),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archivedListings', to=settings.AUTH_USER_MODEL)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archivedListings', to='auctions.category')),
+                ('winner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='wonArchivedListings', to=settings.AUTH_USER_MODEL)),
+                ('watchlist', models.ManyToManyField(blank=True, related_name='archivedWatchlist', to=settings.AUTH_USER_MODEL)),
+                ('created_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField(blank=True, null=True)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('current_price', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('bid_count', models.PositiveIntegerField(default=0)),
+                ('watcher_count', models.PositiveIntegerField(default=0)),
+                ('comment_count', models.PositiveIntegerField(default=0)),
+                ('view_count', models.PositiveIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedBid',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bid', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archivedBids', to=settings.AUTH_USER_MODEL)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bids', to='auctions.archivedlisting')),
+                ('created_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedComment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='auctions.archivedlisting')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archivedComments', to=settings.AUTH_USER_MODEL)),
+                ('message', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['listing', '-created_at', '-id'], name='archivedcomment_listing_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:05
+
+from django.db import migrations
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def drop_placeholder_bids(apps, schema_editor):
+    # Databases that ran 0011 before it skipped the old create view's
+    # placeholder bids have them in the ledger: counted as a bid, shown in the
+    # history, and, on listings nobody bid on, closed with the owner as winner
+    Bid = apps.get_model('auctions', 'Bid')
+    Listing = apps.get_model('auctions', 'Listing')
+    ArchivedBid = apps.get_model('auctions', 'ArchivedBid')
+    ArchivedListing = apps.get_model('auctions', 'ArchivedListing')
+
+    placeholders = Bid.objects.filter(user=F('listing__owner'), bid=F('listing__starting_bid'))
+    listings = set(placeholders.values_list('listing', flat=True))
+    # A placeholder is only still the price if nobody outbid it
+    Listing.objects.filter(price__in=placeholders).update(price=None, current_price=F('starting_bid'))
+    placeholders.delete()
+    Listing.objects.filter(pk__in=listings).update(
+        bid_count=Coalesce(
+            Subquery(
+                Bid.objects.filter(listing=OuterRef('pk')).values('listing').annotate(n=Count('*')).values('n')
+            ),
+            Value(0),
+        ),
+        version=F('version') + 1,
+        modified_at=timezone.now(),
+    )
+    Listing.objects.filter(pk__in=listings, is_active=False).update(
+        winner=Subquery(Bid.objects.filter(pk=OuterRef('price')).values('user')[:1])
+    )
+
+    placeholders = ArchivedBid.objects.filter(user=F('listing__owner'), bid=F('listing__starting_bid'))
+    listings = set(placeholders.values_list('listing', flat=True))
+    placeholders.delete()
+    top = ArchivedBid.objects.filter(listing=OuterRef('pk')).order_by('-bid', '-id')
+    ArchivedListing.objects.filter(pk__in=listings).update(
+        bid_count=Coalesce(
+            Subquery(
+                ArchivedBid.objects.filter(listing=OuterRef('pk')).values('listing').annotate(n=Count('*')).values('n')
+            ),
+            Value(0),
+        ),
+        current_price=Coalesce(Subquery(top.values('bid')[:1]), F('starting_bid')),
+        winner=Subquery(top.values('user')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0023_listing_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_placeholder_bids, migrations.RunPython.noop),
+    ]
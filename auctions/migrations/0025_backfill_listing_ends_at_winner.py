@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:40
+
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+
+# How long legacy listings stay open from the time of this migration. Fixed
+# here, not read from settings, so every deployment migrates the same way
+LEGACY_DURATION = timedelta(days=7)
+
+
+def backfill_ends_at_and_winner(apps, schema_editor):
+    # 0015 added both columns empty: listings closed before it lost their
+    # winner, and listings still open never reached their end time, so
+    # close_expired left them open for good
+    Bid = apps.get_model('auctions', 'Bid')
+    Listing = apps.get_model('auctions', 'Listing')
+    now = timezone.now()
+    Listing.objects.filter(is_active=False, winner__isnull=True, price__isnull=False).update(
+        winner=Subquery(Bid.objects.filter(pk=OuterRef('price')).values('user')[:1]),
+        version=F('version') + 1,
+        modified_at=now,
+    )
+    # Counted from now rather than created_at, so no legacy listing closes
+    # without notice the moment the closer next runs
+    Listing.objects.filter(is_active=True, ends_at__isnull=True).update(
+        ends_at=now + LEGACY_DURATION,
+        version=F('version') + 1,
+        modified_at=now,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0024_drop_placeholder_bids'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_ends_at_and_winner, migrations.RunPython.noop),
+    ]
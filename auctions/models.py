@@ -1,19 +1,54 @@
 from django.contrib.auth.models import AbstractUser, User
 from django.db import models
+from django.db.models.functions import Substr
+from django.utils import timezone
+from django.utils.text import slugify
 from django.http import HttpResponse
 from django.shortcuts import render
 
 
 class Category(models.Model):
     name = models.CharField(max_length=64, unique=True)
+    slug = models.SlugField(max_length=64, unique=True)
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = unique_slug(self.name)
+        super().save(*args, **kwargs)
+
+
+def unique_slug(name):
+    """A slug for a new category that no existing category uses."""
+    base = slugify(name)[:56] or "category"
+    slug, n = base, 1
+    while Category.objects.filter(slug=slug).exists():
+        n += 1
+        slug = f"{base}-{n}"
+    return slug
+
 
 class User(AbstractUser):
     pass
 
+ACTIVE = models.Q(is_active=True)
+
+
+class ListingQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(ACTIVE)
+
+    def expired(self, now=None):
+        """Listings still open for bids although their end time has passed."""
+        return self.filter(is_active=True, ends_at__lte=now or timezone.now())
+
+    def for_cards(self):
+        # Cards only show a short summary, so skip loading full descriptions
+        return self.defer("description").annotate(summary=Substr("description", 1, 200))
+
+
 class Listing(models.Model):
     title = models.CharField(max_length=54)
     description = models.TextField()
@@ -25,6 +60,44 @@ class Listing(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True, related_name="listings")
     category = models.ForeignKey(Category, on_delete=models.CASCADE, blank=True, null=True, related_name="listings")
     watchlist = models.ManyToManyField(User, related_name="listingWatchlist", blank=True) 
+    ends_at = models.DateTimeField(blank=True, null=True)
+    winner = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name="wonListings")
+    # When bidding ended; closed listings are archived some time after this
+    closed_at = models.DateTimeField(blank=True, null=True)
+
+    # Denormalized summary, kept up to date by the views that change it and
+    # rebuilt in bulk by `manage.py rebuild_listing_summaries`
+    current_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    bid_count = models.PositiveIntegerField(default=0)
+    watcher_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    # Bumped on every change that shows up on a rendered listing; part of the
+    # fragment cache key so stale cards are never served
+    version = models.PositiveIntegerField(default=1)
+    # Set alongside every version bump, for Last-Modified headers
+    modified_at = models.DateTimeField(default=timezone.now)
+    # Page views, flushed in batches from each worker's in-memory buffer, and
+    # a decaying popularity score for the trending feed (see trending.py);
+    # neither is shown on cards, so they don't bump the version
+    view_count = models.PositiveIntegerField(default=0)
+    trending_score = models.FloatField(default=0)
+
+    objects = ListingQuerySet.as_manager()
+
+    class Meta:
+        # Partial indexes over active listings only: Django writes the
+        # is_active=True filter as a bare `WHERE is_active`, which SQLite can
+        # match against an index condition but not against a leading column
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], condition=ACTIVE, name="listing_active_feed_idx"),
+            models.Index(fields=["category", "-created_at", "-id"], condition=ACTIVE, name="listing_category_feed_idx"),
+            models.Index(fields=["current_price", "id"], condition=ACTIVE, name="listing_active_price_idx"),
+            models.Index(fields=["-watcher_count", "-id"], condition=ACTIVE, name="listing_active_watchers_idx"),
+            models.Index(fields=["-bid_count", "-id"], condition=ACTIVE, name="listing_active_bids_idx"),
+            models.Index(fields=["ends_at"], condition=ACTIVE, name="listing_active_ends_idx"),
+            models.Index(fields=["-trending_score", "-id"], condition=ACTIVE, name="listing_active_trending_idx"),
+            models.Index(fields=["closed_at"], condition=~ACTIVE, name="listing_closed_idx"),
+        ]
 
     def __str__(self):
         return self.title
@@ -33,16 +106,126 @@ class Listing(models.Model):
         if isinstance(self.starting_bid, str):
             from decimal import Decimal
             self.starting_bid = Decimal(self.starting_bid)
+        if not self.price_id:
+            self.current_price = self.starting_bid
+        if not self.is_active and self.closed_at is None:
+            self.closed_at = timezone.now()
+        bump_version = not self._state.adding and kwargs.get("update_fields") is None
+        if bump_version:
+            self.version = models.F("version") + 1
+            self.modified_at = timezone.now()
         super().save(*args, **kwargs)
+        if bump_version:
+            self.refresh_from_db(fields=["version"])
 
 class Comment(models.Model):  
     listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name="listingcomment") 
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="usercomment")
     message = models.CharField(max_length=255)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Listing pages read a thread newest first, a page at a time
+            models.Index(fields=["listing", "-created_at", "-id"], name="comment_listing_created_idx"),
+        ]
 
 class Bid(models.Model):
     bid = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
     user = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True, related_name="UserBid")
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, blank=True, null=True, related_name="bids")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["listing", "-bid"], name="bid_listing_amount_idx"),
+            models.Index(fields=["user", "-created_at"], name="bid_user_created_idx"),
+        ]
 
     def __str__(self):
         return str(self.bid)
+
+    def save(self, *args, **kwargs):
+        # Bids are an append-only ledger; a listing's history must never change
+        if not self._state.adding:
+            raise ValueError("Bids cannot be modified once placed.")
+        super().save(*args, **kwargs)
+
+
+class ArchivedListing(models.Model):
+    """
+    A long-closed listing moved out of the live tables by archive.py. It
+    keeps its original id, so its page stays at the same URL, read-only.
+    """
+    title = models.CharField(max_length=54)
+    description = models.TextField()
+    starting_bid = models.DecimalField(max_digits=10, decimal_places=2)
+    image_url = models.URLField(blank=True, null=True)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True, related_name="archivedListings")
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, blank=True, null=True, related_name="archivedListings")
+    winner = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name="wonArchivedListings")
+    watchlist = models.ManyToManyField(User, related_name="archivedWatchlist", blank=True)
+    created_at = models.DateTimeField()
+    ends_at = models.DateTimeField(blank=True, null=True)
+    closed_at = models.DateTimeField(blank=True, null=True)
+    current_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    bid_count = models.PositiveIntegerField(default=0)
+    watcher_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    view_count = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    is_active = False
+
+    def __str__(self):
+        return self.title
+
+
+class ArchivedBid(models.Model):
+    bid = models.DecimalField(max_digits=10, decimal_places=2)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True, related_name="archivedBids")
+    listing = models.ForeignKey(ArchivedListing, on_delete=models.CASCADE, related_name="bids")
+    created_at = models.DateTimeField()
+
+    def __str__(self):
+        return str(self.bid)
+
+
+class ArchivedComment(models.Model):
+    listing = models.ForeignKey(ArchivedListing, on_delete=models.CASCADE, related_name="comments")
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archivedComments")
+    message = models.CharField(max_length=255)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["listing", "-created_at", "-id"], name="archivedcomment_listing_idx"),
+        ]
+
+
+PENDING = models.Q(finished_at__isnull=True)
+
+
+class Job(models.Model):
+    """Background work such as notifications, run by `manage.py process_jobs`."""
+    kind = models.CharField(max_length=32)
+    payload = models.JSONField(default=dict)
+    # A job is merged into a pending, unclaimed job with the same key
+    dedupe_key = models.CharField(max_length=128, blank=True, null=True)
+    run_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=32, blank=True, null=True)
+    claimed_until = models.DateTimeField(blank=True, null=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["run_at", "id"], condition=PENDING, name="job_pending_due_idx"),
+            models.Index(fields=["dedupe_key"], condition=PENDING, name="job_pending_dedupe_idx"),
+            models.Index(fields=["finished_at"], condition=models.Q(finished_at__isnull=False), name="job_finished_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk}"
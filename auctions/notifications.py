@@ -0,0 +1,127 @@
+"""
+Email notifications, sent by the job worker off the request path.
+
+The request side only enqueues a job (see jobs.py). Outbid and comment
+jobs wait JOB_DEBOUNCE_SECONDS and are deduplicated while they wait, so a
+bidding war or a busy thread sends one email per person instead of one per
+event. Messages to a listing's watchers go out in FANOUT_BATCH_SIZE batches
+over one mail connection.
+"""
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.urls import reverse
+
+from . import jobs
+from .models import Comment, Listing, User
+
+
+OUTBID = "outbid"
+AUCTION_CLOSED = "auction_closed"
+NEW_COMMENTS = "new_comments"
+
+FANOUT_BATCH_SIZE = 100
+
+
+def outbid(listing_id, user_id):
+    """Tell ``user_id`` that someone has outbid them on a listing."""
+    jobs.enqueue(
+        OUTBID, {"listing": listing_id, "user": user_id},
+        dedupe_key=f"{OUTBID}:{listing_id}:{user_id}", delay=settings.JOB_DEBOUNCE_SECONDS,
+    )
+
+
+def auctions_closed(listing_ids):
+    """Tell winners, owners and watchers that these auctions have ended."""
+    jobs.enqueue_many(AUCTION_CLOSED, [{"listing": listing_id} for listing_id in listing_ids])
+
+
+def new_comment(comment):
+    """Tell a listing's watchers about new comments from this one onwards."""
+    jobs.enqueue(
+        NEW_COMMENTS, {"listing": comment.listing_id, "since": comment.pk},
+        dedupe_key=f"{NEW_COMMENTS}:{comment.listing_id}", delay=settings.JOB_DEBOUNCE_SECONDS,
+    )
+
+
+def listing_url(listing):
+    return settings.SITE_URL.rstrip("/") + reverse("listing", args=(listing.pk,))
+
+
+def message(to, subject, body):
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [to])
+
+
+def send_batched(connection, messages):
+    """Send a (possibly long) iterable of messages in fixed-size batches."""
+    sent, batch = 0, []
+    for email in messages:
+        batch.append(email)
+        if len(batch) == FANOUT_BATCH_SIZE:
+            sent += connection.send_messages(batch) or 0
+            batch = []
+    if batch:
+        sent += connection.send_messages(batch) or 0
+    return sent
+
+
+def watcher_emails(listing, exclude=()):
+    watchers = User.objects.filter(listingWatchlist=listing).exclude(email="").exclude(pk__in=exclude)
+    return watchers.values_list("email", flat=True).iterator(chunk_size=FANOUT_BATCH_SIZE)
+
+
+@jobs.handler(OUTBID)
+def send_outbid(job, connection):
+    listing = Listing.objects.select_related("price").filter(pk=job.payload["listing"]).first()
+    user = User.objects.filter(pk=job.payload["user"]).exclude(email="").first()
+    # Nothing to say if they have since retaken the lead or the auction ended
+    if listing is None or user is None or not listing.is_active:
+        return 0
+    if listing.price and listing.price.user_id == user.pk:
+        return 0
+    return send_batched(connection, [message(
+        user.email, f"You've been outbid on {listing.title}",
+        f"The current price of {listing.title} is {listing.current_price}.\n\n"
+        f"Bid again: {listing_url(listing)}\n",
+    )])
+
+
+@jobs.handler(AUCTION_CLOSED)
+def send_auction_closed(job, connection):
+    listing = Listing.objects.select_related("owner", "winner").filter(pk=job.payload["listing"]).first()
+    if listing is None:
+        return 0
+    url = listing_url(listing)
+    messages = []
+    if listing.winner and listing.winner.email:
+        messages.append(message(
+            listing.winner.email, f"You won {listing.title}",
+            f"Your bid of {listing.current_price} won {listing.title}.\n\n{url}\n",
+        ))
+    if listing.owner and listing.owner.email:
+        outcome = (f"sold to {listing.winner.username} for {listing.current_price}"
+                   if listing.winner else "closed without bids")
+        messages.append(message(listing.owner.email, f"Your auction {listing.title} has ended",
+                                f"{listing.title} {outcome}.\n\n{url}\n"))
+    watchers = (
+        message(email, f"The auction for {listing.title} has ended",
+                f"{listing.title} closed at {listing.current_price}.\n\n{url}\n")
+        for email in watcher_emails(listing, exclude=[listing.owner_id, listing.winner_id])
+    )
+    return send_batched(connection, [*messages, *watchers])
+
+
+@jobs.handler(NEW_COMMENTS)
+def send_new_comments(job, connection):
+    listing = Listing.objects.filter(pk=job.payload["listing"]).first()
+    if listing is None:
+        return 0
+    comments = Comment.objects.filter(listing=listing, pk__gte=job.payload["since"])
+    count = comments.count()
+    if not count:
+        return 0
+    latest = comments.select_related("author").order_by("-pk").first()
+    subject = f"{count} new comment{'s' if count > 1 else ''} on {listing.title}"
+    body = f"{latest.author.username} wrote: {latest.message}\n\n{listing_url(listing)}\n"
+    return send_batched(connection, (
+        message(email, subject, body) for email in watcher_emails(listing, exclude=[latest.author_id])
+    ))
@@ -0,0 +1,89 @@
+import base64
+import binascii
+import math
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+# Feed orderings: name -> (field, descending, parser for the cursor value).
+# Every ordering is backed by a (field, id) index on active listings.
+SORTS = {
+    "newest": ("created_at", True, datetime.fromisoformat),
+    "price_low": ("current_price", False, Decimal),
+    "price_high": ("current_price", True, Decimal),
+    "popular": ("watcher_count", True, int),
+    "most_bids": ("bid_count", True, int),
+    "trending": ("trending_score", True, float),
+}
+DEFAULT_SORT = "newest"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def get_page_size(requested=None):
+    """Resolve the page size from the request, falling back to the default."""
+    try:
+        size = int(requested) if requested else DEFAULT_PAGE_SIZE
+    except (TypeError, ValueError):
+        size = DEFAULT_PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def encode_cursor(value, pk):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = f"{value}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, parse=datetime.fromisoformat):
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        value, pk = base64.urlsafe_b64decode(padded).decode().split("|")
+        value = parse(value)
+        # Decimal and float also parse NaN and Infinity, which no column holds
+        if isinstance(value, (Decimal, float)) and not math.isfinite(value):
+            raise InvalidCursor(cursor)
+        return value, int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError, InvalidOperation):
+        raise InvalidCursor(cursor)
+
+
+def paginate(queryset, cursor=None, page_size=None, sort=DEFAULT_SORT, sorts=SORTS):
+    """
+    Keyset pagination over (sort field, id).
+
+    Rows inserted while a client is paging land before the cursor, so pages
+    never shift or repeat the way OFFSET pages do. Returns the page items and
+    the cursor for the next page (None on the last page). ``sorts`` maps sort
+    names as SORTS does, for querysets other than the listing feed.
+    """
+    field, descending, parse = sorts.get(sort, sorts[DEFAULT_SORT])
+    page_size = get_page_size(page_size)
+    if descending:
+        queryset = queryset.order_by(f"-{field}", "-id")
+    else:
+        queryset = queryset.order_by(field, "id")
+
+    if cursor:
+        value, pk = decode_cursor(cursor, parse)
+        after = "lt" if descending else "gt"
+        queryset = queryset.filter(
+            Q(**{f"{field}__{after}": value}) | Q(**{field: value, f"id__{after}": pk})
+        )
+
+    # Fetch one extra row to know whether there is a next page
+    items = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return items, next_cursor
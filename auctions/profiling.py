@@ -0,0 +1,218 @@
+import contextvars
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+
+logger = logging.getLogger("auctions.profiling")
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+_current = contextvars.ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    def __init__(self, capture_sql):
+        self.capture_sql = capture_sql
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed as a database execute wrapper for the whole request
+        began = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - began
+            self.queries += 1
+            self.sql_time += elapsed
+            if self.capture_sql:
+                self.statements.append((elapsed, sql))
+
+
+def record_cache(hit):
+    """Called by caches that want their hits counted against the current request."""
+    profile = _current.get()
+    if profile is not None:
+        if hit:
+            profile.cache_hits += 1
+        else:
+            profile.cache_misses += 1
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    """Per-process request metrics, labelled by view name."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+
+    def observe(self, view, **values):
+        with self.lock:
+            for metric, value in values.items():
+                histogram = self.histograms.get((metric, view))
+                if histogram is None:
+                    buckets = QUERY_BUCKETS if metric == "db_queries" else DURATION_BUCKETS
+                    histogram = self.histograms[(metric, view)] = Histogram(buckets)
+                histogram.observe(value)
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+
+    def render(self):
+        """The metrics in Prometheus text exposition format."""
+        # Imported here because fragment_cache reports into this module
+        from . import fragment_cache
+
+        lines = []
+        with self.lock:
+            by_metric = {}
+            for (metric, view), histogram in sorted(self.histograms.items()):
+                by_metric.setdefault(metric, []).append((view, histogram))
+            for metric, series in by_metric.items():
+                name = f"commerce_request_{metric}" if metric == "db_queries" else f"commerce_request_{metric}_seconds"
+                lines.append(f"# TYPE {name} histogram")
+                for view, histogram in series:
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_sum{{view="{view}"}} {histogram.sum:.6f}')
+                    lines.append(f'{name}_count{{view="{view}"}} {cumulative}')
+
+        lines.append("# TYPE commerce_fragment_cache_requests_total counter")
+        for kind, counts in sorted(fragment_cache.stats().items()):
+            lines.append(f'commerce_fragment_cache_requests_total{{fragment="{kind}",result="hit"}} {counts["hits"]}')
+            lines.append(f'commerce_fragment_cache_requests_total{{fragment="{kind}",result="miss"}} {counts["misses"]}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+class ProfiledTemplate(django_backend.Template):
+    def render(self, context=None, request=None):
+        profile = _current.get()
+        if profile is None:
+            return super().render(context, request)
+        began = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile.template_time += time.perf_counter() - began
+
+
+class ProfiledDjangoTemplates(django_backend.DjangoTemplates):
+    """
+    The Django template backend, with render time counted against the
+    request being profiled. Only top-level renders go through the backend
+    Template, so included templates are not counted twice.
+    """
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return ProfiledTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+class RequestProfilingMiddleware:
+    """
+    Measure every request: wall time, SQL query count and time, template
+    render time (with the ProfiledDjangoTemplates backend) and fragment
+    cache hits. The numbers are sent back in a
+    Server-Timing header and aggregated per view for the /metrics endpoint.
+    Requests slower than SLOW_REQUEST_THRESHOLD_MS (when set) are logged
+    along with their SQL.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        threshold = getattr(settings, "SLOW_REQUEST_THRESHOLD_MS", None)
+        profile = RequestProfile(capture_sql=threshold is not None)
+        token = _current.set(profile)
+        began = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile, time.perf_counter() - began, threshold)
+
+    async def __acall__(self, request):
+        # Under ASGI the ORM runs in worker threads with their own
+        # connections, so only wall and template time are measured here
+        threshold = getattr(settings, "SLOW_REQUEST_THRESHOLD_MS", None)
+        profile = RequestProfile(capture_sql=False)
+        token = _current.set(profile)
+        began = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile, time.perf_counter() - began, threshold)
+
+    def finish(self, request, response, profile, elapsed, threshold):
+        match = request.resolver_match
+        view = match.view_name if match else "unresolved"
+        registry.observe(
+            view,
+            duration=elapsed,
+            db_time=profile.sql_time,
+            template_time=profile.template_time,
+            db_queries=profile.queries,
+        )
+        response["Server-Timing"] = ", ".join([
+            f"total;dur={elapsed * 1000:.1f}",
+            f'db;dur={profile.sql_time * 1000:.1f};desc="{profile.queries} queries"',
+            f"tpl;dur={profile.template_time * 1000:.1f}",
+            f'cache;desc="{profile.cache_hits} hits, {profile.cache_misses} misses"',
+        ])
+
+        if threshold is not None and elapsed * 1000 >= threshold:
+            logger.warning(
+                "Slow request %s %s (%s) took %.1f ms with %d queries:\n%s",
+                request.method, request.path, view, elapsed * 1000, profile.queries,
+                "\n".join(f"  {seconds * 1000:8.2f} ms  {sql}" for seconds, sql in profile.statements),
+            )
+        return response
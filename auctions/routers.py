@@ -0,0 +1,127 @@
+import contextvars
+import random
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+
+PRIMARY = "default"
+STICKY_COOKIE = "read_primary"
+
+# Sessions and accounts are read on every request and must never lag behind
+# a login, so they always come from the primary
+PRIMARY_ONLY_APPS = {"sessions", "auth", "contenttypes", "admin"}
+
+
+class Routing:
+    """Per-request routing state, set up by ReplicaRoutingMiddleware."""
+
+    def __init__(self, pinned):
+        # Pinned requests read from the primary so clients see their own writes
+        self.pinned = pinned
+        self.replica_reads = False
+        self.wrote = False
+
+
+_routing = contextvars.ContextVar("replica_routing", default=None)
+
+
+class ReplicaRouter:
+    """
+    Send reads made inside @replica_reads views to a random alias from
+    READ_REPLICAS and everything else, including writes, sessions and users,
+    to the primary. Outside a request (management commands, the shell)
+    reads stay on the primary too.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        replicas = getattr(settings, "READ_REPLICAS", [])
+        if routing is None or not routing.replica_reads or routing.pinned or not replicas:
+            return PRIMARY
+        if model._meta.app_label in PRIMARY_ONLY_APPS or model._meta.label == settings.AUTH_USER_MODEL:
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            # The rest of this request and the sticky window read the primary
+            routing.wrote = routing.pinned = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *getattr(settings, "READ_REPLICAS", [])}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema along with their data
+        return db == PRIMARY
+
+
+def replica_reads(view):
+    """Let a read-only browse view run its queries on a replica."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        routing = _routing.get()
+        if routing is None:
+            return view(request, *args, **kwargs)
+        routing.replica_reads = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            routing.replica_reads = False
+    return wrapper
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Track whether a request must read from the primary: any request other
+    than GET/HEAD/OPTIONS, and any request within REPLICA_STICKY_SECONDS of
+    a write by the same client, which is remembered in a short-lived cookie
+    so redirects after addBid, addComment or watchlist changes show the
+    change even before the replicas catch up.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def start(self, request):
+        pinned = request.method not in ("GET", "HEAD", "OPTIONS") or STICKY_COOKIE in request.COOKIES
+        return Routing(pinned)
+
+    def finish(self, response, routing):
+        if routing.wrote:
+            response.set_cookie(
+                STICKY_COOKIE, "1", max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite="Lax"
+            )
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        routing = self.start(request)
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.finish(response, routing)
+
+    async def __acall__(self, request):
+        routing = self.start(request)
+        token = _routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.finish(response, routing)
@@ -0,0 +1,97 @@
+import re
+
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Listing
+from .pagination import get_page_size
+
+
+FTS_TABLE = "auctions_listing_fts"
+
+# Per-database answer to "was the FTS5 index created by the migration?"
+_fts_available = {}
+
+
+def _connection():
+    # Raw SQL bypasses the router, so ask it where listing reads go
+    return connections[router.db_for_read(Listing)]
+
+
+def has_fts_index():
+    connection = _connection()
+    name = connection.settings_dict["NAME"]
+    if name not in _fts_available:
+        _fts_available[name] = (
+            connection.vendor == "sqlite"
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_available[name]
+
+
+def search_terms(query):
+    return re.findall(r"\w+", query.lower())
+
+
+def fts_query(terms):
+    # Quote every term so user input can never be parsed as FTS5 syntax;
+    # the last term is a prefix match so results update while typing.
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def matching_ids(query):
+    """Subquery of the ids of all listings, open or closed, that match ``query``."""
+    return RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [fts_query(search_terms(query))])
+
+
+def _ranked_ids(terms, category_id, limit, offset):
+    sql = (
+        f"SELECT l.id FROM {FTS_TABLE} "
+        f"JOIN auctions_listing l ON l.id = {FTS_TABLE}.rowid "
+        f"WHERE {FTS_TABLE} MATCH %s AND l.is_active"
+    )
+    params = [fts_query(terms)]
+    if category_id is not None:
+        sql += " AND l.category_id = %s"
+        params.append(category_id)
+    sql += f" ORDER BY bm25({FTS_TABLE}), l.id LIMIT %s OFFSET %s"
+    params += [limit, offset]
+    with _connection().cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _naive_ids(terms, category_id, limit, offset):
+    listings = Listing.objects.active()
+    if category_id is not None:
+        listings = listings.filter(category_id=category_id)
+    for term in terms:
+        listings = listings.filter(Q(title__icontains=term) | Q(description__icontains=term))
+    return list(listings.order_by("-created_at", "-id").values_list("id", flat=True)[offset:offset + limit])
+
+
+def search(query, category_id=None, page=1, page_size=None, use_fts=None):
+    """
+    Search active listings by title and description.
+
+    Uses the FTS5 index ranked by bm25 when the database has one, otherwise
+    an icontains scan ordered by newest. Returns (listings, has_next).
+    """
+    terms = search_terms(query)
+    if not terms:
+        return [], False
+    if use_fts is None:
+        use_fts = has_fts_index()
+
+    page_size = get_page_size(page_size)
+    offset = (max(page, 1) - 1) * page_size
+    find = _ranked_ids if use_fts else _naive_ids
+    ids = find(terms, category_id, page_size + 1, offset)
+
+    has_next = len(ids) > page_size
+    ids = ids[:page_size]
+    found = Listing.objects.for_cards().in_bulk(ids)
+    return [found[pk] for pk in ids if pk in found], has_next
@@ -0,0 +1,55 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Bid, Comment, Listing
+
+
+SUMMARY_FIELDS = ("current_price", "bid_count", "watcher_count", "comment_count")
+
+
+def _count(queryset):
+    # Correlated COUNT(*) that yields 0 instead of NULL for listings without rows
+    counted = queryset.values("listing").annotate(n=Count("*")).values("n")
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def expected_summary():
+    """Expressions computing each summary column from the source tables."""
+    Watcher = Listing.watchlist.through
+    return {
+        "current_price": Coalesce(
+            Subquery(Bid.objects.filter(pk=OuterRef("price_id")).values("bid")[:1]),
+            F("starting_bid"),
+        ),
+        "bid_count": _count(Bid.objects.filter(listing=OuterRef("pk"))),
+        "watcher_count": _count(Watcher.objects.filter(listing=OuterRef("pk"))),
+        "comment_count": _count(Comment.objects.filter(listing=OuterRef("pk"))),
+    }
+
+
+def adjust(listing_id, **deltas):
+    """Apply counter deltas, e.g. ``adjust(id, comment_count=1)``, in one UPDATE."""
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if "version" in deltas:
+        changes["modified_at"] = timezone.now()
+    Listing.objects.filter(pk=listing_id).update(**changes)
+
+
+def rebuild(queryset=None):
+    """Recompute the summary columns for ``queryset`` with a single UPDATE."""
+    if queryset is None:
+        queryset = Listing.objects.all()
+    return queryset.update(**expected_summary(), version=F("version") + 1, modified_at=timezone.now())
+
+
+def find_drift(queryset=None):
+    """Yield (listing id, field, stored, expected) for every stale column."""
+    if queryset is None:
+        queryset = Listing.objects.all()
+    expected = {f"expected_{field}": expr for field, expr in expected_summary().items()}
+    rows = queryset.annotate(**expected).values("pk", *SUMMARY_FIELDS, *expected)
+    for row in rows.iterator():
+        for field in SUMMARY_FIELDS:
+            if row[field] != row[f"expected_{field}"]:
+                yield row["pk"], field, row[field], row[f"expected_{field}"]
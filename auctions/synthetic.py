@@ -0,0 +1,32 @@
+import random
+
+
+SYLLABLES = ["ka", "lo", "mi", "ren", "tor", "vi", "sa", "pel", "dun", "ri", "go", "bex", "an", "tu", "zel"]
+
+
+class TextGenerator:
+    """Reproducible filler text with a Zipf-like word distribution."""
+
+    def __init__(self, rng=None, vocabulary_size=5000):
+        self.rng = rng or random.Random(0)
+        self.vocabulary = sorted({
+            "".join(self.rng.choice(SYLLABLES) for _ in range(self.rng.randint(2, 4)))
+            for _ in range(vocabulary_size)
+        })
+
+    def word(self):
+        # A few words are common, most are rare
+        rank = int(self.rng.paretovariate(1.0) * 20) - 20
+        return self.vocabulary[min(rank, len(self.vocabulary) - 1)]
+
+    def text(self, words):
+        return " ".join(self.word() for _ in range(words))
+
+    def query(self):
+        # People search for distinctive words, not the most common ones
+        return " ".join(self.rng.sample(self.vocabulary, self.rng.randint(1, 2)))
+
+
+def skewed_index(rng, count, alpha=1.2):
+    """Pick an index in range(count), heavily favouring the first ones."""
+    return min(int(rng.paretovariate(alpha)) - 1, count - 1)
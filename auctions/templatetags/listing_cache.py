@@ -0,0 +1,35 @@
+from django import template
+
+from auctions import fragment_cache
+
+
+register = template.Library()
+
+
+class ListingFragmentNode(template.Node):
+    def __init__(self, nodelist, kind, listing):
+        self.nodelist = nodelist
+        self.kind = kind
+        self.listing = listing
+
+    def render(self, context):
+        kind = self.kind.resolve(context)
+        listing = self.listing.resolve(context)
+        return fragment_cache.get_or_render(kind, listing, lambda: self.nodelist.render(context))
+
+
+@register.tag
+def listingfragment(parser, token):
+    """
+    Cache a block of listing markup until the listing's version changes::
+
+        {% listingfragment "card" listing %} ... {% endlistingfragment %}
+
+    Only put markup in here that is the same for every visitor.
+    """
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes a fragment name and a listing.")
+    nodelist = parser.parse(("endlistingfragment",))
+    parser.delete_first_token()
+    return ListingFragmentNode(nodelist, parser.compile_filter(bits[1]), parser.compile_filter(bits[2]))
@@ -1,3 +1,1215 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import importlib
+import io
+import json
+import os
+import sys
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core import mail
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.mail.backends import locmem
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, router, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import QuerySet
+from django.http import HttpResponse
+from django.template import engines
+from django.template.backends.django import Template as DjangoTemplate
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    archive, assets, bidding, events, expiry, facets, fragment_cache, jobs, notifications, pagination, profiling, search,
+    summaries, trending, warmup, watchlist,
+)
+from .routers import STICKY_COOKIE, ReplicaRoutingMiddleware, replica_reads
+from .models import ArchivedBid, ArchivedComment, ArchivedListing, Bid, Category, Comment, Job, Listing, User
+
+
+# The suite counts queries on the primary, so ReplicaRoutingTests opts back
+# in to replicas, and tests flush buffered view counts themselves
+_suite_settings = override_settings(READ_REPLICAS=[], VIEW_COUNT_FLUSH_SECONDS=None)
+setUpModule = _suite_settings.enable
+tearDownModule = _suite_settings.disable
+
+
+def build_marketplace(size):
+    """
+    Create a marketplace whose row counts all scale with ``size``: that many
+    users, listings, bids, comments and watchers, most of them piled onto a
+    single "hot" listing the way popular auctions attract activity.
+    """
+    category = Category.objects.create(name="Toys")
+    owner = User.objects.create_user("owner", "owner@example.com", "secret")
+    viewer = User.objects.create_user("viewer", "viewer@example.com", "secret")
+    staff = User.objects.create_superuser("staff", "staff@example.com")
+    others = User.objects.bulk_create(
+        User(username=f"user{n}", email=f"user{n}@example.com") for n in range(size)
+    )
+    listings = Listing.objects.bulk_create(
+        Listing(
+            title=f"Listing {n}", description="A listing " * 50, starting_bid=Decimal(1),
+            current_price=Decimal(1), owner=owner, category=category,
+        )
+        for n in range(size)
+    )
+    hot = listings[0]
+    last_bid = None
+    for n, user in enumerate(others):
+        last_bid = Bid.objects.create(bid=Decimal(2 + n), user=user, listing=hot)
+    Comment.objects.bulk_create(
+        Comment(listing=hot, author=user, message=f"Comment {n}") for n, user in enumerate(others)
+    )
+    hot.watchlist.add(*others)
+    viewer.listingWatchlist.add(*listings)
+    Listing.objects.filter(pk=hot.pk).update(price=last_bid)
+    summaries.rebuild()
+    return {"category": category, "owner": owner, "viewer": viewer, "staff": staff, "hot": hot}
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class QueryBudgetTestCase(TestCase):
+    """
+    Each view must run a fixed number of queries no matter how many rows
+    are involved. Every check is repeated for several marketplace sizes; a
+    view that issues per-row queries fails both the budget and the "same
+    count at every size" assertion.
+    """
+
+    sizes = (2, 10, 40)
+
+    def setUp(self):
+        # One-off lookups that are cached for the life of the process
+        search.has_fts_index()
+
+    def count_queries(self, size, request, user):
+        self.client = self.client_class()
+        with transaction.atomic():
+            data = build_marketplace(size)
+            if user:
+                self.client.force_login(data[user])
+            # Measure the cold path: cached fragments would hide queries
+            for alias in ("default", "fragments"):
+                caches[alias].clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = request(data)
+            self.assertLess(response.status_code, 500)
+            transaction.set_rollback(True)
+        return len(queries)
+
+    def assertQueryBudget(self, budget, request, user=None):
+        counts = {}
+        for size in self.sizes:
+            with self.subTest(size=size):
+                counts[size] = self.count_queries(size, request, user)
+                self.assertLessEqual(counts[size], budget, f"{counts[size]} queries at size {size}")
+        self.assertEqual(len(set(counts.values())), 1, f"query count grows with data: {counts}")
+
+
+class AnonymousViewQueryTests(QueryBudgetTestCase):
+    def test_index(self):
+        self.assertQueryBudget(2, lambda data: self.client.get(reverse("index")))
+
+    def test_index_next_page(self):
+        def request(data):
+            first = self.client.get(reverse("index"), {"page_size": 1})
+            return self.client.get(reverse("index") + "?" + (first.context["nextPageQuery"] or ""))
+        self.assertQueryBudget(4, request)
+
+    def test_index_sorted_by_price(self):
+        self.assertQueryBudget(2, lambda data: self.client.get(reverse("index"), {"sort": "price_high"}))
+
+    def test_index_trending(self):
+        self.assertQueryBudget(2, lambda data: self.client.get(reverse("index"), {"sort": "trending"}))
+
+    def test_index_category(self):
+        self.assertQueryBudget(2, lambda data: self.client.get(reverse("index"), {"category": "Toys"}))
+
+    def test_display_category_redirect(self):
+        self.assertQueryBudget(0, lambda data: self.client.post(reverse("displayCategory"), {"category": "Toys"}))
+
+    def test_search(self):
+        self.assertQueryBudget(3, lambda data: self.client.get(reverse("search"), {"q": "listing"}))
+
+    def test_listing(self):
+        self.assertQueryBudget(1, lambda data: self.client.get(reverse("listing", args=(data["hot"].pk,))))
+
+    def test_login_page(self):
+        self.assertQueryBudget(0, lambda data: self.client.get(reverse("login")))
+
+    def test_login(self):
+        self.assertQueryBudget(9, lambda data: self.client.post(
+            reverse("login"), {"username": "owner", "password": "secret"}
+        ))
+
+    def test_register_page(self):
+        self.assertQueryBudget(0, lambda data: self.client.get(reverse("register")))
+
+    def test_register(self):
+        self.assertQueryBudget(10, lambda data: self.client.post(reverse("register"), {
+            "username": "newcomer", "email": "new@example.com",
+            "password": "secret", "confirmation": "secret",
+        }))
+
+    def test_logout(self):
+        self.assertQueryBudget(0, lambda data: self.client.get(reverse("logout")))
+
+    def test_listing_comments_page(self):
+        self.assertQueryBudget(1, lambda data: self.client.get(reverse("listingComments", args=(data["hot"].pk,))))
+
+    def test_metrics(self):
+        self.assertQueryBudget(2, lambda data: self.client.get(reverse("metrics")))
+
+    def test_api_listings(self):
+        self.assertQueryBudget(1, lambda data: self.client.get(reverse("apiListings")))
+
+    def test_api_listings_next_page(self):
+        def request(data):
+            first = self.client.get(reverse("apiListings"), {"page_size": 1, "category": "toys"})
+            return self.client.get(reverse("apiListings"), {"cursor": first.json()["next"], "category": "toys"})
+        self.assertQueryBudget(3, request)
+
+    def test_api_listing(self):
+        self.assertQueryBudget(2, lambda data: self.client.get(reverse("apiListing", args=(data["hot"].pk,))))
+
+    def test_api_categories(self):
+        self.assertQueryBudget(1, lambda data: self.client.get(reverse("apiCategories")))
+
+    def test_api_watchlist_requires_login(self):
+        self.assertQueryBudget(0, lambda data: self.client.get(reverse("apiWatchlist")))
+
+
+class AuthenticatedViewQueryTests(QueryBudgetTestCase):
+    def test_index(self):
+        self.assertQueryBudget(5, lambda data: self.client.get(reverse("index")), user="viewer")
+
+    def test_listing(self):
+        self.assertQueryBudget(
+            5, lambda data: self.client.get(reverse("listing", args=(data["hot"].pk,))), user="viewer"
+        )
+
+    def test_watchlist(self):
+        self.assertQueryBudget(3, lambda data: self.client.get(reverse("watchlist")), user="viewer")
+
+    def test_api_watchlist(self):
+        self.assertQueryBudget(3, lambda data: self.client.get(reverse("apiWatchlist")), user="viewer")
+
+    def test_create_page(self):
+        self.assertQueryBudget(3, lambda data: self.client.get(reverse("create")), user="viewer")
+
+    def test_create(self):
+        self.assertQueryBudget(4, lambda data: self.client.post(reverse("create"), {
+            "title": "New", "description": "Brand new", "starting_bid": "5", "category": "Toys",
+        }), user="viewer")
+
+    def test_add_watchlist(self):
+        self.assertQueryBudget(
+            10, lambda data: self.client.post(reverse("addWatchlist", args=(data["hot"].pk,))), user="owner"
+        )
+
+    def test_remove_watchlist(self):
+        self.assertQueryBudget(
+            7, lambda data: self.client.post(reverse("removeWatchlist", args=(data["hot"].pk,))), user="viewer"
+        )
+
+    def test_add_comment(self):
+        self.assertQueryBudget(9, lambda data: self.client.post(
+            reverse("addComment", args=(data["hot"].pk,)), {"message": "Hi"}
+        ), user="viewer")
+
+    def test_add_bid(self):
+        self.assertQueryBudget(9, lambda data: self.client.post(
+            reverse("addBid", args=(data["hot"].pk,)), {"bid_amount": "1000"}
+        ), user="viewer")
+
+    def test_close_auction(self):
+        self.assertQueryBudget(
+            7, lambda data: self.client.post(reverse("closeAuction", args=(data["hot"].pk,))), user="owner"
+        )
+
+
+class AdminQueryTests(QueryBudgetTestCase):
+    """Admin pages must not load every user, bid or listing into a widget."""
+
+    def setUp(self):
+        super().setUp()
+        # The admin log looks these up once per process
+        ContentType.objects.get_for_models(Listing, Bid, Comment)
+
+    def test_listing_changelist(self):
+        self.assertQueryBudget(
+            5, lambda data: self.client.get(reverse("admin:auctions_listing_changelist")), user="staff"
+        )
+
+    def test_listing_changelist_search(self):
+        self.assertQueryBudget(5, lambda data: self.client.get(
+            reverse("admin:auctions_listing_changelist"), {"q": "listing", "is_active__exact": "1"}
+        ), user="staff")
+
+    def test_listing_change_form(self):
+        self.assertQueryBudget(7, lambda data: self.client.get(
+            reverse("admin:auctions_listing_change", args=(data["hot"].pk,))
+        ), user="staff")
+
+    def test_bid_changelist(self):
+        self.assertQueryBudget(
+            4, lambda data: self.client.get(reverse("admin:auctions_bid_changelist")), user="staff"
+        )
+
+    def test_bid_changelist_search(self):
+        self.assertQueryBudget(4, lambda data: self.client.get(
+            reverse("admin:auctions_bid_changelist"), {"q": str(data["hot"].pk)}
+        ), user="staff")
+
+    def test_bid_view_page(self):
+        self.assertQueryBudget(2, lambda data: self.client.get(
+            reverse("admin:auctions_bid_change", args=(data["hot"].price_id,))
+        ), user="staff")
+
+    def test_comment_changelist(self):
+        self.assertQueryBudget(4, lambda data: self.client.get(
+            reverse("admin:auctions_comment_changelist"), {"q": "user1"}
+        ), user="staff")
+
+    def test_search_results(self):
+        data = build_marketplace(5)
+        self.client.force_login(data["staff"])
+        hot = data["hot"]
+        bids = self.client.get(reverse("admin:auctions_bid_changelist"), {"q": str(hot.pk)}).context["cl"]
+        self.assertEqual({bid.listing_id for bid in bids.result_list}, {hot.pk})
+        self.assertEqual(len(bids.result_list), 5)
+        comments = self.client.get(reverse("admin:auctions_comment_changelist"), {"q": "user3"}).context["cl"]
+        self.assertEqual([comment.message for comment in comments.result_list], ["Comment 3"])
+        listings = self.client.get(reverse("admin:auctions_listing_changelist"), {"q": "Listing 4"}).context["cl"]
+        self.assertIn("Listing 4", [listing.title for listing in listings.result_list])
+
+
+class RequestProfilingTests(TestCase):
+    def setUp(self):
+        profiling.registry.reset()
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse("index"))
+        self.assertRegex(response["Server-Timing"], r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn("tpl;dur=", response["Server-Timing"])
+
+    def test_template_time_without_patching_django(self):
+        render = DjangoTemplate.render
+        profiling.RequestProfilingMiddleware(lambda request: HttpResponse())
+        self.assertIs(DjangoTemplate.render, render)
+        self.assertIsInstance(engines["django"], profiling.ProfiledDjangoTemplates)
+        response = self.client.get(reverse("index"))
+        self.assertRegex(response["Server-Timing"], r"tpl;dur=(?!0\.0,)[\d.]+")
+
+    def test_metrics_aggregate_per_view(self):
+        self.client.get(reverse("index"))
+        self.client.get(reverse("index"))
+        metrics = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('commerce_request_duration_seconds_count{view="index"} 2', metrics)
+        self.assertIn('commerce_request_db_queries_bucket{view="index",le="+Inf"} 2', metrics)
+
+    def test_metrics_are_local_only(self):
+        response = self.client.get(reverse("metrics"), REMOTE_ADDR="203.0.113.5")
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_slow_request_log_includes_sql(self):
+        with self.assertLogs("auctions.profiling", "WARNING") as logs:
+            self.client.get(reverse("index"))
+        self.assertIn("auctions_listing", logs.output[0])
+
+
+class BiddingTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create(username="owner")
+        self.bidder = User.objects.create(username="bidder")
+        self.rival = User.objects.create(username="rival")
+        self.listing = Listing.objects.create(title="Lamp", description="Brass", starting_bid=5, owner=self.owner)
+
+    def assertPrice(self, amount, user, bid_count):
+        listing = Listing.objects.select_related("price").get(pk=self.listing.pk)
+        self.assertEqual((listing.price.bid, listing.price.user, listing.current_price, listing.bid_count),
+                         (Decimal(amount), user, Decimal(amount), bid_count))
+
+    def race(self, amount):
+        """Land a rival's bid right after place_bid reads the price, so its swap loses."""
+        read = bidding.current_price
+        raced = []
+
+        def read_then_lose(listing):
+            price = read(listing)
+            if not raced:
+                raced.append(True)
+                bidding.place_bid(listing.pk, self.rival, Decimal(amount))
+            return price
+
+        return mock.patch("auctions.bidding.current_price", side_effect=read_then_lose)
+
+    def test_statuses(self):
+        result = bidding.place_bid(self.listing.pk, self.bidder, Decimal(4))
+        self.assertEqual((result.status, result.current_price), (bidding.BELOW_STARTING_BID, Decimal(5)))
+        result = bidding.place_bid(self.listing.pk, self.bidder, Decimal(5))
+        self.assertEqual((result.status, result.current_price, result.bid.bid), (bidding.ACCEPTED, Decimal(5), Decimal(5)))
+        result = bidding.place_bid(self.listing.pk, self.rival, Decimal(5))
+        self.assertEqual((result.status, result.current_price), (bidding.OUTBID, Decimal(5)))
+        self.assertEqual(bidding.place_bid(self.listing.pk, self.rival, Decimal(6)).status, bidding.ACCEPTED)
+        self.assertPrice(6, self.rival, 2)
+
+        Listing.objects.filter(pk=self.listing.pk).update(ends_at=timezone.now() - timedelta(seconds=1))
+        result = bidding.place_bid(self.listing.pk, self.bidder, Decimal(9))
+        self.assertEqual((result.status, result.current_price), (bidding.CLOSED, Decimal(6)))
+        Listing.objects.filter(pk=self.listing.pk).update(ends_at=None, is_active=False)
+        self.assertEqual(bidding.place_bid(self.listing.pk, self.bidder, Decimal(9)).status, bidding.CLOSED)
+        self.assertPrice(6, self.rival, 2)
+        with self.assertRaises(Listing.DoesNotExist):
+            bidding.place_bid(self.listing.pk + 1, self.bidder, Decimal(9))
+
+    def test_lost_race_cannot_overwrite_a_higher_bid(self):
+        with self.race(10) as read:
+            result = bidding.place_bid(self.listing.pk, self.bidder, Decimal(8))
+        self.assertEqual((result.status, result.current_price), (bidding.OUTBID, Decimal(10)))
+        # Our read, the rival's, then our re-read after the swap matched nothing
+        self.assertEqual(read.call_count, 3)
+        self.assertPrice(10, self.rival, 1)
+        self.assertFalse(Bid.objects.filter(user=self.bidder).exists())
+
+    def test_lost_race_retries_against_the_new_price(self):
+        with self.race(6):
+            result = bidding.place_bid(self.listing.pk, self.bidder, Decimal(8))
+        self.assertEqual(result.status, bidding.ACCEPTED)
+        self.assertPrice(8, self.bidder, 2)
+        self.assertEqual(Bid.objects.filter(user=self.bidder).count(), 1)
+
+    def test_gives_up_when_every_swap_loses(self):
+        with mock.patch("django.db.models.QuerySet.update", return_value=0) as update:
+            result = bidding.place_bid(self.listing.pk, self.bidder, Decimal(8))
+        self.assertEqual((result.status, result.current_price), (bidding.CONTENDED, Decimal(5)))
+        self.assertEqual(update.call_count, bidding.MAX_ATTEMPTS)
+        self.assertFalse(Bid.objects.exists())
+
+
+    def test_bids_are_append_only(self):
+        bid = bidding.place_bid(self.listing.pk, self.bidder, Decimal(5)).bid
+        bid.bid = Decimal(50)
+        with self.assertRaises(ValueError):
+            bid.save()
+        self.assertEqual(Bid.objects.get(pk=bid.pk).bid, Decimal(5))
+
+    def test_history_helpers(self):
+        now = timezone.now()
+        other = Listing.objects.create(title="Rug", description="Wool", starting_bid=1)
+        placed = [
+            Bid.objects.create(listing=listing, user=user, bid=amount, created_at=now - timedelta(minutes=minutes))
+            for listing, user, amount, minutes in (
+                (self.listing, self.bidder, 5, 50), (self.listing, self.rival, 7, 40), (other, self.bidder, 2, 30),
+                (self.listing, self.bidder, 9, 20), (self.listing, self.rival, 9, 10),
+            )
+        ]
+
+        self.assertEqual(list(bidding.top_bids(self.listing)), [placed[4], placed[3], placed[1], placed[0]])
+        self.assertEqual(list(bidding.top_bids(self.listing, limit=2)), [placed[4], placed[3]])
+        self.assertEqual(set(bidding.bidders(self.listing)), {self.bidder, self.rival})
+        self.assertEqual(bidding.bidders(self.listing).count(), 2)
+        self.assertEqual(list(bidding.bidders(other)), [self.bidder])
+
+        history = list(bidding.user_bid_history(self.bidder, limit=2))
+        self.assertEqual(history, [placed[3], placed[2]])
+        self.assertEqual(
+            list(bidding.user_bid_history(self.bidder, limit=2, before=history[-1].created_at)), [placed[0]]
+        )
+
+
+class WatchlistTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="watcher")
+        self.listing = Listing.objects.create(title="Lamp", description="Brass", starting_bid=1)
+
+    def test_watched_ids_follow_add_and_remove(self):
+        self.assertEqual(watchlist.watched_ids(self.user), frozenset())
+        self.assertTrue(watchlist.add(self.user, self.listing.pk))
+        self.assertFalse(watchlist.add(self.user, self.listing.pk))
+        self.assertEqual(watchlist.watched_ids(self.user), {self.listing.pk})
+        self.assertTrue(watchlist.remove(self.user, self.listing.pk))
+        self.assertEqual(watchlist.watched_ids(self.user), frozenset())
+
+    def test_watcher_count_only_changes_with_membership(self):
+        watchlist.add(self.user, self.listing.pk)
+        watchlist.add(self.user, self.listing.pk)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.watcher_count, 1)
+        watchlist.remove(self.user, self.listing.pk)
+        watchlist.remove(self.user, self.listing.pk)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.watcher_count, 0)
+
+
+class SummaryTests(TestCase):
+    def setUp(self):
+        bidder = User.objects.create(username="bidder")
+        self.listing, self.clean = (
+            Listing.objects.create(title=title, description="Brass", starting_bid=5) for title in ("Lamp", "Rug")
+        )
+        for amount in (6, 8):
+            bidding.place_bid(self.listing.pk, bidder, Decimal(amount))
+        Comment.objects.create(listing=self.listing, author=bidder, message="Lovely")
+        summaries.adjust(self.listing.pk, comment_count=1)
+
+    def verify(self, out=None):
+        out = out or io.StringIO()
+        call_command("rebuild_listing_summaries", "--verify", "--batch-size", "1", stdout=out)
+        return out.getvalue()
+
+    def test_verify_reports_drift_and_rebuild_fixes_it(self):
+        self.assertEqual(list(summaries.find_drift()), [])
+        self.assertIn("All listing summaries are correct", self.verify())
+        Listing.objects.filter(pk=self.listing.pk).update(bid_count=7, current_price=5)
+
+        self.assertEqual(sorted(summaries.find_drift()), [
+            (self.listing.pk, "bid_count", 7, 2), (self.listing.pk, "current_price", Decimal(5), Decimal(8)),
+        ])
+        out = io.StringIO()
+        with self.assertRaisesMessage(CommandError, "2 stale summary columns found."):
+            self.verify(out)
+        self.assertIn(f"listing {self.listing.pk}: bid_count is 7, expected 2", out.getvalue())
+        self.assertRegex(out.getvalue(), rf"listing {self.listing.pk}: current_price is 5\.00, expected 8(\.00)?\n")
+
+        call_command("rebuild_listing_summaries", stdout=io.StringIO())
+        self.listing.refresh_from_db()
+        self.assertEqual((self.listing.bid_count, self.listing.current_price), (2, Decimal(8)))
+        self.assertEqual(list(summaries.find_drift()), [])
+        self.assertIn("All listing summaries are correct", self.verify())
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        for alias in ("default", "fragments"):
+            caches[alias].clear()
+        fragment_cache.reset_stats()
+        self.bidder = User.objects.create(username="bidder")
+        owner = User.objects.create(username="owner")
+        self.listing = Listing.objects.create(title="Lamp", description="Brass", starting_bid=5, owner=owner)
+
+    def test_bid_shows_on_the_next_render(self):
+        self.client.force_login(self.bidder)
+        card, detail = "<strong>${}</strong>", '<span id="current-price">{}</span>'
+        pages = {reverse("index"): card, reverse("listing", args=(self.listing.pk,)): detail}
+        for _ in range(2):
+            for page, price in pages.items():
+                self.assertContains(self.client.get(page), price.format("5.00"))
+        self.assertEqual(fragment_cache.stats(), {
+            "card": {"hits": 1, "misses": 1}, "detail": {"hits": 1, "misses": 1},
+            "comments": {"hits": 1, "misses": 1},
+        })
+
+        bidding.place_bid(self.listing.pk, self.bidder, Decimal(8))
+        for page, price in pages.items():
+            response = self.client.get(page)
+            self.assertContains(response, price.format("8.00"))
+            self.assertNotContains(response, price.format("5.00"))
+        self.assertContains(response, '<span id="bid-count">1</span> bid ')
+        self.assertEqual(fragment_cache.stats()["card"], {"hits": 1, "misses": 2})
+
+
+class CachedUserTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.user = User.objects.create_user("cached", "cached@example.com", "secret")
+        self.client.force_login(self.user)
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("watchlist"))
+        self.assertEqual(response.status_code, 200)
+        return sum('FROM "auctions_user"' in query["sql"] for query in queries)
+
+    def test_repeat_requests_use_the_cached_user(self):
+        self.assertEqual(self.user_queries(), 1)
+        self.assertEqual(self.user_queries(), 0)
+
+    def test_password_change_ends_the_session_at_once(self):
+        self.user_queries()
+        self.user.set_password("changed")
+        self.user.save()
+        response = self.client.get(reverse("watchlist"))
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+
+
+class SearchIndexTests(TestCase):
+    def test_new_and_edited_listings_are_found(self):
+        listing = Listing.objects.create(title="Brass telescope", description="Old", starting_bid=1)
+        Listing.objects.create(title="Wool scarf", description="Warm", starting_bid=1)
+        self.assertEqual([found.pk for found in search.search("telescope")[0]], [listing.pk])
+        Listing.objects.filter(pk=listing.pk).update(title="Brass sextant")
+        self.assertEqual(search.search("telescope")[0], [])
+        self.assertEqual([found.pk for found in search.search("sext")[0]], [listing.pk])
+
+
+class TrendingTests(TestCase):
+    def setUp(self):
+        trending._pending.clear()
+        self.bidder = User.objects.create(username="bidder")
+        self.quiet, self.viewed, self.hot = (
+            Listing.objects.create(title=title, description="For sale", starting_bid=1, owner=self.bidder)
+            for title in ("Quiet", "Viewed", "Hot")
+        )
+
+    def test_views_are_buffered_until_flushed(self):
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(3):
+                self.client.get(reverse("listing", args=(self.viewed.pk,)))
+            self.client.get(reverse("listing", args=(self.hot.pk,)))
+        self.assertFalse([query for query in queries if query["sql"].startswith("UPDATE")])
+        self.viewed.refresh_from_db()
+        self.assertEqual(self.viewed.view_count, 0)
+
+        # Listings with the same number of views share one UPDATE
+        with self.assertNumQueries(2):
+            self.assertEqual(trending.flush(), 4)
+        self.viewed.refresh_from_db()
+        self.assertEqual(self.viewed.view_count, 3)
+        self.assertEqual(self.viewed.trending_score, 3 * trending.VIEW_WEIGHT)
+        self.assertEqual(trending.flush(), 0)
+
+    def test_feed_ranks_by_activity(self):
+        for _ in range(2):
+            trending.record_view(self.viewed.pk)
+        trending.flush()
+        bidding.place_bid(self.hot.pk, self.bidder, Decimal(5))
+        watchlist.add(self.bidder, self.hot.pk)
+
+        response = self.client.get(reverse("index"), {"sort": "trending"})
+        self.assertEqual([listing.pk for listing in response.context["Listings"]],
+                         [self.hot.pk, self.viewed.pk, self.quiet.pk])
+
+    def test_decay_halves_scores_each_half_life(self):
+        Listing.objects.filter(pk=self.hot.pk).update(trending_score=8)
+        Listing.objects.filter(pk=self.viewed.pk).update(trending_score=trending.MIN_SCORE)
+        with self.settings(TRENDING_HALF_LIFE_HOURS=1):
+            trending.decay(2 * 3600)
+        self.hot.refresh_from_db()
+        self.viewed.refresh_from_db()
+        self.assertAlmostEqual(self.hot.trending_score, 2)
+        self.assertEqual(self.viewed.trending_score, 0)
+
+
+class CommentThreadTests(TestCase):
+    def test_load_more_walks_the_thread_newest_first(self):
+        author = User.objects.create(username="author")
+        listing = Listing.objects.create(title="Lamp", description="Bright", starting_bid=1, owner=author)
+        start = timezone.now()
+        Comment.objects.bulk_create(
+            Comment(listing=listing, author=author, message=f"Comment {n}", created_at=start + timedelta(seconds=n))
+            for n in range(45)
+        )
+
+        response = self.client.get(reverse("listing", args=(listing.pk,)))
+        seen = [comment.message for comment in response.context["commentPage"].comments]
+        url = response.context["commentPage"].next_cursor
+        while url:
+            response = self.client.get(reverse("listingComments", args=(listing.pk,)), {"cursor": url})
+            seen += [comment.message for comment in response.context["commentPage"].comments]
+            url = response.context["commentPage"].next_cursor
+        self.assertEqual(seen, [f"Comment {n}" for n in reversed(range(45))])
+        self.assertNotContains(response, "Load more comments")
+
+    def test_bad_cursor(self):
+        response = self.client.get(reverse("listingComments", args=(1,)), {"cursor": "nonsense"})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(JOB_DEBOUNCE_SECONDS=0)
+class NotificationJobTests(TestCase):
+    def setUp(self):
+        self.owner, self.alice, self.bob = (
+            User.objects.create(username=name, email=f"{name}@example.com") for name in ("owner", "alice", "bob")
+        )
+        self.listing = Listing.objects.create(title="Lamp", description="Bright", starting_bid=1, owner=self.owner)
+
+    def recipients(self):
+        return sorted(address for email in mail.outbox for address in email.to)
+
+    def test_outbid_burst_sends_one_email_to_whoever_lost(self):
+        for bidder, amount in ((self.alice, 5), (self.bob, 6), (self.alice, 7), (self.bob, 8)):
+            with self.captureOnCommitCallbacks(execute=True):
+                bidding.place_bid(self.listing.pk, bidder, Decimal(amount))
+        # Alice's second outbid merges into her first, still pending, job
+        self.assertEqual(Job.objects.filter(kind=notifications.OUTBID).count(), 2)
+        self.assertEqual(mail.outbox, [])
+
+        self.assertEqual(jobs.process(), (2, 0))
+        # Bob is winning again by the time his job runs
+        self.assertEqual(self.recipients(), ["alice@example.com"])
+        self.assertIn("8", mail.outbox[0].body)
+
+    def test_closing_notifies_winner_owner_and_watchers(self):
+        watchers = User.objects.bulk_create(
+            User(username=f"watcher{n}", email=f"watcher{n}@example.com" if n else "") for n in range(3)
+        )
+        self.listing.watchlist.add(*watchers, self.alice)
+        bidding.place_bid(self.listing.pk, self.alice, Decimal(5))
+        with self.captureOnCommitCallbacks(execute=True):
+            expiry.close_listings([self.listing.pk])
+
+        self.assertEqual(jobs.process(), (1, 0))
+        self.assertEqual(self.recipients(), [
+            "alice@example.com", "owner@example.com", "watcher1@example.com", "watcher2@example.com",
+        ])
+        self.assertEqual(mail.outbox[0].subject, "You won Lamp")
+
+    def test_comments_fan_out_to_watchers_in_batches(self):
+        watchers = User.objects.bulk_create(User(username=f"w{n}", email=f"w{n}@example.com") for n in range(5))
+        self.listing.watchlist.add(*watchers, self.alice)
+        self.client.force_login(self.alice)
+        for text in ("First", "Second"):
+            self.client.post(reverse("addComment", args=(self.listing.pk,)), {"message": text})
+        self.assertEqual(Job.objects.filter(kind=notifications.NEW_COMMENTS).count(), 1)
+
+        send_messages = locmem.EmailBackend.send_messages
+        with mock.patch.object(notifications, "FANOUT_BATCH_SIZE", 2), \
+                mock.patch.object(locmem.EmailBackend, "send_messages", autospec=True, side_effect=send_messages) as send:
+            jobs.process()
+        self.assertEqual([len(call.args[1]) for call in send.call_args_list], [2, 2, 1])
+        self.assertEqual(self.recipients(), [f"w{n}@example.com" for n in range(5)])
+        self.assertEqual(mail.outbox[0].subject, "2 new comments on Lamp")
+
+    def test_failing_jobs_are_retried_then_kept_as_failed(self):
+        jobs.HANDLERS["broken"] = mock.Mock(side_effect=RuntimeError("smtp down"))
+        self.addCleanup(jobs.HANDLERS.pop, "broken")
+        job = jobs.enqueue("broken", {})
+
+        with self.assertLogs("auctions.jobs", "ERROR"):
+            self.assertEqual(jobs.process(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.attempts, job.finished_at, job.last_error), (1, None, "RuntimeError: smtp down"))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertEqual(jobs.stats()["depth"], {"broken": {"due": 0, "scheduled": 1}})
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.settings(JOB_MAX_ATTEMPTS=2), self.assertLogs("auctions.jobs", "ERROR"):
+            jobs.process()
+        self.assertEqual(jobs.stats()["failed"], 1)
+        self.assertEqual(jobs.stats()["depth"], {})
+        self.assertIn("commerce_jobs_failed_recently 1", self.client.get(reverse("metrics")).content.decode())
+
+
+class AuctionExpiryTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.bidder = User.objects.create(username="bidder")
+
+    def make_listing(self, ends_in):
+        return Listing.objects.create(
+            title="Clock", description="Ticking", starting_bid=1, ends_at=self.now + ends_in
+        )
+
+    def test_close_expired_records_highest_bidder(self):
+        expired = [self.make_listing(timedelta(hours=-1)) for _ in range(5)]
+        running = self.make_listing(timedelta(hours=1))
+        bidding.place_bid(running.pk, self.bidder, Decimal(5))
+        with mock.patch("auctions.bidding.timezone.now", return_value=self.now - timedelta(hours=2)):
+            bidding.place_bid(expired[0].pk, self.bidder, Decimal(5))
+
+        self.assertEqual(expiry.close_expired(now=self.now, chunk_size=2), 5)
+
+        for listing in expired:
+            listing.refresh_from_db()
+            self.assertFalse(listing.is_active)
+        self.assertEqual(expired[0].winner, self.bidder)
+        self.assertIsNone(expired[1].winner)
+        running.refresh_from_db()
+        self.assertTrue(running.is_active)
+        self.assertIsNone(running.winner)
+
+    def test_each_listing_is_closed_notified_and_published_once(self):
+        first, second = (self.make_listing(timedelta(hours=1)) for _ in range(2))
+        # Concurrent closers must not both read a listing as still active
+        lock = mock.patch("django.db.models.QuerySet.select_for_update", autospec=True,
+                          side_effect=QuerySet.select_for_update)
+        with mock.patch("auctions.events.publish_listing") as publish, self.captureOnCommitCallbacks(execute=True):
+            with lock as select_for_update:
+                self.assertEqual(expiry.close_listings([first.pk]), 1)
+            select_for_update.assert_called_once()
+            self.assertEqual(expiry.close_listings([first.pk, second.pk]), 1)
+            self.assertEqual(expiry.close_listings([first.pk, second.pk]), 0)
+        self.assertEqual(publish.call_args_list, [mock.call(first.pk, "closed"), mock.call(second.pk, "closed")])
+        notified = Job.objects.filter(kind=notifications.AUCTION_CLOSED).values_list("payload__listing", flat=True)
+        self.assertEqual(sorted(notified), [first.pk, second.pk])
+
+    def test_bids_after_end_time_are_refused(self):
+        listing = self.make_listing(timedelta(seconds=-1))
+        result = bidding.place_bid(listing.pk, self.bidder, Decimal(5))
+        self.assertEqual(result.status, bidding.CLOSED)
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.owner = User.objects.create(username="owner")
+        self.bidder = User.objects.create(username="bidder")
+        self.old, self.recent, self.running = (
+            Listing.objects.create(title=title, description="Old", starting_bid=1, owner=self.owner)
+            for title in ("Gramophone", "Radio", "Phone")
+        )
+        for listing in (self.old, self.recent):
+            bidding.place_bid(listing.pk, self.bidder, Decimal(5))
+            watchlist.add(self.bidder, listing.pk)
+        Comment.objects.bulk_create(
+            Comment(listing=self.old, author=self.bidder, message=f"Comment {n}",
+                    created_at=self.now + timedelta(seconds=n))
+            for n in range(25)
+        )
+        with mock.patch("auctions.expiry.timezone.now", return_value=self.now - timedelta(days=100)):
+            expiry.close_listings([self.old.pk])
+        expiry.close_listings([self.recent.pk])
+
+    def test_only_long_closed_listings_move_with_their_rows(self):
+        self.assertEqual(archive.archive_closed(now=self.now, days=90, chunk_size=1), 1)
+
+        self.assertEqual(list(Listing.objects.order_by("pk").values_list("pk", flat=True)),
+                         [self.recent.pk, self.running.pk])
+        self.assertFalse(Bid.objects.filter(listing=self.old.pk).exists())
+        self.assertFalse(Comment.objects.filter(listing=self.old.pk).exists())
+        archived = ArchivedListing.objects.get(pk=self.old.pk)
+        self.assertEqual(archived.winner, self.bidder)
+        self.assertEqual(archived.current_price, Decimal(5))
+        self.assertEqual(ArchivedBid.objects.filter(listing=archived).count(), 1)
+        self.assertEqual(ArchivedComment.objects.filter(listing=archived).count(), 25)
+        self.assertEqual(list(self.bidder.archivedWatchlist.all()), [archived])
+        self.assertEqual(archive.archive_closed(now=self.now, days=90), 0)
+
+    def test_archived_listing_page_is_read_only(self):
+        archive.archive_closed(now=self.now, days=90)
+        self.client.force_login(self.bidder)
+        response = self.client.get(reverse("listing", args=(self.old.pk,)))
+        self.assertTemplateUsed(response, "auctions/archived_listing.html")
+        self.assertContains(response, "has been archived")
+        self.assertNotContains(response, reverse("addBid", args=(self.old.pk,)))
+        self.assertEqual(len(response.context["commentPage"].comments), 20)
+
+        more = self.client.get(reverse("listingComments", args=(self.old.pk,)), {
+            "cursor": response.context["commentPage"].next_cursor, "archived": "1",
+        })
+        self.assertContains(more, "Comment 0")
+        self.assertEqual(self.client.get(reverse("listing", args=(self.old.pk + 100,))).status_code, 404)
+
+
+class LiveEventTests(TestCase):
+    def setUp(self):
+        self.bidder = User.objects.create(username="bidder")
+        self.listing = Listing.objects.create(title="Vase", description="Blue", starting_bid=1)
+
+    async def test_bid_is_published_to_subscribers(self):
+        def bid():
+            with self.captureOnCommitCallbacks(execute=True):
+                bidding.place_bid(self.listing.pk, self.bidder, Decimal(3))
+
+        subscription = events.broker.subscribe(self.listing.pk)
+        try:
+            await sync_to_async(bid)()
+            event = await subscription.get(timeout=1)
+        finally:
+            events.broker.unsubscribe(subscription)
+        self.assertEqual(event["type"], "bid")
+        self.assertEqual(event["current_price"], "3.00")
+        self.assertEqual(event["bid_count"], 1)
+        self.assertFalse(events.broker.has_subscribers(self.listing.pk))
+
+    @override_settings(LONG_POLL_TIMEOUT_SECONDS=0.01)
+    async def test_long_poll(self):
+        url = reverse("listingPoll", args=(self.listing.pk,))
+        response = await self.async_client.get(url, {"version": 0})
+        self.assertEqual(response.status_code, 200)
+        version = response.json()["version"]
+        self.assertEqual(version, self.listing.version)
+        response = await self.async_client.get(url, {"version": version})
+        self.assertEqual(response.status_code, 204)
+
+
+class BulkImportExportTests(TestCase):
+    def test_round_trip_restores_prices_and_counters(self):
+        owner = User.objects.create(username="seller")
+        bidder = User.objects.create(username="buyer")
+        listing = Listing.objects.create(title="Rug", description="Wool", starting_bid=2, owner=owner)
+        bidding.place_bid(listing.pk, bidder, Decimal(4))
+        bidding.place_bid(listing.pk, bidder, Decimal(6))
+        posted = timezone.now() - timedelta(days=3)
+        Comment.objects.create(listing=listing, author=owner, message="Still available", created_at=posted)
+        closed = Listing.objects.create(title="Kettle", description="Copper", starting_bid=1, owner=owner)
+        with mock.patch("auctions.expiry.timezone.now", return_value=posted):
+            expiry.close_listings([closed.pk])
+
+        with tempfile.TemporaryDirectory() as directory:
+            paths = {kind: os.path.join(directory, f"{kind}.{fmt}")
+                     for kind, fmt in (("listings", "csv"), ("bids", "jsonl"), ("comments", "csv"))}
+            for kind, path in paths.items():
+                call_command("export_marketplace", kind, path, stdout=io.StringIO())
+            Listing.objects.all().delete()
+            User.objects.all().delete()
+            for kind, path in paths.items():
+                call_command("import_marketplace", kind, path, "--create-users", stdout=io.StringIO())
+
+        listing = Listing.objects.select_related("owner", "price__user").get(pk=listing.pk)
+        self.assertEqual(listing.owner.username, "seller")
+        self.assertEqual(listing.price.user.username, "buyer")
+        self.assertEqual(listing.current_price, Decimal(6))
+        self.assertEqual((listing.bid_count, listing.comment_count), (2, 1))
+        self.assertEqual(Comment.objects.get(listing=listing).created_at, posted)
+        self.assertEqual(Listing.objects.get(pk=closed.pk).closed_at, posted)
+
+    def test_failed_batch_keeps_earlier_batches_consistent(self):
+        bidder = User.objects.create(username="buyer")
+        listing = Listing.objects.create(title="Rug", description="Wool", starting_bid=2)
+        version = listing.version
+        rows = [{"id": 100, "listing": listing.pk, "user": "buyer", "bid": "5"},
+                {"id": 100, "listing": listing.pk, "user": "buyer", "bid": "6"}]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bids.jsonl")
+            with open(path, "w") as file:
+                file.writelines(json.dumps(row) + "\n" for row in rows)
+            with self.assertRaisesMessage(CommandError, "Batch 2:"):
+                call_command("import_marketplace", "bids", path, "--batch-size", "1", stdout=io.StringIO())
+            with self.assertRaisesMessage(CommandError, "Cannot read"):
+                call_command("import_marketplace", "bids", os.path.join(directory, "missing.csv"), stdout=io.StringIO())
+
+        listing.refresh_from_db()
+        self.assertEqual((listing.price.user, listing.current_price, listing.bid_count), (bidder, Decimal(5), 1))
+        self.assertGreater(listing.version, version)
+
+    def test_import_dates_closed_listings_without_closed_at(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "listings.jsonl")
+            with open(path, "w") as file:
+                file.write(json.dumps({"id": 1, "title": "Kettle", "starting_bid": "1", "is_active": False}) + "\n")
+            call_command("import_marketplace", "listings", path, stdout=io.StringIO())
+        self.assertIsNotNone(Listing.objects.get(pk=1).closed_at)
+
+
+class StaticAssetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Collected once: brotli at its highest quality takes a few seconds
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        collected = override_settings(STATIC_ROOT=directory.name)
+        collected.enable()
+        cls.addClassCleanup(collected.disable)
+        call_command("collectstatic", interactive=False, verbosity=0)
+
+    def setUp(self):
+        self.middleware = assets.StaticFilesMiddleware(lambda request: HttpResponse(status=404))
+        self.factory = RequestFactory()
+        self.url = staticfiles_storage.url("admin/css/base.css")
+        with staticfiles_storage.open("admin/css/base.css") as file:
+            self.original = file.read()
+
+    def get(self, url, **headers):
+        response = self.middleware(self.factory.get(url, headers=headers))
+        self.addCleanup(response.close)
+        return response
+
+    def test_pages_link_hashed_names(self):
+        response = self.client.get(reverse("login"))
+        self.assertContains(response, staticfiles_storage.url("auctions/styles.css"))
+        self.assertRegex(self.url, r"^/static/admin/css/base\.[0-9a-f]{12}\.css$")
+
+    def test_hashed_files_are_compressed_and_immutable(self):
+        response = self.get(self.url, accept_encoding="gzip, deflate")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(response["Cache-Control"], assets.IMMUTABLE)
+        self.assertEqual(response["Content-Type"], "text/css; charset=utf-8")
+        content = response.getvalue()
+        self.assertEqual(int(response["Content-Length"]), len(content))
+        self.assertLess(len(content), len(self.original))
+        with staticfiles_storage.open(self.url.removeprefix("/static/")) as file:
+            self.assertEqual(gzip.decompress(content), file.read())
+
+        self.assertEqual(self.get(self.url, accept_encoding="gzip", if_none_match=response["ETag"]).status_code, 304)
+        identity = self.get(self.url, accept_encoding="gzip;q=0")
+        self.assertNotIn("Content-Encoding", identity)
+        self.assertNotEqual(identity["ETag"], response["ETag"])
+
+    def test_plain_names_are_revalidated(self):
+        response = self.get("/static/admin/css/base.css")
+        self.assertTrue(response.streaming)
+        self.assertEqual(response.getvalue(), self.original)
+        self.assertNotIn("Content-Disposition", response)
+        self.assertEqual(response["Cache-Control"], "public, max-age=3600")
+        self.assertEqual(self.get("/static/admin/css/missing.css").status_code, 404)
+
+    @skipUnless(assets.brotli, "brotli is not installed")
+    def test_brotli_is_preferred(self):
+        response = self.get(self.url, accept_encoding="gzip, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+
+    def test_responses_carry_security_headers(self):
+        response = self.client.get(self.url)
+        response.getvalue()
+        self.assertEqual(response["Cache-Control"], assets.IMMUTABLE)
+        self.assertEqual(response["X-Content-Type-Options"], "nosniff")
+        self.assertEqual(response["Referrer-Policy"], "same-origin")
+        head = self.client.head(self.url)
+        hashed = staticfiles_storage.path(self.url.removeprefix("/static/"))
+        self.assertEqual((head.content, int(head["Content-Length"])), (b"", os.path.getsize(hashed)))
+
+    def test_not_used_in_debug(self):
+        with self.settings(DEBUG=True), self.assertRaises(MiddlewareNotUsed):
+            assets.StaticFilesMiddleware(lambda request: HttpResponse())
+
+    def test_not_used_before_collectstatic(self):
+        with self.settings(STATIC_ROOT=os.path.join(settings.BASE_DIR, "missing-static")):
+            with self.assertRaises(MiddlewareNotUsed):
+                assets.StaticFilesMiddleware(lambda request: HttpResponse())
+            self.assertEqual(staticfiles_storage.url("auctions/styles.css"), "/static/auctions/styles.css")
+
+
+class WarmupTests(TestCase):
+    def test_warm_up_compiles_templates_and_primes_categories(self):
+        Category.objects.create(name="Lamps")
+        caches["default"].clear()
+        timings = warmup.warm_up()
+        self.assertNotIn(None, [result for result, _ in timings.values()])
+        loader = engines["django"].engine.template_loaders[0]
+        self.assertIn("auctions/archived_listing.html", loader.get_template_cache)
+        with self.assertNumQueries(0):
+            self.assertEqual([facet.name for facet in facets.category_facets()], ["Lamps"])
+
+    def test_failed_step_does_not_stop_boot(self):
+        failing = mock.Mock(side_effect=DatabaseError("database is starting up"))
+        with mock.patch.dict(warmup.STEPS, database=failing), self.assertLogs("auctions.warmup", "ERROR"):
+            timings = warmup.warm_up()
+        self.assertIsNone(timings["database"][0])
+        self.assertIsNotNone(timings["urls"][0])
+
+    @override_settings(WARM_UP_ON_BOOT=True)
+    def test_asgi_module_warms_up_inside_a_running_event_loop(self):
+        async def serve():
+            sys.modules.pop("commerce.asgi", None)
+            importlib.import_module("commerce.asgi")
+
+        caches["default"].clear()
+        with self.assertNoLogs("auctions.warmup", "ERROR"):
+            asyncio.run(serve())
+        with self.assertNumQueries(0):
+            facets.category_facets()
+
+
+@override_settings(READ_REPLICAS=["replica1"], REPLICA_STICKY_SECONDS=10)
+class ReplicaRoutingTests(TestCase):
+    def route(self, method="get", cookies=None, write=False):
+        seen = {}
+
+        @replica_reads
+        def view(request):
+            if write:
+                Category.objects.create(name="Written")
+            seen["listing"] = router.db_for_read(Listing)
+            seen["user"] = router.db_for_read(User)
+            return HttpResponse()
+
+        request = getattr(RequestFactory(), method)("/")
+        request.COOKIES.update(cookies or {})
+        response = ReplicaRoutingMiddleware(view)(request)
+        return seen, response
+
+    def test_browse_reads_go_to_a_replica(self):
+        seen, response = self.route()
+        self.assertEqual(seen, {"listing": "replica1", "user": "default"})
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_writes_pin_reads_to_the_primary(self):
+        seen, response = self.route(write=True)
+        self.assertEqual(seen["listing"], "default")
+        self.assertEqual(response.cookies[STICKY_COOKIE]["max-age"], 10)
+        seen, _ = self.route(cookies={STICKY_COOKIE: "1"})
+        self.assertEqual(seen["listing"], "default")
+
+    def test_unsafe_methods_and_non_requests_use_the_primary(self):
+        seen, _ = self.route(method="post")
+        self.assertEqual(seen["listing"], "default")
+        self.assertEqual(router.db_for_read(Listing), "default")
+
+
+class CategoryFacetTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.toys = Category.objects.create(name="Toys & Games")
+        self.books = Category.objects.create(name="Books")
+        for _ in range(2):
+            Listing.objects.create(title="Kite", description="Red", starting_bid=1, category=self.toys)
+
+    def counts(self):
+        return {facet.name: facet.active_count for facet in facets.category_facets()}
+
+    def test_counts_follow_new_and_closed_listings(self):
+        self.assertEqual(self.counts(), {"Books": 0, "Toys & Games": 2})
+        with self.assertNumQueries(0):
+            self.counts()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book = Listing.objects.create(title="Atlas", description="Maps", starting_bid=1, category=self.books)
+            facets.adjust(self.books.pk, 1)
+            expiry.close_listings([book.pk, Listing.objects.filter(category=self.toys).first().pk])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.counts(), {"Books": 0, "Toys & Games": 1})
+
+    def test_find_by_slug_id_or_name(self):
+        self.assertEqual(self.toys.slug, "toys-games")
+        for value in ("toys-games", str(self.toys.pk), "Toys & Games"):
+            self.assertEqual(facets.find(value).id, self.toys.pk)
+        self.assertIsNone(facets.find("garden"))
+
+    def test_index_filters_by_slug(self):
+        response = self.client.get(reverse("index"), {"category": "toys-games"})
+        self.assertEqual(len(response.context["Listings"]), 2)
+        self.assertEqual(response.context["selectedCategory"], "toys-games")
+        response = self.client.get(reverse("index"), {"category": "books"})
+        self.assertEqual(len(response.context["Listings"]), 0)
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.bidder = User.objects.create(username="bidder")
+        self.listing = Listing.objects.create(title="Lamp", description="Brass", starting_bid=1)
+        self.url = reverse("apiListing", args=(self.listing.pk,))
+
+    def test_unchanged_listing_is_not_modified_until_a_bid(self):
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(
+            self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]).status_code, 304
+        )
+
+        bidding.place_bid(self.listing.pk, self.bidder, Decimal(5))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["current_price"], "5.00")
+        self.assertEqual(response.json()["highest_bidder"], "bidder")
+
+    def test_sparse_fields(self):
+        response = self.client.get(reverse("apiListings"), {"fields": "id,current_price"})
+        self.assertEqual(response.json(), {
+            "results": [{"id": self.listing.pk, "current_price": "1.00"}], "next": None,
+        })
+        response = self.client.get(reverse("apiListings"), {"fields": "id,secret"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_gzip(self):
+        response = self.client.get(reverse("apiListings"), HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+    def test_non_finite_cursors_are_bad_requests(self):
+        for sort, value in (("price_low", "NaN"), ("price_high", "Infinity"), ("trending", "-inf")):
+            cursor = pagination.encode_cursor(value, 1)
+            for url in (reverse("index"), reverse("apiListings")):
+                with self.subTest(sort=sort, url=url):
+                    self.assertEqual(self.client.get(url, {"sort": sort, "cursor": cursor}).status_code, 400)
+
+
+class LegacyDataMigrationTests(TransactionTestCase):
+    """Data migrations that bring listings from before the bid ledger up to date."""
+
+    def migrate(self, target=None):
+        """Migrate to ``target``, or to the latest migration; returns the historical apps."""
+        executor = MigrationExecutor(connection)
+        targets = [("auctions", target)] if target else executor.loader.graph.leaf_nodes("auctions")
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate()
+
+    def test_never_bid_listing_has_no_bids_and_closes_without_a_winner(self):
+        apps = self.migrate("0010_bid_ledger")
+        OldUser, OldListing, OldBid = (apps.get_model("auctions", name) for name in ("User", "Listing", "Bid"))
+        owner = OldUser.objects.create(username="owner")
+        bidder = OldUser.objects.create(username="bidder")
+        unbid = OldListing.objects.create(
+            title="Vase", description="Blue", starting_bid=10, owner=owner,
+            price=OldBid.objects.create(user=owner, bid=10),
+        )
+        sold = OldListing.objects.create(
+            title="Jug", description="Red", starting_bid=10, owner=owner,
+            price=OldBid.objects.create(user=bidder, bid=12),
+        )
+        self.migrate()
+
+        unbid = Listing.objects.get(pk=unbid.pk)
+        self.assertIsNone(unbid.price_id)
+        self.assertEqual((unbid.bid_count, unbid.current_price), (0, Decimal(10)))
+        self.assertFalse(Bid.objects.filter(user=owner.pk).exists())
+        self.assertEqual(Listing.objects.get(pk=sold.pk).bid_count, 1)
+
+        expiry.close_listings([unbid.pk, sold.pk])
+        self.assertIsNone(Listing.objects.get(pk=unbid.pk).winner_id)
+        self.assertEqual(Listing.objects.get(pk=sold.pk).winner_id, bidder.pk)
+
+    def test_placeholders_already_in_the_ledger_are_dropped(self):
+        self.migrate("0023_listing_archive")
+        owner = User.objects.create(username="owner")
+        bidder = User.objects.create(username="bidder")
+        closed, outbid = (
+            Listing.objects.create(title=title, description="Old", starting_bid=10, owner=owner)
+            for title in ("Vase", "Jug")
+        )
+        for listing in (closed, outbid):
+            placeholder = Bid.objects.create(user=owner, bid=10, listing=listing)
+            Listing.objects.filter(pk=listing.pk).update(price=placeholder, bid_count=1)
+        bidding.place_bid(outbid.pk, bidder, Decimal(12))
+        expiry.close_listings([closed.pk])
+        archived = ArchivedListing.objects.create(
+            title="Lamp", description="Old", starting_bid=10, owner=owner, winner=owner,
+            created_at=timezone.now(), current_price=10, bid_count=1,
+        )
+        ArchivedBid.objects.create(listing=archived, user=owner, bid=10, created_at=timezone.now())
+        self.assertEqual(Listing.objects.get(pk=closed.pk).winner, owner)
+
+        self.migrate()
+
+        closed = Listing.objects.get(pk=closed.pk)
+        self.assertEqual((closed.price_id, closed.bid_count, closed.winner_id), (None, 0, None))
+        outbid = Listing.objects.get(pk=outbid.pk)
+        self.assertEqual((outbid.bid_count, outbid.current_price), (1, Decimal(12)))
+        self.assertEqual(list(bidding.bidders(outbid)), [bidder])
+        archived.refresh_from_db()
+        self.assertEqual((archived.bid_count, archived.winner), (0, None))
+        self.assertFalse(ArchivedBid.objects.exists())
+
+    def test_legacy_listings_get_a_week_from_migrating_and_closed_ones_their_winner(self):
+        self.migrate("0024_drop_placeholder_bids")
+        bidder = User.objects.create(username="bidder")
+        closed, stale, fresh = (
+            Listing.objects.create(title=title, description="Old", starting_bid=1)
+            for title in ("Vase", "Jug", "Lamp")
+        )
+        for listing in (closed, stale):
+            bidding.place_bid(listing.pk, bidder, Decimal(5))
+        Listing.objects.filter(pk=closed.pk).update(is_active=False)
+        Listing.objects.filter(pk=stale.pk).update(created_at=timezone.now() - timedelta(days=30))
+
+        began = timezone.now()
+        self.migrate()
+
+        self.assertEqual(Listing.objects.get(pk=closed.pk).winner, bidder)
+        self.assertEqual(expiry.close_expired(), 0)
+        for listing in Listing.objects.filter(pk__in=(stale.pk, fresh.pk)):
+            self.assertTrue(listing.is_active)
+            self.assertGreaterEqual(listing.ends_at, began + timedelta(days=7))
+        self.assertEqual(expiry.close_expired(now=began + timedelta(days=8)), 2)
+        self.assertEqual(Listing.objects.get(pk=stale.pk).winner, bidder)
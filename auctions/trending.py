@@ -0,0 +1,130 @@
+"""
+Listing popularity for the trending feed.
+
+Page views are counted in memory by each worker and written in batches, so
+a busy listing costs one UPDATE per flush interval instead of one per view.
+Views, accepted bids and new watchers each add weight to a listing's
+``trending_score``; a periodic job decays every score by half each
+TRENDING_HALF_LIFE_HOURS, so the score approximates recent activity and
+the feed just reads an indexed column.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Case, F, Value, When
+
+from .models import ACTIVE, Listing
+
+
+logger = logging.getLogger(__name__)
+
+VIEW_WEIGHT = 1.0
+BID_WEIGHT = 5.0
+WATCH_WEIGHT = 10.0
+
+# Decayed scores below this are zeroed, so they stop being rewritten
+MIN_SCORE = 0.01
+
+_pending = Counter()
+_lock = threading.Lock()
+_flusher = None
+
+
+def record_view(listing_id):
+    """Count a page view; written to the database by the next flush."""
+    with _lock:
+        _pending[listing_id] += 1
+    _ensure_flusher()
+
+
+def flush():
+    """Write the buffered views in one UPDATE per distinct view count."""
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+    if not pending:
+        return 0
+    by_count = defaultdict(list)
+    for listing_id, views in pending.items():
+        by_count[views].append(listing_id)
+    try:
+        for views, ids in by_count.items():
+            Listing.objects.filter(pk__in=ids).update(
+                view_count=F("view_count") + views,
+                trending_score=F("trending_score") + views * VIEW_WEIGHT,
+            )
+    except Exception:
+        # Keep the views for the next attempt rather than dropping them
+        with _lock:
+            _pending.update(pending)
+        raise
+    return sum(pending.values())
+
+
+def decay(elapsed_seconds):
+    """Age every active listing's score by ``elapsed_seconds``."""
+    factor = 0.5 ** (elapsed_seconds / (settings.TRENDING_HALF_LIFE_HOURS * 3600))
+    return Listing.objects.filter(ACTIVE, trending_score__gt=0).update(
+        trending_score=Case(
+            When(trending_score__lt=MIN_SCORE / factor, then=Value(0.0)),
+            default=F("trending_score") * factor,
+        )
+    )
+
+
+def _run_flusher(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            flush()
+        except Exception:
+            logger.exception("Flushing listing view counts failed")
+        finally:
+            close_old_connections()
+
+
+def _ensure_flusher():
+    """Start this process's flush thread on its first recorded view."""
+    global _flusher
+    interval = settings.VIEW_COUNT_FLUSH_SECONDS
+    if _flusher is not None or not interval:
+        return
+    with _lock:
+        if _flusher is None:
+            _flusher = threading.Thread(
+                target=_run_flusher, args=(interval,), name="view-count-flusher", daemon=True
+            )
+            _flusher.start()
+            # Daemon threads die with the process; write what is left first
+            atexit.register(flush)
+
+
+def run_periodically(interval, stop=None):
+    """Decay scores every ``interval`` seconds until ``stop`` is set."""
+    stop = stop or threading.Event()
+    last = time.monotonic()
+    while not stop.wait(interval):
+        now = time.monotonic()
+        try:
+            decay(now - last)
+            last = now
+        except Exception:
+            # The next run decays by the whole time since the last success
+            logger.exception("Decaying trending scores failed")
+        finally:
+            close_old_connections()
+
+
+def start_periodic_decay(interval):
+    """Run the decay in a daemon thread of the current process."""
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=run_periodically, args=(interval, stop), name="trending-decay", daemon=True,
+    )
+    thread.start()
+    return stop
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 urlpatterns = [
     path("", views.index, name="index"),
@@ -8,13 +8,22 @@ urlpatterns = [
     path("logout/", views.logout_view, name="logout"),
     path("register/", views.register, name="register"),
     path("create/", views.createListing, name="create"),
+    path("search/", views.search, name="search"),
     path("diplayCategory", views.displayCategory, name="displayCategory"),
     path("listing/<int:id>/", views.listing, name="listing"),
+    path("listing/<int:id>/comments/", views.listingComments, name="listingComments"),
+    path("listing/<int:id>/events", views.listingEvents, name="listingEvents"),
+    path("listing/<int:id>/poll", views.listingPoll, name="listingPoll"),
     path("removeWatchlist/<int:id>/", views.removeWatchlist, name="removeWatchlist"),
     path("addWatchlist/<int:id>/", views.addWatchlist, name="addWatchlist"),
     path("watchlist/", views.watchlist, name="watchlist"),
     path("addComment/<int:id>/", views.addComment, name="addComment"),
     path("addBid/<int:id>/", views.addBid, name="addBid"),
      path("closeAuction/<int:id>/", views.closeAuction, name="closeAuction"), 
+    path("metrics", views.metrics, name="metrics"),
+    path("api/listings/", api.listings, name="apiListings"),
+    path("api/listings/<int:id>/", api.listing, name="apiListing"),
+    path("api/categories/", api.categories, name="apiCategories"),
+    path("api/watchlist/", api.watchlist, name="apiWatchlist"),
     
     ]
@@ -1,20 +1,89 @@
+import asyncio
 from django.contrib.auth import authenticate, login, logout
-from django.db import IntegrityError
-from django.http import HttpResponse, HttpResponseRedirect
+from django.db import IntegrityError, transaction
+from django.conf import settings
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, HttpResponseRedirect,
+    JsonResponse, StreamingHttpResponse,
+)
 from django.shortcuts import render, redirect
 from django.urls import reverse
-from .models import User, Listing, Category, Comment, Bid
+from .models import User, Listing, Category, Comment, ArchivedListing
+from . import bidding, comments, events, expiry, facets, jobs, notifications, profiling, summaries, trending
+from . import search as listing_search
+from . import watchlist as user_watchlist
 from django.contrib.auth.decorators import login_required
+from datetime import timedelta
 from decimal import Decimal
+from django.utils import timezone
 from django.contrib import messages
+from urllib.parse import urlencode
+from .pagination import DEFAULT_SORT, SORTS, InvalidCursor, paginate
+from .routers import replica_reads
+from django.views.decorators.http import require_safe
 
 
+@replica_reads
 def index(request):
-    activeListings = Listing.objects.filter(is_active=True)
-    categories = Category.objects.all()
+    activeListings = Listing.objects.active().for_cards()
+    # Categories come from the cached facets, so filtering needs no lookup
+    category = facets.find(request.GET.get("category"))
+    if category:
+        activeListings = activeListings.filter(category_id=category.id)
+    elif request.GET.get("category"):
+        activeListings = activeListings.none()
+    selectedSort = request.GET.get("sort", DEFAULT_SORT)
+    if selectedSort not in SORTS:
+        selectedSort = DEFAULT_SORT
+
+    try:
+        listings, nextCursor = paginate(
+            activeListings,
+            cursor=request.GET.get("cursor"),
+            page_size=request.GET.get("page_size"),
+            sort=selectedSort,
+        )
+    except InvalidCursor:
+        return HttpResponseBadRequest("Invalid page cursor.")
+
+    nextPageQuery = None
+    if nextCursor:
+        params = {"cursor": nextCursor}
+        for key in ("category", "sort", "page_size"):
+            if request.GET.get(key):
+                params[key] = request.GET[key]
+        nextPageQuery = urlencode(params)
+
     return render(request, "auctions/index.html", {
-        "Listings": activeListings,
-        "categories": categories
+        "Listings": listings,
+        "categories": facets.category_facets(),
+        "selectedCategory": category.slug if category else "",
+        "selectedSort": selectedSort,
+        "watchedIds": user_watchlist.watched_ids(request.user),
+        "nextPageQuery": nextPageQuery
+    })
+
+@replica_reads
+def search(request):
+    query = request.GET.get("q", "").strip()
+    category = facets.find(request.GET.get("category"))
+    try:
+        page = int(request.GET.get("page", 1))
+    except ValueError:
+        page = 1
+
+    results, hasNext = listing_search.search(query, category_id=category.id if category else None, page=page)
+    params = {"q": query}
+    if category:
+        params["category"] = category.slug
+    return render(request, "auctions/search.html", {
+        "query": query,
+        "Listings": results,
+        "categories": facets.category_facets(),
+        "selectedCategory": category.slug if category else "",
+        "watchedIds": user_watchlist.watched_ids(request.user),
+        "previousPageQuery": urlencode({**params, "page": page - 1}) if page > 1 else None,
+        "nextPageQuery": urlencode({**params, "page": page + 1}) if hasNext else None
     })
 
 def createListing(request):
@@ -24,13 +93,20 @@ def createListing(request):
             categories = Category.objects.all()
             return render(request, "auctions/create.html", {
                 "error": "Starting bid is required.",
-                "categories": categories
+                "categories": categories,
+                "durations": settings.AUCTION_DURATION_CHOICES_DAYS
             })
         title = request.POST["title"]
         description = request.POST["description"]
         image_url = request.POST.get("image_url", "")
         category_name = request.POST["category"]
         currentUser = request.user
+        try:
+            durationDays = int(request.POST.get("duration_days", settings.AUCTION_DEFAULT_DURATION_DAYS))
+        except ValueError:
+            durationDays = settings.AUCTION_DEFAULT_DURATION_DAYS
+        if durationDays not in settings.AUCTION_DURATION_CHOICES_DAYS:
+            durationDays = settings.AUCTION_DEFAULT_DURATION_DAYS
 
         # Get the category object safely
         try:
@@ -39,13 +115,11 @@ def createListing(request):
             categories = Category.objects.all()
             return render(request, "auctions/create.html", {
                 "error": "Category does not exist.",
-                "categories": categories
+                "categories": categories,
+                "durations": settings.AUCTION_DURATION_CHOICES_DAYS
             })
 
-        # Create and save listing
-        bid = Bid(bid=Decimal(starting_bid), user=currentUser)
-        bid.save()  # Save the bid object first
-
+        # Create and save listing; it has no price until the first bid arrives
         newListing = Listing(
             title=title,
             description=description,
@@ -54,14 +128,19 @@ def createListing(request):
             owner=currentUser,
             category=categoryData,
             is_active=True,
-            price=bid  
+            ends_at=timezone.now() + timedelta(days=durationDays)
         )
         newListing.save()
+        facets.adjust(categoryData.pk, 1)
 
         return redirect("index")  
     else:
         categories = Category.objects.all()
-        return render(request, "auctions/create.html", {"categories": categories})
+        return render(request, "auctions/create.html", {
+            "categories": categories,
+            "durations": settings.AUCTION_DURATION_CHOICES_DAYS,
+            "defaultDuration": settings.AUCTION_DEFAULT_DURATION_DAYS
+        })
 
 
 def login_view(request):
@@ -110,7 +189,7 @@ def register(request):
             return render(request, "auctions/register.html", {
                 "message": "Username already taken."
             })
-        login(request, user)
+        login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
         return HttpResponseRedirect(reverse("index"))
     else:
         return render(request, "auctions/register.html")
@@ -139,11 +218,7 @@ def create(request):
                 "error": "Category does not exist.",
                 "categories": categories
             })
-        #create a bidobject
-        bid = Bid(bid=int(starting_bid), user=currentUser)
-        bid.save()  # Save the bid object first
-
-        # Create and save listing, now with price=bid
+        # Create and save listing; it has no price until the first bid arrives
         newListing = Listing(
             title=title,
             description=description,
@@ -151,8 +226,7 @@ def create(request):
             image_url=image_url,
             owner=currentUser,
             category=categoryData,
-            is_active=True,
-            price=bid  
+            is_active=True
         )
         newListing.save()
 
@@ -162,49 +236,133 @@ def create(request):
         return render(request, "auctions/create.html", {"categories": categories})
 
 def displayCategory(request):
-    if request.method == "POST":
-        CategoryFromForm = request.POST.get("category")
-        category = Category.objects.get(name=CategoryFromForm)
-        activeListings = Listing.objects.filter(is_active=True, category=category)
-        categories = Category.objects.all()
-        return render(request, "auctions/index.html", {
-            "Listings": activeListings,
-            "categories": categories
-        })
+    # Kept for old bookmarks and forms; filtering now happens on the index over GET
+    CategoryFromForm = request.POST.get("category") or request.GET.get("category")
+    if not CategoryFromForm:
+        return redirect("index")
+    return HttpResponseRedirect(reverse("index") + "?" + urlencode({"category": CategoryFromForm}))
+
+@replica_reads
 def listing(request, id):
-    listingData = Listing.objects.get(pk=id)
-    isListingInWatchlist = request.user in listingData.watchlist.all()
-    allComments = Comment.objects.filter(listing=listingData)
+    listingData = Listing.objects.select_related("owner", "price").filter(pk=id).first()
+    if listingData is None:
+        return archivedListing(request, id)
+    trending.record_view(listingData.pk)
+    isListingInWatchlist = user_watchlist.is_watching(request.user, listingData.pk)
     isOwwner = request.user.username == listingData.owner.username
     return render(request, "auctions/listing.html", {
         "listing": listingData,
         "isListingInWatch": isListingInWatchlist,
-        "allComments": allComments,
+        "commentPage": comments.CommentPage(listingData.pk),
         "isOwner": isOwwner
     })
 
+def archivedListing(request, id):
+    # Long-closed listings moved out by archive.py; shown read-only
+    listingData = ArchivedListing.objects.select_related("owner", "winner", "category").filter(pk=id).first()
+    if listingData is None:
+        raise Http404("Listing not found.")
+    return render(request, "auctions/archived_listing.html", {
+        "listing": listingData,
+        "commentPage": comments.CommentPage(listingData.pk, archived=True)
+    })
+
+@require_safe
+@replica_reads
+def listingComments(request, id):
+    """The next page of a listing's comments as HTML, for "Load more"."""
+    try:
+        commentPage = comments.CommentPage(
+            id, cursor=request.GET.get("cursor"), archived=request.GET.get("archived") == "1"
+        )
+    except InvalidCursor:
+        return HttpResponseBadRequest("Invalid page cursor.")
+    return render(request, "auctions/comments.html", {"listingId": id, "commentPage": commentPage})
+
+async def listingEvents(request, id):
+    """Server-sent events with the listing's price, bid count and state."""
+    if await events.listing_snapshot(id) is None:
+        raise Http404("Listing not found.")
+
+    async def stream():
+        # Subscribe before reading the snapshot so no change can slip between
+        subscription = events.broker.subscribe(id)
+        try:
+            snapshot = await events.listing_snapshot(id)
+            yield f"retry: {settings.EVENTS_RETRY_MILLISECONDS}\n"
+            yield events.format_sse({"type": "snapshot", **snapshot})
+            isActive = snapshot["is_active"]
+            while isActive:
+                try:
+                    event = await subscription.get(timeout=settings.EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comment lines keep proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                yield events.format_sse(event)
+                isActive = event["is_active"]
+        finally:
+            events.broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+async def listingPoll(request, id):
+    """
+    Long-poll fallback for clients without EventSource: answers at once if
+    the listing changed since the version the client passes, otherwise waits
+    for the next event or the timeout (204).
+    """
+    try:
+        knownVersion = int(request.GET.get("version", 0))
+    except ValueError:
+        return HttpResponseBadRequest("Invalid version.")
+    subscription = events.broker.subscribe(id)
+    try:
+        snapshot = await events.listing_snapshot(id)
+        if snapshot is None:
+            raise Http404("Listing not found.")
+        if snapshot["version"] != knownVersion:
+            return JsonResponse({"type": "snapshot", **snapshot})
+        try:
+            event = await subscription.get(timeout=settings.LONG_POLL_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            return HttpResponse(status=204)
+        return JsonResponse(event)
+    finally:
+        events.broker.unsubscribe(subscription)
+
+def metrics(request):
+    # Only exposed to local scrapers
+    if request.META.get("REMOTE_ADDR") not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    body = profiling.registry.render() + jobs.render_metrics()
+    return HttpResponse(body, content_type="text/plain; version=0.0.4")
+
 def listingDetail(request, listing_id):
     # your logic here
     pass
 def removeWatchlist(request, id):
     listingData =Listing.objects.get(pk=id)
     currentUser = request.user
-    listingData.watchlist.remove(currentUser)
+    user_watchlist.remove(currentUser, listingData.pk)
     return HttpResponseRedirect(reverse("listing", args=(id, )))
 
    
 def addWatchlist(request, id):
     listing = Listing.objects.get(pk=id)
     currentUser = request.user
-    listing.watchlist.add(currentUser)
-    print(listing.watchlist.all())  
+    user_watchlist.add(currentUser, listing.pk)
     return HttpResponseRedirect(reverse("listing", args=(id, )))
 
 
 @login_required
+@replica_reads
 def watchlist(request):
     currentUser = request.user
-    listings = currentUser.listingWatchlist.all()
+    listings = currentUser.listingWatchlist.for_cards()
     return render(request, "auctions/watchlist.html", {
         "listings": listings
     })
@@ -219,50 +377,44 @@ def addComment(request, id):
             listing=listingData,
             message=message
         )
-        newComment.save()
+        with transaction.atomic():
+            newComment.save()
+            summaries.adjust(id, comment_count=1, version=1)
+            notifications.new_comment(newComment)
         return HttpResponseRedirect(reverse("listing", args=(id, )))
 
 def addBid(request, id):
     if request.method == "POST":
         bid_amount = request.POST.get("bid_amount")
-        currentUser = request.user
-        listing = Listing.objects.get(pk=id)
-        isListinginWatchlist = request.user in listing.watchlist.all()
-        allComments = Comment.objects.filter(listing=listing)
-        sowner = request.user.username == listing.owner.username
 
-           
-    
         # Validate bid
         try:
             bid_amount = Decimal(bid_amount)
         except:
             messages.error(request, "Invalid bid amount.")
             return HttpResponseRedirect(reverse("listing", args=(id, )))
+        if not bid_amount.is_finite():
+            messages.error(request, "Invalid bid amount.")
+            return HttpResponseRedirect(reverse("listing", args=(id, )))
 
-        
-        if bid_amount < listing.starting_bid:
+        # The comparison with the current price happens atomically in place_bid
+        result = bidding.place_bid(id, request.user, bid_amount)
+        if result.accepted:
+            messages.success(request, "Your Bid was Successful")
+        elif result.status == bidding.BELOW_STARTING_BID:
             messages.error(
                 request,
-                f"Your bid was unsuccessful. Bid must be at least the initial price (${listing.starting_bid})."
+                f"Your bid was unsuccessful. Bid must be at least the initial price (${result.current_price})."
             )
-            return HttpResponseRedirect(reverse("listing", args=(id, )))
-
-        
-        current_price = listing.price.bid if listing.price else listing.starting_bid
-        if bid_amount <= current_price:
+        elif result.status == bidding.CLOSED:
+            messages.error(request, "Your bid was unsuccessful. This auction is closed.")
+        elif result.status == bidding.CONTENDED:
+            messages.error(request, "Bidding on this listing is very busy right now. Please try again.")
+        else:
             messages.error(
                 request,
-                f"Your bid was unsuccessful. Bid must be higher than the current bid (${current_price})."
+                f"Your bid was unsuccessful. Bid must be higher than the current bid (${result.current_price})."
             )
-            return HttpResponseRedirect(reverse("listing", args=(id, )))
-
-        # Save new bid
-        new_bid = Bid(bid=bid_amount, user=request.user)
-        new_bid.save()
-        listing.price = new_bid
-        listing.save()
-        messages.success(request, "Your Bid was Successful")
         return HttpResponseRedirect(reverse("listing", args=(id, )))
     else:
         messages.error(request, "Your Bid Was Unsuccessful. Please try again.")
@@ -272,8 +424,8 @@ def closeAuction(request, id):
     listing = Listing.objects.get(pk=id)
     if request.method == "POST":
         if request.user == listing.owner and listing.is_active:
-            listing.is_active = False
-            listing.save()
+            # Update in place so a bid placed meanwhile is not overwritten
+            expiry.close_listings([listing.pk])
             messages.success(request, "Auction closed successfully.")
         else:
             messages.error(request, "You are not allowed to close this auction.")
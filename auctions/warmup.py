@@ -0,0 +1,121 @@
+"""
+Boot-time warm-up, so a new worker's first request costs what later ones do.
+
+wsgi.py and asgi.py run warm_up() when WARM_UP_ON_BOOT is set, and `manage.py
+warmup` runs and times it. It compiles the auctions templates into the
+cached loader, compiles every URL pattern and fills the reverse lookup
+tables, opens the database connections and primes the category cache. A
+failing step is logged and skipped: a database that is still starting must
+not keep a worker from booting.
+
+Connections are opened in the calling thread, so they only carry over to
+requests served by that thread (sync WSGI workers) and only while
+CONN_MAX_AGE keeps them open. Under a preforking server that loads the app
+before forking, run warm_up() in each worker after the fork instead, so no
+connection is shared between processes.
+
+ASGI servers import the application from inside their running event loop,
+where Django refuses database access, so asgi.py uses warm_up_in_thread().
+"""
+import logging
+import os
+import threading
+import time
+
+from django.apps import apps
+from django.db import connections
+from django.template import engines
+from django.urls import URLResolver, get_resolver
+
+from . import facets, search
+
+
+logger = logging.getLogger(__name__)
+
+
+def compile_templates():
+    """Parse every auctions template into the cached loader; returns how many."""
+    directory = os.path.join(apps.get_app_config("auctions").path, "templates")
+    names = [
+        os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, "/")
+        for root, _, filenames in os.walk(directory) for filename in filenames
+    ]
+    for engine in engines.all():
+        for name in names:
+            engine.get_template(name)
+    return len(names)
+
+
+def resolve_urls(resolver=None):
+    """Compile every URL pattern and fill the reverse lookup tables; returns how many."""
+    resolver = resolver or get_resolver()
+    resolver.reverse_dict
+    count = 0
+    for pattern in resolver.url_patterns:
+        pattern.pattern.regex
+        if isinstance(pattern, URLResolver):
+            count += resolve_urls(pattern)
+        else:
+            count += 1
+    return count
+
+
+def open_connections():
+    """Connect to every database, and run the process-wide schema lookups."""
+    for alias in connections:
+        connections[alias].ensure_connection()
+    search.has_fts_index()
+    return len(connections.all())
+
+
+def prime_caches():
+    return len(facets.category_facets())
+
+
+STEPS = {
+    "templates": compile_templates,
+    "urls": resolve_urls,
+    "database": open_connections,
+    "caches": prime_caches,
+}
+
+
+def warm_up():
+    """
+    Run every step. Returns {step: (result, milliseconds)}, where the result
+    is a count of what was warmed, or None if the step failed.
+    """
+    timings = {}
+    for name, step in STEPS.items():
+        began = time.perf_counter()
+        try:
+            result = step()
+        except Exception:
+            logger.exception("Warm-up step %r failed", name)
+            result = None
+        timings[name] = (result, (time.perf_counter() - began) * 1000)
+    logger.info(
+        "Warmed up in %.0f ms (%s)", sum(ms for _, ms in timings.values()),
+        ", ".join(f"{name} {ms:.0f} ms" for name, (_, ms) in timings.items()),
+    )
+    return timings
+
+
+def warm_up_in_thread():
+    """
+    Run warm_up() in a worker thread and wait for it, for callers that may be
+    inside an event loop. The thread's connections are closed afterwards,
+    since nothing else will use them.
+    """
+    timings = {}
+
+    def run():
+        try:
+            timings.update(warm_up())
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=run, name="warm-up")
+    thread.start()
+    thread.join()
+    return timings
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import summaries, trending
+from .models import Listing
+
+
+Watcher = Listing.watchlist.through
+
+
+def _cache_key(user_id):
+    return f"watchlist-ids:{user_id}"
+
+
+def is_watching(user, listing_id):
+    """Indexed existence check on the (listing, user) unique pair."""
+    if not user.is_authenticated:
+        return False
+    return Watcher.objects.filter(listing_id=listing_id, user_id=user.pk).exists()
+
+
+def watched_ids(user):
+    """
+    The set of listing IDs ``user`` watches, cached until their watchlist
+    changes, so a whole page of cards can be badged with one lookup.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    key = _cache_key(user.pk)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(Watcher.objects.filter(user_id=user.pk).values_list("listing_id", flat=True))
+        cache.set(key, ids, getattr(settings, "WATCHLIST_CACHE_TIMEOUT", 300))
+    return ids
+
+
+def add(user, listing_id):
+    """Watch a listing; returns False if the user already watched it."""
+    with transaction.atomic():
+        _, created = Watcher.objects.get_or_create(listing_id=listing_id, user_id=user.pk)
+        if created:
+            summaries.adjust(listing_id, watcher_count=1, version=1, trending_score=trending.WATCH_WEIGHT)
+    if created:
+        cache.delete(_cache_key(user.pk))
+    return created
+
+
+def remove(user, listing_id):
+    """Stop watching a listing; returns False if the user was not watching it."""
+    with transaction.atomic():
+        removed, _ = Watcher.objects.filter(listing_id=listing_id, user_id=user.pk).delete()
+        if removed:
+            summaries.adjust(listing_id, watcher_count=-1, version=1)
+    if removed:
+        cache.delete(_cache_key(user.pk))
+    return bool(removed)
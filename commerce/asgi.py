@@ -9,8 +9,13 @@ https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'commerce.settings')
 
 application = get_asgi_application()
+
+if settings.WARM_UP_ON_BOOT:
+    from auctions.warmup import warm_up_in_thread
+    warm_up_in_thread()
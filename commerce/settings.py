@@ -42,6 +42,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'auctions.assets.StaticFilesMiddleware',
+    'auctions.profiling.RequestProfilingMiddleware',
+    'auctions.routers.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -54,9 +57,10 @@ ROOT_URLCONF = 'commerce.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, timing renders for RequestProfilingMiddleware
+        'BACKEND': 'auctions.profiling.ProfiledDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -64,12 +68,24 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Templates are compiled once per process and kept, so the boot
+            # warm-up (auctions/warmup.py) can compile them ahead of requests
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
 
 WSGI_APPLICATION = 'commerce.wsgi.application'
 
+# Compile templates, URL patterns and connect to the databases when a
+# worker loads wsgi.py/asgi.py, rather than on its first request
+WARM_UP_ON_BOOT = os.environ.get('WARM_UP_ON_BOOT', '1') != '0'
+
 
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
@@ -81,11 +97,73 @@ DATABASES = {
     }
 }
 
+# DATABASE_PROFILE=production tunes SQLite for a long-running server:
+# write-ahead logging so readers never wait for the writer, pragmas applied
+# to every new connection, IMMEDIATE transactions so writers queue on the
+# busy timeout instead of failing with "database is locked" when upgrading
+# a read lock, and connections kept open between requests.
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # Durable across app crashes; WAL makes it safe
+    'cache_size': -64000,  # In KiB, so 64 MB of page cache per connection
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,  # Milliseconds
+    'temp_store': 'MEMORY',
+}
+
+if os.environ.get('DATABASE_PROFILE') == 'production':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRODUCTION_PRAGMAS.items()),
+            'transaction_mode': 'IMMEDIATE',
+        },
+    })
+
+# Read replicas
+# READ_REPLICAS=N adds N replica aliases. Browse views decorated with
+# @replica_reads send their queries to one of them; writes, and reads by a
+# client for REPLICA_STICKY_SECONDS after it wrote something, stay on the
+# primary. Locally the replicas are SQLite copies of the primary refreshed by
+# `manage.py replicate_database`.
+READ_REPLICAS = [f'replica{n}' for n in range(1, int(os.environ.get('READ_REPLICAS', 0)) + 1)]
+for alias in READ_REPLICAS:
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': os.path.join(BASE_DIR, f'db.{alias}.sqlite3'),
+        # Tests run against the primary test database only
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['auctions.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = 10
+
 AUTH_USER_MODEL = 'auctions.User'
 
 
 LOGIN_URL = '/login/'
 
+# Logged-in users are cached in the default cache between requests. The
+# plain backend stays listed so sessions created before it keep working.
+AUTHENTICATION_BACKENDS = [
+    'auctions.auth.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+USER_CACHE_TIMEOUT = 60
+
+# SESSION_MODE environment variable: "db" (default); "cached_db", which
+# reads sessions from the default cache and writes through to the database;
+# or "signed_cookies", which keeps them in the client's cookie and stores
+# nothing. Use cached_db only with a shared cache when running several
+# workers, or a logout in one worker leaves the session cached in the others.
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_ENGINES[os.environ.get('SESSION_MODE', 'db')]
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -119,9 +197,128 @@ USE_L10N = True
 USE_TZ = True
 
 
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# Rendered listing fragments go to their own cache, selected with the
+# FRAGMENT_CACHE environment variable: "locmem" (default), "file", "redis"
+# or "memcached". The last two read the server address from
+# FRAGMENT_CACHE_LOCATION.
+
+FRAGMENT_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'listing-fragments',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, '.cache', 'fragments'),
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('FRAGMENT_CACHE_LOCATION', 'redis://127.0.0.1:6379'),
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': os.environ.get('FRAGMENT_CACHE_LOCATION', '127.0.0.1:11211'),
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'fragments': FRAGMENT_CACHE_BACKENDS[os.environ.get('FRAGMENT_CACHE', 'locmem')],
+}
+
+LISTING_FRAGMENT_CACHE = 'fragments'
+LISTING_FRAGMENT_TIMEOUT = 60 * 60
+
+# Per-user sets of watched listing IDs live in the default cache; use a shared
+# backend there when running several workers so invalidation reaches them all
+WATCHLIST_CACHE_TIMEOUT = 5 * 60
+
+# Category names and active-listing counts, adjusted in place as listings
+# open and close; the timeout bounds drift from changes made elsewhere
+FACET_CACHE_TIMEOUT = 5 * 60
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/3.0/howto/static-files/
 
 STATIC_URL = '/static/'
 
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+# `manage.py collectstatic` writes content-hashed copies of every static
+# file, with gzip and brotli variants, to STATIC_ROOT, and the app serves
+# them itself (see auctions/assets.py) unless DEBUG is on. Hashed URLs are cached for a year;
+# files requested by their plain name are cached for STATIC_MAX_AGE seconds.
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+STATIC_MAX_AGE = 60 * 60
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'auctions.assets.CompressedManifestStorage'},
+}
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Auctions
+# How long a new auction runs unless the seller picks another duration, and
+# how often (in seconds) an in-process thread closes expired auctions. Leave
+# the interval as None and run `manage.py close_expired_auctions` from cron
+# or with --interval instead when several workers are running.
+AUCTION_DEFAULT_DURATION_DAYS = 7
+AUCTION_DURATION_CHOICES_DAYS = [1, 3, 7, 14, 30]
+AUCTION_CLOSER_INTERVAL = None
+# Auctions closed for this long are moved, with their bids, comments and
+# watchers, into the archive tables by `manage.py archive_auctions` (cron)
+ARCHIVE_AFTER_DAYS = 90
+
+# Listing page views are buffered per process and written every this many
+# seconds; set to None to only write them on trending.flush()
+VIEW_COUNT_FLUSH_SECONDS = 10
+# Trending scores halve over this long. Decay them with `manage.py
+# update_trending`, or set an interval to do it in a thread of this process
+TRENDING_HALF_LIFE_HOURS = 6
+TRENDING_DECAY_INTERVAL = None
+
+# Notification emails are written to files locally; set EMAIL_BACKEND (and
+# EMAIL_HOST etc.) for real delivery. SITE_URL builds the links in them.
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.filebased.EmailBackend')
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+DEFAULT_FROM_EMAIL = 'auctions@localhost'
+SITE_URL = os.environ.get('SITE_URL', 'http://127.0.0.1:8000')
+
+# Job queue (see auctions/jobs.py); run the worker with `manage.py process_jobs`
+JOB_DEBOUNCE_SECONDS = 30
+JOB_LEASE_SECONDS = 5 * 60
+JOB_MAX_ATTEMPTS = 5
+JOB_RETENTION_HOURS = 24
+
+
+# Live listing updates
+# Server-sent event streams send a keep-alive comment when idle, and the
+# long-poll fallback answers 204 after its timeout. Serve the project with
+# an ASGI server so idle streams don't each hold a thread.
+EVENTS_HEARTBEAT_SECONDS = 15
+EVENTS_RETRY_MILLISECONDS = 3000
+LONG_POLL_TIMEOUT_SECONDS = 25
+
+
+# Request profiling
+# Addresses allowed to scrape /metrics, and an optional threshold above which
+# a request is logged along with all of its SQL (None disables the log).
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+SLOW_REQUEST_THRESHOLD_MS = None
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'auctions.profiling': {'handlers': ['console'], 'level': 'WARNING'},
+    },
+}